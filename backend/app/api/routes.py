@@ -1,23 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Optional
+from datetime import datetime
 from pydantic import BaseModel
 
 from ..models.database import get_db
-from ..core.orchestrator import AIOrchestrator, CommandRequest, CommandResponse
-from ..models.task import Task, TaskStatus
+from ..core.orchestrator import AIOrchestrator, CommandRequest, CommandResponse, BatchCommandResult
+from ..core.admission import AdmissionRejected
+from ..models.task import Task, TaskStatus, TaskPriority
 from ..models.user import User
 from ..models.conversation import Conversation
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = int(os.getenv("COMMAND_BATCH_MAX_SIZE", "1000"))
+
 # Pydantic models for API requests/responses
 class CommandRequestModel(BaseModel):
     command: str
     user_id: int = None
     conversation_id: int = None
     context: Dict[str, Any] = None
+    run_at: datetime = None
+    delay_seconds: float = None
+    deadline: datetime = None
+    deadline_seconds: float = None
+    # Per-command alternative to the Idempotency-Key header, for batches
+    idempotency_key: str = None
+
+class BatchCommandRequestModel(BaseModel):
+    commands: List[CommandRequestModel]
+
+class BatchCommandResponse(BaseModel):
+    results: List[BatchCommandResult]
+    accepted: int
+    duplicates: int
+    rejected: int
+    failed: int
+
+class TaskPriorityRequest(BaseModel):
+    priority: str
+
+class RedriveRequest(BaseModel):
+    task_ids: List[int] = None
 
 class TaskStatusResponse(BaseModel):
     task_id: int
@@ -26,10 +53,15 @@ class TaskStatusResponse(BaseModel):
     created_at: str = None
     started_at: str = None
     completed_at: str = None
+    run_at: str = None
+    deadline: str = None
     result: Dict[str, Any] = None
     error_message: str = None
+    attempts: int = 0
 
 class QueueStatusResponse(BaseModel):
+    queue_mode: str = "memory"
+    worker_mode: str = "inline"
     queue_size: int
     active_tasks: int
     max_concurrent_tasks: int
@@ -37,10 +69,44 @@ class QueueStatusResponse(BaseModel):
     total_processing: int
     total_completed: int
     total_failed: int
+    total_dead_letter: int = 0
+    scheduled_tasks: int = 0
+    scheduling_policy: str = "priority"
+    fair_share: bool = False
+    # Tasks per second completed within their deadline
+    goodput: float = 0.0
+    deadline_met: int = 0
+    deadline_missed: int = 0
+    deadline_dropped: int = 0
+    services: Dict[str, Dict[str, Any]] = {}
 
 class ServiceHealthResponse(BaseModel):
     services: Dict[str, bool]
 
+class ParserStatsResponse(BaseModel):
+    requests: int = 0
+    # Commands parsed by the LLM, the calls that took (fewer when batched)
+    # and LLM tokens spent per command
+    llm_parses: int = 0
+    llm_calls: int = 0
+    tokens_per_parse: float = 0.0
+    # Share of commands parsed by rules or from a cache
+    llm_bypass_rate: float = 0.0
+    # Smoothed seconds per LLM parse, and the total saved by not calling it
+    llm_latency: Optional[float] = None
+    latency_saved: float = 0.0
+    # Parses that shared an identical in-flight LLM call, and their share
+    # of all parses that needed the LLM
+    coalesced: int = 0
+    coalescing_ratio: float = 0.0
+    # Per-path hits; None when that path is disabled
+    fast_path: Optional[Dict[str, Any]] = None
+    batching: Optional[Dict[str, Any]] = None
+    # Decisions read early from streamed parses and their smoothed latency
+    streaming: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
+    semantic_cache: Optional[Dict[str, Any]] = None
+
 # Global orchestrator instance
 orchestrator = None
 
@@ -65,28 +131,91 @@ async def shutdown_event():
     if orchestrator:
         await orchestrator.stop()
 
+def _admission_error(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @router.post("/command", response_model=CommandResponse)
 async def process_command(
     request: CommandRequestModel,
+    idempotency_key: str = Header(None, alias="Idempotency-Key"),
     orchestrator: AIOrchestrator = Depends(get_orchestrator)
 ):
     """
     Process a natural language command.
+    
+    Retries carrying the same Idempotency-Key, or repeating the same command
+    within the dedup window, return the original task. When the queue is
+    overloaded the command is refused with 429 (this priority is being
+    shed) or 503 (all work is being shed) and a Retry-After header.
     """
     try:
         command_request = CommandRequest(
             command=request.command,
             user_id=request.user_id,
             conversation_id=request.conversation_id,
-            context=request.context
+            context=request.context,
+            run_at=request.run_at,
+            delay_seconds=request.delay_seconds,
+            deadline=request.deadline,
+            deadline_seconds=request.deadline_seconds,
+            idempotency_key=idempotency_key or request.idempotency_key
         )
         
         response = await orchestrator.process_command(command_request)
         return response
         
+    except AdmissionRejected as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/commands:batch", response_model=BatchCommandResponse)
+async def process_commands_batch(
+    request: BatchCommandRequestModel,
+    orchestrator: AIOrchestrator = Depends(get_orchestrator)
+):
+    """
+    Process many natural language commands in one request.
+    
+    Each command gets its own result, in order; one failing command does
+    not fail the rest.
+    """
+    if len(request.commands) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} commands per batch")
+    
+    try:
+        results = await orchestrator.process_commands([
+            CommandRequest(
+                command=command.command,
+                user_id=command.user_id,
+                conversation_id=command.conversation_id,
+                context=command.context,
+                run_at=command.run_at,
+                delay_seconds=command.delay_seconds,
+                deadline=command.deadline,
+                deadline_seconds=command.deadline_seconds,
+                idempotency_key=command.idempotency_key
+            )
+            for command in request.commands
+        ])
+        
+        return BatchCommandResponse(
+            results=results,
+            accepted=sum(1 for result in results if result.status in ("queued", "scheduled")),
+            duplicates=sum(1 for result in results if result.status == "duplicate"),
+            rejected=sum(1 for result in results if result.status == "rejected"),
+            failed=sum(1 for result in results if result.status == "error")
+        )
+        
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/task/{task_id}", response_model=TaskStatusResponse)
 async def get_task_status(
     task_id: int,
@@ -118,13 +247,28 @@ async def get_queue_status(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/parser/stats", response_model=ParserStatsResponse)
+async def get_parser_stats(
+    orchestrator: AIOrchestrator = Depends(get_orchestrator)
+):
+    """
+    Get command parser cache metrics.
+    """
+    try:
+        stats = await orchestrator.get_parser_stats()
+        return ParserStatsResponse(**stats)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.delete("/task/{task_id}")
 async def cancel_task(
     task_id: int,
     orchestrator: AIOrchestrator = Depends(get_orchestrator)
 ):
     """
-    Cancel a pending task.
+    Cancel a pending or running task. A running task is interrupted and
+    its service asked to stop.
     """
     try:
         success = await orchestrator.cancel_task(task_id)
@@ -136,6 +280,59 @@ async def cancel_task(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.patch("/task/{task_id}/priority")
+async def update_task_priority(
+    task_id: int,
+    request: TaskPriorityRequest,
+    orchestrator: AIOrchestrator = Depends(get_orchestrator)
+):
+    """
+    Change the priority of a pending task.
+    """
+    try:
+        priority = TaskPriority(request.priority)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid priority")
+    
+    try:
+        success = await orchestrator.reprioritize_task(task_id, priority)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not success:
+        raise HTTPException(status_code=400, detail="Failed to reprioritize task")
+    return {"message": f"Task {task_id} priority set to {priority.value}"}
+
+@router.get("/dead-letter", response_model=List[TaskStatusResponse])
+async def get_dead_letter_tasks(
+    limit: int = 50,
+    orchestrator: AIOrchestrator = Depends(get_orchestrator)
+):
+    """
+    List tasks that ran out of retries.
+    """
+    try:
+        tasks = await orchestrator.get_dead_letter_tasks(limit)
+        return [TaskStatusResponse(**task) for task in tasks]
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/dead-letter/redrive")
+async def redrive_dead_letter(
+    request: RedriveRequest,
+    orchestrator: AIOrchestrator = Depends(get_orchestrator)
+):
+    """
+    Requeue dead-lettered tasks, either the given ones or all of them.
+    """
+    try:
+        count = await orchestrator.redrive_dead_letter(request.task_ids)
+        return {"message": f"Requeued {count} dead letter tasks", "redriven": count}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/services/health", response_model=ServiceHealthResponse)
 async def get_service_health(
     orchestrator: AIOrchestrator = Depends(get_orchestrator)
@@ -179,8 +376,11 @@ async def get_tasks(
                 created_at=task.created_at.isoformat() if task.created_at else None,
                 started_at=task.started_at.isoformat() if task.started_at else None,
                 completed_at=task.completed_at.isoformat() if task.completed_at else None,
+                run_at=task.run_at.isoformat() if task.run_at else None,
+                deadline=task.deadline.isoformat() if task.deadline else None,
                 result=task.result,
-                error_message=task.error_message
+                error_message=task.error_message,
+                attempts=task.attempts or 0
             )
             for task in tasks
         ]
@@ -238,8 +438,11 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "command": "/command",
+            "commands_batch": "/commands:batch",
             "task_status": "/task/{task_id}",
+            "task_priority": "/task/{task_id}/priority",
             "queue_status": "/queue/status",
+            "dead_letter": "/dead-letter",
             "service_health": "/services/health",
             "tasks": "/tasks",
             "conversation": "/conversation",
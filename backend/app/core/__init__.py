@@ -2,10 +2,16 @@ from .orchestrator import AIOrchestrator
 from .command_parser import CommandParser
 from .task_router import TaskRouter
 from .queue_manager import QueueManager
+from .db_queue import DatabaseTaskQueue
+from .queue_backends import QueueBackend, InMemoryQueueBackend, RedisQueueBackend
 
 __all__ = [
     "AIOrchestrator",
     "CommandParser", 
     "TaskRouter",
-    "QueueManager"
+    "QueueManager",
+    "DatabaseTaskQueue",
+    "QueueBackend",
+    "InMemoryQueueBackend",
+    "RedisQueueBackend"
 ]
\ No newline at end of file
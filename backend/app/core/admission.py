@@ -0,0 +1,117 @@
+import math
+import os
+from typing import Any, Dict, Optional
+
+from ..models.task import TaskPriority
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Share of each limit a priority may fill before it is shed, so LOW work is
+# turned away well before URGENT work is
+DEFAULT_PRIORITY_SHARES = {
+    TaskPriority.LOW: 0.5,
+    TaskPriority.MEDIUM: 0.75,
+    TaskPriority.HIGH: 0.9,
+    TaskPriority.URGENT: 1.0
+}
+
+class AdmissionRejected(Exception):
+    """
+    New work was refused because the queue is overloaded.
+
+    status_code is 429 when only this priority is being shed and 503 when
+    even URGENT work would be refused; retry_after is the estimated number
+    of seconds until the backlog has drained enough to admit it.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def parse_priority_shares(value: str) -> Dict[TaskPriority, float]:
+    """
+    Parse "low:0.5,medium:0.75,..." into per-priority shares.
+    """
+    shares = dict(DEFAULT_PRIORITY_SHARES)
+    for part in value.split(","):
+        if ":" in part:
+            name, share = part.split(":", 1)
+            shares[TaskPriority(name.strip().lower())] = float(share)
+    return shares
+
+class AdmissionController:
+    """
+    Decides whether a new task may enter the queue.
+
+    Three limits apply: total queue depth, the backlog of the task's
+    target service and the estimated wait for that service (its backlog
+    divided by how fast it drains). Each priority may only fill its share
+    of every limit.
+    """
+
+    def __init__(
+        self,
+        max_queue_depth: Optional[int] = None,
+        max_service_backlog: Optional[int] = None,
+        max_wait_seconds: Optional[float] = None,
+        priority_shares: Optional[Dict[TaskPriority, float]] = None
+    ):
+        self.max_queue_depth = max_queue_depth or int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", "10000"))
+        self.max_service_backlog = max_service_backlog or int(os.getenv("ADMISSION_MAX_SERVICE_BACKLOG", "2000"))
+        self.max_wait_seconds = max_wait_seconds or float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "300"))
+        self.priority_shares = priority_shares or parse_priority_shares(os.getenv("ADMISSION_PRIORITY_SHARES", ""))
+        self.default_retry_after = 5
+        self.max_retry_after = 300
+
+    def check(self, stats: Dict[str, Any], priority: TaskPriority, service: Optional[str] = None):
+        """
+        Raise AdmissionRejected if a task of this priority for this service
+        must be refused. stats comes from QueueManager.load_stats.
+        """
+        share = self.priority_shares.get(priority, 1.0)
+        services = stats["services"]
+        total_rate = sum(s["drain_rate"] for s in services.values() if s["drain_rate"]) or None
+
+        depth = stats["queue_depth"]
+        if depth >= self.max_queue_depth * share:
+            self._reject(
+                f"Queue is full ({depth} tasks queued)",
+                hard=depth >= self.max_queue_depth,
+                excess=depth - self.max_queue_depth * share + 1,
+                rate=total_rate
+            )
+
+        if service is None or service not in services:
+            return
+        backlog = services[service]["queued"]
+        rate = services[service]["drain_rate"]
+        if backlog >= self.max_service_backlog * share:
+            self._reject(
+                f"Service {service} is overloaded ({backlog} tasks queued)",
+                hard=backlog >= self.max_service_backlog,
+                excess=backlog - self.max_service_backlog * share + 1,
+                rate=rate
+            )
+
+        if rate:
+            wait = backlog / rate
+            if wait >= self.max_wait_seconds * share:
+                self._reject(
+                    f"Service {service} has an estimated wait of {wait:.0f}s",
+                    hard=wait >= self.max_wait_seconds,
+                    excess=(wait - self.max_wait_seconds * share) * rate + 1,
+                    rate=rate
+                )
+
+    def _reject(self, message: str, hard: bool, excess: float, rate: Optional[float]):
+        """
+        Raise with a Retry-After of the time needed to drain the excess.
+        """
+        if rate:
+            retry_after = math.ceil(excess / rate)
+        else:
+            retry_after = self.default_retry_after
+        retry_after = min(max(retry_after, 1), self.max_retry_after)
+        raise AdmissionRejected(message, status_code=503 if hard else 429, retry_after=retry_after)
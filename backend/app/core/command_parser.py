@@ -1,9 +1,16 @@
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel
 from ..models.task import TaskType, TaskPriority
 from ..services.llm_service import llm_service
+from .parse_cache import ParseCache
+from .semantic_cache import SemanticCache
+from .fast_path import FastPathClassifier
+from .micro_batcher import MicroBatcher
+from .json_stream import JSONObjectStream
 import os
 from dotenv import load_dotenv
 
@@ -21,8 +28,66 @@ class ParsedCommand(BaseModel):
     parameters: Dict[str, Any]
     confidence: float
 
+# Fields that decide where a task goes and whether it is admitted; with
+# streaming they are handed out before the rest of the parse arrives, so
+# the prompt asks for them first
+DECISION_FIELDS = ("task_type", "priority", "target_service")
+
 class CommandParser:
     def __init__(self):
+        # Commands seen before are answered from the cache instead of the
+        # LLM; PARSE_CACHE_PATH adds a SQLite tier that outlives restarts
+        max_entries = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "10000"))
+        self.cache = ParseCache(
+            ParsedCommand,
+            max_entries=max_entries,
+            ttl=float(os.getenv("PARSE_CACHE_TTL", "86400")),
+            path=os.getenv("PARSE_CACHE_PATH") or None
+        ) if max_entries > 0 else None
+        # Paraphrases of commands seen before reuse their parse, with the
+        # new command's URLs, emails, quoted text and numbers swapped in
+        semantic_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+        self.semantic_cache = SemanticCache(
+            ParsedCommand,
+            max_entries=semantic_entries,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            ttl=float(os.getenv("PARSE_CACHE_TTL", "86400"))
+        ) if semantic_entries > 0 else None
+        # Simple browser commands are classified by keyword rules without
+        # calling the LLM at all
+        self.fast_path = FastPathClassifier(
+            min_confidence=float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+        ) if os.getenv("FAST_PATH_ENABLED", "true").lower() == "true" else None
+        # Identical commands parsed at the same time share one LLM call
+        self.single_flight = os.getenv("PARSE_SINGLE_FLIGHT", "true").lower() == "true"
+        # Each flight is the parse task and a future resolved with the
+        # decision fields as soon as they have streamed in
+        self._in_flight: Dict[str, Tuple[asyncio.Task, asyncio.Future]] = {}
+        # Commands reaching the LLM within PARSE_BATCH_WINDOW seconds of
+        # each other are parsed in one call, up to PARSE_BATCH_MAX_SIZE
+        batch_window = float(os.getenv("PARSE_BATCH_WINDOW", "0"))
+        self.batcher = MicroBatcher(
+            self._complete_batch,
+            window=batch_window,
+            max_size=int(os.getenv("PARSE_BATCH_MAX_SIZE", "8"))
+        ) if batch_window > 0 else None
+        # Stream completions so that the decision fields can be acted on
+        # while the rest of the parse is still arriving
+        self.streaming = os.getenv("PARSE_STREAMING", "false").lower() == "true"
+        self.decisions = 0
+        self.decision_latency: Optional[float] = None
+        self.coalesced = 0
+        self.requests = 0
+        # Commands parsed by the LLM, and the calls it took
+        self.llm_parses = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.fast_path_hits = 0
+        # Smoothed LLM parse latency, counted as saved for every command
+        # answered without a call
+        self.llm_latency: Optional[float] = None
+        self.latency_saved = 0.0
         self.system_prompt = """
 You are an AI command parser for an AI Orchestrator system. Your job is to parse natural language commands and convert them into structured task specifications.
 
@@ -43,13 +108,13 @@ Available services:
 - media_service: For video/audio processing
 - bot_builder_service: For creating AI bots
 
-Return a JSON object with the following structure:
+Return a JSON object with the following structure, with the fields in this order:
 {
     "task_type": "one_of_the_task_types",
-    "title": "Brief task title",
-    "description": "Detailed task description",
     "priority": "one_of_the_priorities",
     "target_service": "service_name",
+    "title": "Brief task title",
+    "description": "Detailed task description",
     "service_endpoint": "specific_endpoint_if_known",
     "parameters": {
         "key": "value"
@@ -58,29 +123,107 @@ Return a JSON object with the following structure:
 }
 """
 
-    async def parse_command(self, command: str, context: Optional[Dict[str, Any]] = None) -> ParsedCommand:
+    async def parse_command(
+        self,
+        command: str,
+        context: Optional[Dict[str, Any]] = None,
+        on_decision: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> ParsedCommand:
         """
         Parse a natural language command into a structured task specification.
+        
+        With streaming, on_decision is called with task_type, priority and
+        target_service as soon as the LLM has produced them, before the
+        parse is complete; an exception it raises is raised to this caller
+        without stopping the parse for anyone else. It is not called when
+        the parse is answered without streaming.
         """
+        self.requests += 1
+        # Context may change what a command means, which only the LLM sees
+        if self.fast_path is not None and not context:
+            fields = self.fast_path.classify(command)
+            if fields is not None:
+                self.fast_path_hits += 1
+                self._count_saved()
+                logger.info(f"Parsed command by rules: {command} -> {fields['parameters']['action']}")
+                return ParsedCommand(**fields)
+        
+        cache_key = ParseCache.key(command, context, llm_service.default_model)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._count_saved()
+                return cached
+        if self.semantic_cache is not None:
+            similar = self.semantic_cache.get(command, context, llm_service.default_model)
+            if similar is not None:
+                self._count_saved()
+                return similar
+        
+        if not self.single_flight:
+            if on_decision is None:
+                return await self._parse_with_llm(command, context, cache_key)
+            decided = asyncio.get_running_loop().create_future()
+            flight = asyncio.create_task(self._parse_with_llm(command, context, cache_key, decided))
+            flight.add_done_callback(self._retrieve)
+            return await self._await_flight(flight, decided, on_decision)
+        
+        if cache_key not in self._in_flight:
+            # The call runs as its own task so that one caller giving up
+            # does not cancel it for the others
+            decided = asyncio.get_running_loop().create_future()
+            flight = asyncio.create_task(self._parse_with_llm(command, context, cache_key, decided))
+            self._in_flight[cache_key] = (flight, decided)
+            flight.add_done_callback(lambda done: self._land(cache_key, done))
+        else:
+            flight, decided = self._in_flight[cache_key]
+            self.coalesced += 1
+            self._count_saved()
+        parsed_command = await self._await_flight(flight, decided, on_decision)
+        # Every caller gets its own copy to change
+        return parsed_command.model_copy(deep=True)
+
+    async def _await_flight(
+        self,
+        flight: asyncio.Task,
+        decided: asyncio.Future,
+        on_decision: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> ParsedCommand:
+        if on_decision is not None:
+            # A parse that fails before deciding leaves decided pending
+            await asyncio.wait({flight, decided}, return_when=asyncio.FIRST_COMPLETED)
+            if decided.done():
+                on_decision(dict(decided.result()))
+        return await asyncio.shield(flight)
+
+    def _land(self, cache_key: str, flight: asyncio.Task):
+        del self._in_flight[cache_key]
+        self._retrieve(flight)
+
+    @staticmethod
+    def _retrieve(flight: asyncio.Task):
+        if not flight.cancelled():
+            # Retrieved here in case every caller was cancelled or gave up
+            # after its decision
+            flight.exception()
+
+    async def _parse_with_llm(
+        self,
+        command: str,
+        context: Optional[Dict[str, Any]],
+        cache_key: str,
+        decided: Optional[asyncio.Future] = None
+    ) -> ParsedCommand:
+        """
+        Ask the LLM to parse a command and cache the result. A batched
+        parse is not streamed, so it never resolves decided.
+        """
+        self.llm_parses += 1
         try:
-            # Build the prompt with context
-            user_prompt = f"Parse this command: {command}"
-            if context:
-                user_prompt += f"\nContext: {json.dumps(context)}"
-            
-            # Call OpenRouter API via LLM service
-            response = await llm_service.chat_completion(
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=1000
-            )
-            
-            # Parse the response
-            content = response["choices"][0]["message"]["content"]
-            parsed_data = json.loads(content)
+            if self.batcher is not None:
+                parsed_data = await self.batcher.submit((command, context))
+            else:
+                parsed_data = await self._complete_one(command, context, decided)
             
             # Create ParsedCommand object
             parsed_command = ParsedCommand(
@@ -95,6 +238,12 @@ Return a JSON object with the following structure:
             )
             
             logger.info(f"Successfully parsed command: {command} -> {parsed_command.task_type}")
+            # Parses that would be rejected are worth asking again
+            if self.validate_parsed_command(parsed_command):
+                if self.cache is not None:
+                    self.cache.set(cache_key, parsed_command)
+                if self.semantic_cache is not None:
+                    self.semantic_cache.set(command, context, llm_service.default_model, parsed_command)
             return parsed_command
             
         except json.JSONDecodeError as e:
@@ -104,6 +253,170 @@ Return a JSON object with the following structure:
             logger.error(f"Error parsing command '{command}': {e}")
             raise
 
+    async def _chat(self, user_prompt: str, max_tokens: int, decided: Optional[asyncio.Future] = None) -> str:
+        """
+        One chat completion with the parser's system prompt, returning the
+        reply text.
+        """
+        self.llm_calls += 1
+        started = time.perf_counter()
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        if self.streaming:
+            content, usage = await self._stream(messages, max_tokens, decided, started)
+        else:
+            response = await llm_service.chat_completion(
+                messages=messages,
+                temperature=0.1,
+                max_tokens=max_tokens
+            )
+            usage = response.get("usage") or {}
+            content = response["choices"][0]["message"]["content"]
+        
+        elapsed = time.perf_counter() - started
+        self.llm_latency = elapsed if self.llm_latency is None else 0.8 * self.llm_latency + 0.2 * elapsed
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        return content
+
+    async def _stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        decided: Optional[asyncio.Future],
+        started: float
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Stream a completion, resolving decided once the decision fields
+        have arrived. Returns the reply text and token usage.
+        """
+        reply = JSONObjectStream() if decided is not None else None
+        content: List[str] = []
+        usage: Dict[str, Any] = {}
+        async for chunk in llm_service.stream_chat_completion(
+            messages=messages,
+            temperature=0.1,
+            max_tokens=max_tokens
+        ):
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                content.append(delta)
+                if reply is not None and not decided.done() and reply.feed(delta):
+                    decision = self._decision(reply.fields)
+                    if decision is not None:
+                        elapsed = time.perf_counter() - started
+                        self.decisions += 1
+                        self.decision_latency = (
+                            elapsed if self.decision_latency is None
+                            else 0.8 * self.decision_latency + 0.2 * elapsed
+                        )
+                        decided.set_result(decision)
+        return "".join(content), usage
+
+    @staticmethod
+    def _decision(fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The decision fields as their types, once all have arrived and are
+        valid; a parse with an invalid one will fail as a whole later.
+        """
+        if not all(name in fields for name in DECISION_FIELDS):
+            return None
+        try:
+            return {
+                "task_type": TaskType(fields["task_type"]),
+                "priority": TaskPriority(fields["priority"]),
+                "target_service": str(fields["target_service"])
+            }
+        except ValueError:
+            return None
+
+    async def _complete_one(
+        self,
+        command: str,
+        context: Optional[Dict[str, Any]],
+        decided: Optional[asyncio.Future] = None
+    ) -> Dict[str, Any]:
+        # Build the prompt with context
+        user_prompt = f"Parse this command: {command}"
+        if context:
+            user_prompt += f"\nContext: {json.dumps(context)}"
+        
+        # Call OpenRouter API via LLM service
+        content = await self._chat(user_prompt, max_tokens=1000, decided=decided)
+        return json.loads(content)
+
+    async def _complete_batch(self, items: List[tuple]) -> List[Any]:
+        """
+        Parse several (command, context) pairs in one call that answers
+        with a JSON array. If the reply cannot be matched up with the
+        commands, each is parsed on its own instead.
+        """
+        if len(items) == 1:
+            return [await self._complete_one(*items[0])]
+        
+        commands = [
+            {"command": command, "context": context} if context else {"command": command}
+            for command, context in items
+        ]
+        user_prompt = (
+            f"Parse each of these {len(items)} commands. Return a JSON array with one object per "
+            f"command, in the same order, each with the structure above.\n"
+            f"Commands: {json.dumps(commands)}"
+        )
+        try:
+            results = json.loads(await self._chat(user_prompt, max_tokens=1000 * len(items)))
+            if isinstance(results, list) and len(results) == len(items) and all(isinstance(r, dict) for r in results):
+                return results
+            logger.warning(f"Batch parse returned an unexpected reply for {len(items)} commands, parsing one by one")
+        except json.JSONDecodeError as e:
+            logger.warning(f"Batch parse returned invalid JSON ({e}), parsing one by one")
+        
+        return await asyncio.gather(
+            *(self._complete_one(command, context) for command, context in items),
+            return_exceptions=True
+        )
+
+    def _count_saved(self):
+        if self.llm_latency is not None:
+            self.latency_saved += self.llm_latency
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        How many commands were parsed without the LLM, and by which path.
+        """
+        return {
+            "requests": self.requests,
+            "llm_parses": self.llm_parses,
+            "llm_calls": self.llm_calls,
+            "llm_bypass_rate": 1 - self.llm_parses / self.requests if self.requests else 0.0,
+            "tokens_per_parse": (
+                (self.prompt_tokens + self.completion_tokens) / self.llm_parses if self.llm_parses else 0.0
+            ),
+            "llm_latency": self.llm_latency,
+            "latency_saved": self.latency_saved,
+            # Parses that joined an identical one already waiting on the LLM
+            "coalesced": self.coalesced,
+            "coalescing_ratio": self.coalesced / (self.coalesced + self.llm_parses) if self.coalesced else 0.0,
+            "fast_path": {
+                "hits": self.fast_path_hits,
+                "hit_rate": self.fast_path_hits / self.requests if self.requests else 0.0
+            } if self.fast_path is not None else None,
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            # How often and how soon the decision fields were read from a
+            # stream, against llm_latency for the whole parse
+            "streaming": {
+                "decisions": self.decisions,
+                "decision_latency": self.decision_latency
+            } if self.streaming else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None
+        }
+
     def validate_parsed_command(self, parsed_command: ParsedCommand) -> bool:
         """
         Validate the parsed command for completeness and correctness.
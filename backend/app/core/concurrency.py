@@ -0,0 +1,80 @@
+import time
+from typing import Any, Dict, Optional
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit for one
+    downstream service.
+
+    While the smoothed latency stays within latency_tolerance times the
+    baseline, every successful call raises the limit by 1/limit, which is
+    about +1 per round of in-flight calls. A transient error, a timeout or
+    a smoothed latency above the tolerance cuts the limit by backoff_ratio,
+    at most once per observed latency so one burst of slow replies cannot
+    collapse it to the floor.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float = 1.0,
+        max_limit: float = 100.0,
+        backoff_ratio: float = 0.7,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self.latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self._last_decrease = 0.0
+
+    def record(self, latency: float, overloaded: bool = False, now: Optional[float] = None) -> None:
+        """
+        Feed one completed call into the controller.
+
+        overloaded marks a timeout or transient error that suggests the
+        service is past its capacity.
+        """
+        now = time.monotonic() if now is None else now
+        alpha = self.smoothing
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (1.0 if overloaded else 0.0)
+
+        if not overloaded:
+            self.latency = latency if self.latency is None else (1 - alpha) * self.latency + alpha * latency
+            # Baseline tracks the fastest recent latency, drifting up slowly
+            # so a permanently slower service is not treated as congested
+            if self.baseline_latency is None or latency < self.baseline_latency:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency += 0.01 * (latency - self.baseline_latency)
+
+        congested = (
+            overloaded
+            or (self.latency is not None
+                and self.latency > self.latency_tolerance * self.baseline_latency)
+        )
+        if congested:
+            if now - self._last_decrease >= (self.latency or 0.0):
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    @property
+    def current_limit(self) -> int:
+        return max(1, int(self.limit))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "adaptive_limit": round(self.limit, 2),
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "baseline_latency_ms": round(self.baseline_latency * 1000, 2) if self.baseline_latency is not None else None,
+            "error_rate": round(self.error_rate, 3)
+        }
@@ -0,0 +1,194 @@
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Collection, Dict, Hashable, Optional
+
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models.task import Task, TaskStatus, TaskPriority
+from .queue_backends import QueueBackend, DEFAULT_SERVICE
+
+logger = logging.getLogger(__name__)
+
+class DatabaseTaskQueue(QueueBackend):
+    """
+    Task queue shared by every process that points at the same database.
+
+    PENDING rows in the tasks table are the queue. A worker claims a row by
+    flipping it to PROCESSING in a single atomic statement, so two workers
+    can never claim the same task. Scores are ignored; claims follow
+    priority, then age.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        worker_id: Optional[str] = None,
+        claim_batch: int = 8,
+        lease_seconds: float = 60.0
+    ):
+        self.db = db
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.claim_batch = claim_batch
+        self.dialect = db.get_bind().dialect.name
+
+    def _claim_order(self):
+        """
+        Order claims by priority, then by age.
+        """
+        priority_rank = case(
+            (Task.priority == TaskPriority.URGENT, 4),
+            (Task.priority == TaskPriority.HIGH, 3),
+            (Task.priority == TaskPriority.MEDIUM, 2),
+            (Task.priority == TaskPriority.LOW, 1),
+            else_=2
+        )
+        return (priority_rank.desc(), Task.created_at.asc(), Task.id.asc())
+
+    def _claimable(self, exclude: Collection[str], exclude_flows: Collection[Hashable] = ()):
+        """
+        Filter for pending rows that are not waiting out a retry backoff and
+        whose service and user are not excluded.
+        """
+        conditions = [
+            Task.status == TaskStatus.PENDING,
+            or_(Task.next_attempt_at.is_(None), Task.next_attempt_at <= datetime.utcnow())
+        ]
+        if exclude:
+            # Rows without a service belong to the default bulkhead
+            conditions.append(func.coalesce(Task.target_service, DEFAULT_SERVICE).notin_(list(exclude)))
+        if exclude_flows:
+            conditions.append(or_(
+                Task.user_id.is_(None),
+                Task.user_id.notin_(list(exclude_flows))
+            ))
+        return conditions
+
+    @property
+    def is_shared(self) -> bool:
+        return True
+
+    async def push(self, task_id: int, score: float, service: str = DEFAULT_SERVICE, flow=None) -> None:
+        # The committed PENDING row is already queued
+        pass
+
+    async def push_many(self, items) -> None:
+        pass
+
+    async def claim(self, exclude: Collection[str] = (), exclude_flows: Collection[Hashable] = ()) -> Optional[int]:
+        """
+        Atomically claim the next pending task, or return None if there is none.
+        """
+        try:
+            if self.dialect == "postgresql":
+                task_id = self._claim_skip_locked(exclude, exclude_flows)
+            else:
+                task_id = self._claim_guarded(exclude, exclude_flows)
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Error claiming task in {self.worker_id}: {e}")
+            self.db.rollback()
+            return None
+
+        if task_id is not None:
+            logger.info(f"Task {task_id} claimed by {self.worker_id}")
+        return task_id
+
+    async def ack(self, task_id: int) -> None:
+        # Completion is recorded on the row by QueueManager
+        pass
+
+    async def release(self, task_id: int) -> None:
+        self.db.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status == TaskStatus.PROCESSING)
+            .values(status=TaskStatus.PENDING, started_at=None, lease_owner=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+    async def remove(self, task_id: int) -> bool:
+        # Cancelling flips the row out of PENDING, which is all it takes
+        return True
+
+    async def reprioritize(self, task_id: int, score: float) -> bool:
+        # Claims read the priority column, which the caller has already updated
+        return True
+
+    async def size(self) -> int:
+        return self.pending_count()
+
+    async def sizes(self) -> Dict[str, int]:
+        rows = self.db.query(Task.target_service, func.count(Task.id)).filter(
+            Task.status == TaskStatus.PENDING
+        ).group_by(Task.target_service).all()
+        return {service or DEFAULT_SERVICE: count for service, count in rows}
+
+    def _lease_values(self):
+        """
+        Column values that claim a row for this worker.
+        """
+        now = datetime.utcnow()
+        return {
+            "status": TaskStatus.PROCESSING,
+            "started_at": now,
+            "lease_owner": self.worker_id,
+            "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+        }
+
+    def _claim_skip_locked(self, exclude: Collection[str], exclude_flows: Collection[Hashable] = ()) -> Optional[int]:
+        """
+        Claim with UPDATE ... RETURNING over a SELECT ... FOR UPDATE SKIP LOCKED,
+        so concurrent workers skip rows another transaction is claiming.
+        """
+        candidate = (
+            select(Task.id)
+            .where(*self._claimable(exclude, exclude_flows))
+            .order_by(*self._claim_order())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Task)
+            .where(Task.id == candidate)
+            .values(**self._lease_values())
+            .returning(Task.id)
+            .execution_options(synchronize_session=False)
+        )
+        return self.db.execute(stmt).scalar_one_or_none()
+
+    def _claim_guarded(self, exclude: Collection[str], exclude_flows: Collection[Hashable] = ()) -> Optional[int]:
+        """
+        Claim with a guarded update: the UPDATE only matches while the row is
+        still PENDING, so a rowcount of 1 means this worker won the race.
+        """
+        while True:
+            candidates = self.db.execute(
+                select(Task.id)
+                .where(*self._claimable(exclude, exclude_flows))
+                .order_by(*self._claim_order())
+                .limit(self.claim_batch)
+            ).scalars().all()
+            if not candidates:
+                return None
+            
+            for task_id in candidates:
+                result = self.db.execute(
+                    update(Task)
+                    .where(Task.id == task_id, Task.status == TaskStatus.PENDING)
+                    .values(**self._lease_values())
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    return task_id
+            # Every candidate was taken by another worker, look again
+
+    def pending_count(self) -> int:
+        """
+        Number of tasks waiting to be claimed.
+        """
+        return self.db.query(Task).filter(Task.status == TaskStatus.PENDING).count()
@@ -0,0 +1,153 @@
+from collections import defaultdict, deque
+from typing import Any, Callable, Collection, Dict, Hashable, Iterable, Optional, Tuple
+
+from .indexed_heap import IndexedPriorityQueue
+
+# Returned by _next_flow when every flow is skipped; None is a valid flow
+_NO_FLOW = object()
+
+class FairQueue:
+    """
+    Priority queue split into flows, served by deficit round robin.
+
+    Each flow (a user) has its own IndexedPriorityQueue ordered by key.
+    The flow at the front of the round is served while it has credit,
+    then goes to the back and earns weight_of(flow) more credit on its
+    next turn, so while flows have work they get pops in proportion to
+    their weights. However much one flow queues, any other flow is served
+    within one round.
+    """
+
+    def __init__(self, weight_of: Optional[Callable[[Hashable], float]] = None):
+        self.weight_of = weight_of or (lambda flow: 1.0)
+        self._flows: Dict[Hashable, IndexedPriorityQueue] = {}
+        self._flow_of: Dict[Hashable, Hashable] = {}
+        # Flows with queued items, in round order, and their credit
+        self._active: deque = deque()
+        self._deficit: Dict[Hashable, float] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._flow_of
+
+    def push(self, item: Hashable, key: float, flow: Hashable = None) -> None:
+        """
+        Add an item to a flow, or change its key if it is already queued.
+        """
+        if item in self._flow_of:
+            self.update(item, key)
+            return
+        self._flow_queue(flow).push(item, key)
+        self._flow_of[item] = flow
+        self._size += 1
+
+    def extend(self, items: Iterable[Tuple[Hashable, float, Hashable]]) -> None:
+        """
+        Add many (item, key, flow) entries at once.
+        """
+        by_flow = defaultdict(list)
+        for item, key, flow in items:
+            if item in self._flow_of:
+                self.update(item, key)
+            else:
+                by_flow[flow].append((item, key))
+        for flow, entries in by_flow.items():
+            queue = self._flow_queue(flow)
+            before = len(queue)
+            queue.extend(entries)
+            for item, _ in entries:
+                self._flow_of[item] = flow
+            self._size += len(queue) - before
+
+    def pop(self, skip: Collection[Hashable] = ()) -> Tuple[Any, float]:
+        """
+        Remove and return the next item, as (item, key), passing over the
+        flows in skip.
+        """
+        flow = self._next_flow(skip) if self._size else _NO_FLOW
+        if flow is _NO_FLOW:
+            raise IndexError("pop from an empty fair queue")
+        queue = self._flows[flow]
+        item, key = queue.pop()
+        del self._flow_of[item]
+        self._size -= 1
+        self._deficit[flow] -= 1
+        if not queue:
+            self._retire(flow)
+        elif self._deficit[flow] < 1:
+            self._active.rotate(-1)
+        return item, key
+
+    def peek(self, skip: Collection[Hashable] = ()) -> Optional[Tuple[Any, float]]:
+        """
+        Return the next item without removing it, or None if every queued
+        item is in a flow in skip.
+        """
+        flow = self._next_flow(skip) if self._size else _NO_FLOW
+        if flow is _NO_FLOW:
+            return None
+        return self._flows[flow].peek()
+
+    def key(self, item: Hashable) -> Optional[float]:
+        if item not in self._flow_of:
+            return None
+        return self._flows[self._flow_of[item]].key(item)
+
+    def remove(self, item: Hashable) -> bool:
+        if item not in self._flow_of:
+            return False
+        flow = self._flow_of.pop(item)
+        queue = self._flows[flow]
+        queue.remove(item)
+        self._size -= 1
+        if not queue:
+            self._active.remove(flow)
+            self._retire(flow, active=False)
+        return True
+
+    def update(self, item: Hashable, key: float) -> bool:
+        if item not in self._flow_of:
+            return False
+        return self._flows[self._flow_of[item]].update(item, key)
+
+    def _flow_queue(self, flow: Hashable) -> IndexedPriorityQueue:
+        queue = self._flows.get(flow)
+        if queue is None:
+            queue = self._flows[flow] = IndexedPriorityQueue()
+            self._active.append(flow)
+            self._deficit[flow] = 0.0
+        return queue
+
+    def _next_flow(self, skip: Collection[Hashable] = ()) -> Hashable:
+        """
+        The flow to serve next, handing out credit one turn at a time.
+        Skipped flows give up their turn without earning credit; _NO_FLOW
+        if every active flow is skipped.
+        """
+        passed = 0
+        while passed < len(self._active):
+            flow = self._active[0]
+            if flow in skip:
+                self._active.rotate(-1)
+                passed += 1
+                continue
+            passed = 0
+            if self._deficit[flow] >= 1:
+                return flow
+            self._deficit[flow] += max(self.weight_of(flow), 0.01)
+            if self._deficit[flow] >= 1:
+                return flow
+            self._active.rotate(-1)
+        return _NO_FLOW
+
+    def _retire(self, flow: Hashable, active: bool = True):
+        """
+        Forget an emptied flow; it starts without credit if it comes back.
+        """
+        if active:
+            self._active.popleft()
+        del self._flows[flow]
+        del self._deficit[flow]
@@ -0,0 +1,172 @@
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from ..models.task import TaskPriority, TaskType
+
+# Keywords per intent, following BrowserAutomationService._parse_command.
+# Intents without a builder below are recognised only so that a command
+# mentioning them is left to the LLM. URLs are taken out before matching,
+# so domains such as make.com cannot be keywords.
+INTENT_KEYWORDS = {
+    "navigate": ["go to", "navigate to", "navigate", "visit", "open", "browse to"],
+    "screenshot": ["screenshot", "screenshots", "screen shot", "snapshot"],
+    "click_element": ["click", "click on", "press", "tap"],
+    "extract_data": ["extract", "scrape", "get data"],
+    "fill_form": ["fill", "fill in", "fill out", "form", "input", "type", "enter", "log in", "login", "sign in"],
+    "make_workflow": ["workflow", "automation", "scenario"],
+    "canva_design": ["canva", "design", "create design"],
+    "other_service": [
+        "sheet", "sheets", "spreadsheet", "doc", "docs", "document", "email", "mail", "call",
+        "phone", "sms", "text", "message", "transcribe", "transcript", "summarize", "summary",
+        "video", "audio", "podcast", "bot", "chatbot", "script"
+    ],
+}
+
+# Words that mean a command has several steps
+_MULTI_STEP = re.compile(r"\b(?:and|then|after|before|also|while)\b")
+# Words that turn a command around; keywords alone would read the opposite
+_NEGATION = re.compile(r"\b(?:not|never|without|stop|cancel|dont)\b|n['’]t\b")
+_URL = re.compile(
+    r"https?://[^\s\"'<>]+"
+    r"|\b(?:[a-z0-9-]+\.)+(?:com|org|net|io|dev|app|ai|co|edu|gov|uk|de|in)\b(?:/[^\s\"'<>]*)?",
+    re.IGNORECASE
+)
+# A quoted string, or a token that looks like a CSS selector
+_SELECTOR = re.compile(
+    r"\"([^\"]+)\"|'([^']+)'"
+    r"|(?<!\S)((?:[#.][A-Za-z_][\w-]*|[a-z]+\[[^\]\s]+\])(?:[#.:\[][^\s]*)?)"
+)
+# Words a simple command may have besides its keyword, URL and selector.
+# Anything else (a noun such as "ticket", a count, "every") may change
+# what is asked, so the command is left to the LLM.
+_FILLER = frozenset("""
+    a an the this that of on at in to from for with me my
+    please pls can could would you kindly just now quick quickly
+    take grab get make show full whole page site website homepage web url link
+    button element item
+    urgent urgently asap immediately right away low priority whenever no rush
+""".split())
+_WORD = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_URGENT = re.compile(r"\b(?:urgent|urgently|asap|immediately|right away)\b")
+_LOW = re.compile(r"\b(?:low priority|whenever|no rush)\b")
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    One regex matching any of words, factored into a trie so that shared
+    prefixes are tried once instead of once per word.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+class FastPathClassifier:
+    """
+    Recognises simple browser commands without the LLM.
+
+    All keywords are matched in one pass of a compiled trie regex over the
+    command with URLs and selectors taken out. A command is answered only
+    if exactly one intent matches, that intent has a builder, its slots
+    (a URL, a selector) are present, it is a single step and every other
+    word is filler; confidence
+    then drops with every word beyond a short command, so anything wordy
+    is left to the LLM.
+    """
+
+    def __init__(self, min_confidence: float = 0.9):
+        self.min_confidence = min_confidence
+        self._intent_of = {
+            keyword: intent
+            for intent, keywords in INTENT_KEYWORDS.items()
+            for keyword in keywords
+        }
+        self._keywords = re.compile(rf"\b(?:{trie_pattern(self._intent_of)})\b")
+        self._builders = {
+            "navigate": self._navigate,
+            "screenshot": self._screenshot,
+            "click_element": self._click,
+            "extract_data": self._extract,
+        }
+
+    def classify(self, command: str) -> Optional[Dict[str, Any]]:
+        """
+        ParsedCommand fields for command, or None to leave it to the LLM.
+        """
+        urls = [url.rstrip(".,;:!?)") for url in _URL.findall(command)]
+        selectors = [next(group for group in match if group) for match in _SELECTOR.findall(command)]
+        text = _SELECTOR.sub(" ", _URL.sub(" ", command))
+        text = " ".join(text.lower().split())
+
+        intents = {self._intent_of[keyword] for keyword in self._keywords.findall(text)}
+        # Checked on the raw command: the apostrophe of "don't" can pair
+        # with a quote and hide the negation inside a selector
+        if len(intents) != 1 or _MULTI_STEP.search(text) or _NEGATION.search(command.lower()):
+            return None
+        if any(word not in _FILLER for word in _WORD.findall(self._keywords.sub(" ", text))):
+            return None
+        intent = intents.pop()
+        builder = self._builders.get(intent)
+        if builder is None or len(urls) > 1 or len(selectors) > 1:
+            return None
+        parameters = builder(urls[0] if urls else None, selectors[0] if selectors else None)
+        if parameters is None:
+            return None
+
+        confidence = round(0.98 - 0.02 * max(len(text.split()) - 6, 0), 2)
+        if confidence < self.min_confidence:
+            return None
+        priority = TaskPriority.MEDIUM
+        if _URGENT.search(text):
+            priority = TaskPriority.URGENT
+        elif _LOW.search(text):
+            priority = TaskPriority.LOW
+        return {
+            "task_type": TaskType.BROWSER_AUTOMATION,
+            "title": f"{intent.replace('_', ' ').capitalize()}: {parameters.get('selector') or parameters.get('url')}",
+            "description": command,
+            "priority": priority,
+            "target_service": "browser_service",
+            "service_endpoint": "execute",
+            "parameters": parameters,
+            "confidence": confidence,
+        }
+
+    @staticmethod
+    def _absolute(url: str) -> str:
+        return url if re.match(r"https?://", url, re.IGNORECASE) else f"https://{url}"
+
+    def _navigate(self, url, selector):
+        if url is None or selector is not None:
+            return None
+        return {"action": "navigate", "url": self._absolute(url)}
+
+    def _screenshot(self, url, selector):
+        if url is None or selector is not None:
+            return None
+        return {"action": "screenshot", "url": self._absolute(url), "full_page": True}
+
+    def _click(self, url, selector):
+        if selector is None:
+            return None
+        parameters = {"action": "click_element", "selector": selector}
+        if url is not None:
+            parameters["url"] = self._absolute(url)
+        return parameters
+
+    def _extract(self, url, selector):
+        if url is None or selector is None:
+            return None
+        return {"action": "extract_data", "url": self._absolute(url), "selectors": {"data": selector}}
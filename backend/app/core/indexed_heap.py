@@ -0,0 +1,159 @@
+import heapq
+import itertools
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+class IndexedPriorityQueue:
+    """
+    Binary min-heap that tracks the position of every item.
+
+    Knowing where an item sits lets remove and update run in O(log n)
+    instead of leaving stale entries behind for pop to skip. Items with
+    equal keys pop in insertion order.
+    """
+
+    def __init__(self):
+        # Entries are (key, sequence, item); sequences are unique, so items
+        # themselves are never compared
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._position: Dict[Hashable, int] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._position
+
+    def push(self, item: Hashable, key: float) -> None:
+        """
+        Add an item, or change its key if it is already queued.
+        """
+        if item in self._position:
+            self.update(item, key)
+            return
+        self._heap.append((key, next(self._counter), item))
+        self._sift_up(len(self._heap) - 1)
+
+    def extend(self, items: Iterable[Tuple[Hashable, float]]) -> None:
+        """
+        Add many (item, key) pairs at once.
+
+        Large batches are appended and heapified in O(n) rather than pushed
+        one at a time; small batches into a big heap are pushed normally.
+        """
+        items = list(items)
+        if len(items) * 8 < len(self._heap):
+            for item, key in items:
+                self.push(item, key)
+            return
+
+        heap = self._heap
+        position = self._position
+        counter = self._counter
+        updates = []
+        for item, key in items:
+            if item in position:
+                updates.append((item, key))
+                continue
+            heap.append((key, next(counter), item))
+            position[item] = -1
+        heapq.heapify(heap)
+        self._position = {entry[2]: pos for pos, entry in enumerate(heap)}
+        for item, key in updates:
+            self.update(item, key)
+
+    def pop(self) -> Tuple[Any, float]:
+        """
+        Remove and return the item with the lowest key, as (item, key).
+        """
+        if not self._heap:
+            raise IndexError("pop from an empty priority queue")
+        key, _, item = self._heap[0]
+        self._delete_at(0)
+        return item, key
+
+    def peek(self) -> Optional[Tuple[Any, float]]:
+        """
+        Return the item with the lowest key without removing it.
+        """
+        if not self._heap:
+            return None
+        key, _, item = self._heap[0]
+        return item, key
+
+    def key(self, item: Hashable) -> Optional[float]:
+        pos = self._position.get(item)
+        return None if pos is None else self._heap[pos][0]
+
+    def remove(self, item: Hashable) -> bool:
+        pos = self._position.get(item)
+        if pos is None:
+            return False
+        self._delete_at(pos)
+        return True
+
+    def update(self, item: Hashable, key: float) -> bool:
+        """
+        Change the key of a queued item in place, keeping its FIFO position
+        among equal keys.
+        """
+        pos = self._position.get(item)
+        if pos is None:
+            return False
+        old_key, seq, _ = self._heap[pos]
+        self._heap[pos] = (key, seq, item)
+        if key < old_key:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+        return True
+
+    def _delete_at(self, pos: int) -> None:
+        heap = self._heap
+        removed = heap[pos]
+        del self._position[removed[2]]
+        last = heap.pop()
+        if pos == len(heap):
+            return
+        heap[pos] = last
+        self._position[last[2]] = pos
+        if last < removed:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+
+    def _sift_up(self, pos: int) -> None:
+        heap = self._heap
+        position = self._position
+        entry = heap[pos]
+        while pos > 0:
+            parent_pos = (pos - 1) >> 1
+            parent = heap[parent_pos]
+            if not entry < parent:
+                break
+            heap[pos] = parent
+            position[parent[2]] = pos
+            pos = parent_pos
+        heap[pos] = entry
+        position[entry[2]] = pos
+
+    def _sift_down(self, pos: int) -> None:
+        heap = self._heap
+        position = self._position
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            child_pos = 2 * pos + 1
+            if child_pos >= size:
+                break
+            right_pos = child_pos + 1
+            if right_pos < size and heap[right_pos] < heap[child_pos]:
+                child_pos = right_pos
+            child = heap[child_pos]
+            if not child < entry:
+                break
+            heap[pos] = child
+            position[child[2]] = pos
+            pos = child_pos
+        heap[pos] = entry
+        position[entry[2]] = pos
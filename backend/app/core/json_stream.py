@@ -0,0 +1,76 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+class JSONObjectStream:
+    """
+    Reads a JSON object from text that arrives in pieces, handing out each
+    top-level field as soon as it is complete.
+
+    A field is complete at the comma or closing brace after its value, so
+    a short field near the start of the object is available long before
+    a large one after it has finished. Text before the opening brace,
+    such as a markdown fence, and anything after the closing brace is
+    ignored. Malformed text sets failed and stops the stream; the caller
+    should then fall back to parsing the whole reply.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self.failed = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Text of the top-level member being read
+        self._member: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Add the next piece of text; returns the (key, value) fields it
+        completed, in order.
+        """
+        completed: List[Tuple[str, Any]] = []
+        for char in text:
+            if self.done or self.failed:
+                break
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close_member(completed)
+                    self.done = not self.failed
+                    break
+            elif char == "," and self._depth == 1:
+                self._close_member(completed)
+                continue
+            self._member.append(char)
+        return completed
+
+    def _close_member(self, completed: List[Tuple[str, Any]]):
+        member = "".join(self._member).strip()
+        self._member = []
+        if not member:
+            return
+        try:
+            (key, value), = json.loads("{" + member + "}").items()
+        except ValueError:
+            self.failed = True
+            return
+        self.fields[key] = value
+        completed.append((key, value))
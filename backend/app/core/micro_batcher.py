@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Groups items submitted close together into one call of handler.
+
+    The first item of a batch opens a window of window seconds; the batch
+    is sent when the window closes or max_size items have arrived,
+    whichever comes first. handler takes the items and returns one result
+    per item, in order; a result that is an exception is raised to that
+    item's caller only, while an exception from handler itself reaches
+    every caller in the batch.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]], window: float, max_size: int):
+        self.handler = handler
+        self.window = window
+        self.max_size = max(max_size, 1)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            # A caller that gave up has a cancelled future
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "items": self.items,
+            "average_size": self.items / self.batches if self.batches else 0.0
+        }
@@ -1,15 +1,27 @@
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from dotenv import load_dotenv
 
 from .command_parser import CommandParser, ParsedCommand
 from .task_router import TaskRouter
 from .queue_manager import QueueManager
-from ..models.task import Task, TaskStatus
+from .queue_backends import DEFAULT_SERVICE
+from .ttl_cache import TTLCache
+from .admission import AdmissionController, AdmissionRejected
+from ..models.task import Task, TaskStatus, TaskPriority, TaskType
 from ..models.conversation import Conversation, ConversationMessage
 
+load_dotenv()
+
 logger = logging.getLogger(__name__)
 
 class CommandRequest(BaseModel):
@@ -17,6 +29,13 @@ class CommandRequest(BaseModel):
     user_id: Optional[int] = None
     conversation_id: Optional[int] = None
     context: Optional[Dict[str, Any]] = None
+    # Start no earlier than run_at, or delay_seconds from now
+    run_at: Optional[datetime] = None
+    delay_seconds: Optional[float] = None
+    # Finish by deadline, or within deadline_seconds of being allowed to start
+    deadline: Optional[datetime] = None
+    deadline_seconds: Optional[float] = None
+    idempotency_key: Optional[str] = None
 
 class CommandResponse(BaseModel):
     task_id: int
@@ -24,13 +43,38 @@ class CommandResponse(BaseModel):
     message: str
     estimated_completion: Optional[str] = None
 
+class BatchCommandResult(BaseModel):
+    index: int
+    task_id: Optional[int] = None
+    status: str
+    message: Optional[str] = None
+    error: Optional[str] = None
+    retry_after: Optional[int] = None
+
 class AIOrchestrator:
     def __init__(self, db: Session):
         self.db = db
         self.command_parser = CommandParser()
         self.task_router = TaskRouter(db)
-        self.queue_manager = QueueManager(db)
+        self.queue_manager = QueueManager(db, task_router=self.task_router)
         self.processing_task = None
+        # A repeated command within the window returns the original task
+        # instead of being parsed and queued again; explicit idempotency
+        # keys are honoured for longer
+        self.dedup_window = float(os.getenv("COMMAND_DEDUP_WINDOW", "600"))
+        self.idempotency_key_ttl = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+        self.recent_commands = TTLCache(
+            max_entries=int(os.getenv("COMMAND_DEDUP_MAX_ENTRIES", "10000")),
+            ttl=self.dedup_window
+        )
+        # LLM parses in flight at once for a batch submission
+        self.batch_parse_concurrency = int(os.getenv("COMMAND_BATCH_PARSE_CONCURRENCY", "8"))
+        # Load shedding; queue stats are reused for a moment so admission
+        # does not add a query to every request
+        self.admission = AdmissionController()
+        self.admission_stats_ttl = float(os.getenv("ADMISSION_STATS_TTL", "0.5"))
+        self._admission_stats: Optional[Dict[str, Any]] = None
+        self._admission_stats_expires = 0.0
 
     async def start(self):
         """
@@ -38,6 +82,9 @@ class AIOrchestrator:
         """
         logger.info("Starting AI Orchestrator")
         
+        # Requeue work left behind by a previous run
+        await self.queue_manager.recover_tasks()
+        
         # Start the queue processing
         self.processing_task = asyncio.create_task(
             self.queue_manager.start_processing()
@@ -67,10 +114,30 @@ class AIOrchestrator:
         try:
             logger.info(f"Processing command: {request.command}")
             
-            # Step 1: Parse the command
+            # Duplicates are answered before paying for a parse
+            dedup_key, window = self._dedup_key(request)
+            duplicate_id = self._find_duplicate(dedup_key, window)
+            if duplicate_id is not None:
+                return self._duplicate_response(duplicate_id)
+            
+            # Refuse before parsing if even URGENT work would be shed
+            stats = await self._load_admission_stats()
+            self.admission.check(stats, TaskPriority.URGENT)
+            
+            # Step 1: Parse the command. A streamed parse hands over the
+            # task type, priority and service first, so the task is built
+            # and admitted while the rest of the parse is still arriving
+            task = None
+            
+            def on_decision(decision: Dict[str, Any]):
+                nonlocal task
+                task = self._new_task(request, dedup_key, **decision)
+                self._admit(stats, task)
+            
             parsed_command = await self.command_parser.parse_command(
                 request.command, 
-                request.context
+                request.context,
+                on_decision=on_decision
             )
             
             # Step 2: Validate the parsed command
@@ -78,23 +145,21 @@ class AIOrchestrator:
                 raise ValueError("Invalid command structure")
             
             # Step 3: Create task record
-            task = Task(
-                title=parsed_command.title,
-                description=parsed_command.description,
-                command=request.command,
-                task_type=parsed_command.task_type,
-                priority=parsed_command.priority,
-                target_service=parsed_command.target_service,
-                service_endpoint=parsed_command.service_endpoint,
-                parameters=parsed_command.parameters,
-                user_id=request.user_id,
-                conversation_id=request.conversation_id
-            )
+            if task is None:
+                task = self._build_task(request, parsed_command, dedup_key)
+                self._admit(stats, task)
+            else:
+                self._fill_task(task, parsed_command)
             
             # Step 4: Add to queue
             success = await self.queue_manager.add_task(task)
             if not success:
+                # The unique dedup_key rejects a concurrent duplicate
+                duplicate_id = self._find_duplicate(dedup_key, window)
+                if duplicate_id is not None:
+                    return self._duplicate_response(duplicate_id)
                 raise Exception("Failed to add task to queue")
+            self.recent_commands.set(dedup_key, task.id, ttl=window)
             
             # Step 5: Log conversation message
             if request.conversation_id:
@@ -106,17 +171,316 @@ class AIOrchestrator:
             
             logger.info(f"Command processed successfully, task ID: {task.id}")
             
-            return CommandResponse(
-                task_id=task.id,
-                status="queued",
-                message=f"Task '{parsed_command.title}' has been queued for processing",
-                estimated_completion="2-5 minutes"
-            )
+            return self._queued_response(task.id, parsed_command, task.run_at)
             
+        except AdmissionRejected as e:
+            logger.warning(f"Command rejected: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error processing command: {e}")
             raise
 
+    async def process_commands(self, requests: List[CommandRequest]) -> List[BatchCommandResult]:
+        """
+        Process many commands in one go.
+
+        Duplicates are answered from the dedup window, the rest are parsed
+        with bounded concurrency, inserted in one transaction and queued
+        together. Returns one result per request, in order; a failing
+        command does not fail the others.
+        """
+        results: List[Optional[BatchCommandResult]] = [None] * len(requests)
+        keys = [self._dedup_key(request) for request in requests]
+        stats = await self._load_admission_stats()
+        self.admission.check(stats, TaskPriority.URGENT)
+        
+        # Commands repeated inside the batch are parsed once
+        first_index: Dict[str, int] = {}
+        to_parse = []
+        for index, (dedup_key, window) in enumerate(keys):
+            duplicate_id = self._find_duplicate(dedup_key, window)
+            if duplicate_id is not None:
+                results[index] = self._batch_result(index, self._duplicate_response(duplicate_id))
+            elif dedup_key not in first_index:
+                first_index[dedup_key] = index
+                to_parse.append(index)
+        
+        semaphore = asyncio.Semaphore(self.batch_parse_concurrency)
+        
+        async def parse(index: int) -> ParsedCommand:
+            async with semaphore:
+                return await self.command_parser.parse_command(
+                    requests[index].command,
+                    requests[index].context
+                )
+        
+        parsed_commands = await asyncio.gather(
+            *(parse(index) for index in to_parse),
+            return_exceptions=True
+        )
+        
+        accepted = []
+        tasks = []
+        for index, parsed_command in zip(to_parse, parsed_commands):
+            if isinstance(parsed_command, Exception):
+                logger.error(f"Error parsing batch command {index}: {parsed_command}")
+                results[index] = BatchCommandResult(index=index, status="error", error=str(parsed_command))
+            elif not self.command_parser.validate_parsed_command(parsed_command):
+                results[index] = BatchCommandResult(index=index, status="error", error="Invalid command structure")
+            else:
+                task = self._build_task(requests[index], parsed_command, keys[index][0])
+                try:
+                    self._admit(stats, task)
+                except AdmissionRejected as e:
+                    results[index] = BatchCommandResult(
+                        index=index, status="rejected", error=str(e), retry_after=e.retry_after
+                    )
+                    continue
+                accepted.append((index, parsed_command))
+                tasks.append(task)
+        
+        if accepted:
+            run_ats = [task.run_at for task in tasks]
+            task_ids = await self.queue_manager.add_tasks(tasks)
+            if task_ids is not None:
+                for (index, parsed_command), run_at, task_id in zip(accepted, run_ats, task_ids):
+                    results[index] = self._batch_result(
+                        index, self._queued_response(task_id, parsed_command, run_at)
+                    )
+                    self.recent_commands.set(keys[index][0], task_id, ttl=keys[index][1])
+            else:
+                # One bad row, such as a duplicate racing another request,
+                # fails the whole transaction; fall back to one at a time
+                for index, parsed_command in accepted:
+                    results[index] = await self._add_single(index, requests[index], parsed_command, keys[index])
+        
+        for index, (dedup_key, _) in enumerate(keys):
+            if results[index] is None:
+                original = results[first_index[dedup_key]]
+                if original.task_id is None:
+                    results[index] = original.model_copy(update={"index": index})
+                else:
+                    results[index] = BatchCommandResult(
+                        index=index,
+                        task_id=original.task_id,
+                        status="duplicate",
+                        message=f"Command was already submitted as task {original.task_id}"
+                    )
+        
+        # Log every accepted command with a single commit
+        logged = False
+        for request, result in zip(requests, results):
+            if request.conversation_id and result.task_id is not None and result.status != "duplicate":
+                self.db.add(self._conversation_message(request.conversation_id, request.command, "user"))
+                logged = True
+        if logged:
+            try:
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Error logging conversation messages: {e}")
+                self.db.rollback()
+        
+        logger.info(f"Processed batch of {len(requests)} commands")
+        return results
+
+    async def _add_single(
+        self,
+        index: int,
+        request: CommandRequest,
+        parsed_command: ParsedCommand,
+        dedup: Tuple[str, float]
+    ) -> BatchCommandResult:
+        dedup_key, window = dedup
+        task = self._build_task(request, parsed_command, dedup_key)
+        if await self.queue_manager.add_task(task):
+            self.recent_commands.set(dedup_key, task.id, ttl=window)
+            return self._batch_result(index, self._queued_response(task.id, parsed_command, task.run_at))
+        
+        duplicate_id = self._find_duplicate(dedup_key, window)
+        if duplicate_id is not None:
+            return self._batch_result(index, self._duplicate_response(duplicate_id))
+        return BatchCommandResult(index=index, status="error", error="Failed to add task to queue")
+
+    def _batch_result(self, index: int, response: CommandResponse) -> BatchCommandResult:
+        return BatchCommandResult(
+            index=index,
+            task_id=response.task_id,
+            status=response.status,
+            message=response.message
+        )
+
+    def _build_task(self, request: CommandRequest, parsed_command: ParsedCommand, dedup_key: str) -> Task:
+        task = self._new_task(
+            request,
+            dedup_key,
+            task_type=parsed_command.task_type,
+            priority=parsed_command.priority,
+            target_service=parsed_command.target_service
+        )
+        self._fill_task(task, parsed_command)
+        return task
+
+    def _new_task(
+        self,
+        request: CommandRequest,
+        dedup_key: str,
+        task_type: TaskType,
+        priority: TaskPriority,
+        target_service: str
+    ) -> Task:
+        """
+        A task with everything admission needs, before the rest of the
+        parse is known.
+        """
+        run_at = self._run_at(request)
+        return Task(
+            command=request.command,
+            task_type=task_type,
+            priority=priority,
+            target_service=target_service,
+            user_id=request.user_id,
+            conversation_id=request.conversation_id,
+            run_at=run_at,
+            deadline=self._deadline(request, run_at),
+            dedup_key=dedup_key
+        )
+
+    def _fill_task(self, task: Task, parsed_command: ParsedCommand):
+        task.title = parsed_command.title
+        task.description = parsed_command.description
+        task.service_endpoint = parsed_command.service_endpoint
+        task.parameters = parsed_command.parameters
+
+    def _queued_response(
+        self,
+        task_id: int,
+        parsed_command: ParsedCommand,
+        run_at: Optional[datetime]
+    ) -> CommandResponse:
+        if run_at is not None and run_at > datetime.utcnow():
+            return CommandResponse(
+                task_id=task_id,
+                status="scheduled",
+                message=f"Task '{parsed_command.title}' has been scheduled for {run_at.isoformat()}",
+                estimated_completion=run_at.isoformat()
+            )
+        
+        return CommandResponse(
+            task_id=task_id,
+            status="queued",
+            message=f"Task '{parsed_command.title}' has been queued for processing",
+            estimated_completion="2-5 minutes"
+        )
+
+    async def _load_admission_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self._admission_stats is None or now >= self._admission_stats_expires:
+            self._admission_stats = await self.queue_manager.load_stats()
+            self._admission_stats_expires = now + self.admission_stats_ttl
+        return self._admission_stats
+
+    def _admit(self, stats: Dict[str, Any], task: Task):
+        """
+        Apply admission control to a parsed task and count it in the cached
+        stats, so a burst inside one stats window cannot overshoot.
+        Tasks scheduled for later are not queued yet and are let through.
+        """
+        if task.run_at is not None and task.run_at > datetime.utcnow():
+            return
+        service = task.target_service or DEFAULT_SERVICE
+        self.admission.check(stats, task.priority, service)
+        stats["queue_depth"] += 1
+        if service in stats["services"]:
+            stats["services"][service]["queued"] += 1
+        else:
+            stats["services"][service] = {"queued": 1, "drain_rate": self.queue_manager.drain_rate(service)}
+
+    def _dedup_key(self, request: CommandRequest) -> Tuple[str, float]:
+        """
+        Key identifying repeats of a command, and how long repeats are
+        suppressed. An Idempotency-Key wins over the command contents.
+        """
+        if request.idempotency_key:
+            raw = f"key|{request.user_id}|{request.idempotency_key}"
+            window = self.idempotency_key_ttl
+        else:
+            normalized = " ".join(request.command.lower().split())
+            context = json.dumps(request.context or {}, sort_keys=True, default=str)
+            raw = f"command|{request.user_id}|{normalized}|{context}"
+            # The same command at another time or with another deadline is
+            # a different request. Relative delays are keyed as given, so
+            # an accidental resubmit still matches; unscheduled commands
+            # keep their old keys
+            schedule = [
+                self._naive_utc(request.run_at), request.delay_seconds,
+                self._naive_utc(request.deadline), request.deadline_seconds
+            ]
+            if any(value is not None for value in schedule):
+                raw += "|" + json.dumps(schedule, default=str)
+            window = self.dedup_window
+        return hashlib.sha256(raw.encode()).hexdigest(), window
+
+    def _find_duplicate(self, dedup_key: str, window: float) -> Optional[int]:
+        """
+        Id of the task already created for dedup_key inside its window.
+        A task whose window has passed gives up the key.
+        """
+        task_id = self.recent_commands.get(dedup_key)
+        if task_id is not None:
+            return task_id
+        
+        row = self.db.execute(
+            select(Task.id, Task.created_at).where(Task.dedup_key == dedup_key)
+        ).first()
+        if row is None:
+            return None
+        
+        age = (datetime.utcnow() - row.created_at.replace(tzinfo=None)).total_seconds()
+        if age < window:
+            self.recent_commands.set(dedup_key, row.id, ttl=window - age)
+            return row.id
+        
+        self.db.execute(
+            update(Task).where(Task.id == row.id).values(dedup_key=None)
+        )
+        self.db.commit()
+        return None
+
+    def _duplicate_response(self, task_id: int) -> CommandResponse:
+        task = self.db.get(Task, task_id)
+        status = task.status.value if task else "unknown"
+        logger.info(f"Duplicate command suppressed, returning task {task_id}")
+        return CommandResponse(
+            task_id=task_id,
+            status="duplicate",
+            message=f"Command was already submitted as task {task_id} ({status})"
+        )
+
+    def _naive_utc(self, value: Optional[datetime]) -> Optional[datetime]:
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def _run_at(self, request: CommandRequest) -> Optional[datetime]:
+        """
+        Earliest start time requested for a command, if any, in naive UTC.
+        """
+        if request.run_at is not None:
+            return self._naive_utc(request.run_at)
+        if request.delay_seconds:
+            return datetime.utcnow() + timedelta(seconds=request.delay_seconds)
+        return None
+
+    def _deadline(self, request: CommandRequest, run_at: Optional[datetime]) -> Optional[datetime]:
+        """
+        Deadline requested for a command, if any, in naive UTC.
+        """
+        if request.deadline is not None:
+            return self._naive_utc(request.deadline)
+        if request.deadline_seconds:
+            return (run_at or datetime.utcnow()) + timedelta(seconds=request.deadline_seconds)
+        return None
+
     async def get_task_status(self, task_id: int) -> Dict[str, Any]:
         """
         Get the current status of a task.
@@ -126,33 +490,64 @@ class AIOrchestrator:
             if not task:
                 raise ValueError(f"Task {task_id} not found")
             
-            return {
-                "task_id": task.id,
-                "title": task.title,
-                "status": task.status.value,
-                "created_at": task.created_at.isoformat() if task.created_at else None,
-                "started_at": task.started_at.isoformat() if task.started_at else None,
-                "completed_at": task.completed_at.isoformat() if task.completed_at else None,
-                "result": task.result,
-                "error_message": task.error_message
-            }
+            return self._task_summary(task)
             
         except Exception as e:
             logger.error(f"Error getting task status: {e}")
             raise
 
+    def _task_summary(self, task: Task) -> Dict[str, Any]:
+        return {
+            "task_id": task.id,
+            "title": task.title,
+            "status": task.status.value,
+            "created_at": task.created_at.isoformat() if task.created_at else None,
+            "started_at": task.started_at.isoformat() if task.started_at else None,
+            "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+            "run_at": task.run_at.isoformat() if task.run_at else None,
+            "deadline": task.deadline.isoformat() if task.deadline else None,
+            "result": task.result,
+            "error_message": task.error_message,
+            "attempts": task.attempts or 0
+        }
+
     async def get_queue_status(self) -> Dict[str, Any]:
         """
         Get the current status of the task queue.
         """
-        return self.queue_manager.get_queue_status()
+        return await self.queue_manager.get_queue_status()
+
+    async def get_parser_stats(self) -> Dict[str, Any]:
+        """
+        Get command parser cache metrics.
+        """
+        return self.command_parser.stats()
 
     async def cancel_task(self, task_id: int) -> bool:
         """
-        Cancel a pending task.
+        Cancel a pending or running task.
         """
         return await self.queue_manager.cancel_task(task_id)
 
+    async def reprioritize_task(self, task_id: int, priority: TaskPriority) -> bool:
+        """
+        Change the priority of a pending task.
+        """
+        return await self.queue_manager.reprioritize_task(task_id, priority)
+
+    async def get_dead_letter_tasks(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Get tasks that ran out of retries.
+        """
+        tasks = self.queue_manager.get_dead_letter_tasks(limit)
+        return [self._task_summary(task) for task in tasks]
+
+    async def redrive_dead_letter(self, task_ids: Optional[List[int]] = None) -> int:
+        """
+        Requeue dead-lettered tasks.
+        """
+        return await self.queue_manager.redrive_dead_letter(task_ids)
+
     async def get_service_health(self) -> Dict[str, bool]:
         """
         Get health status of all services.
@@ -169,18 +564,21 @@ class AIOrchestrator:
         Log a message to the conversation history.
         """
         try:
-            message = ConversationMessage(
-                conversation_id=conversation_id,
-                content=content,
-                role=role,
-                message_type="user" if role == "user" else "assistant"
-            )
+            message = self._conversation_message(conversation_id, content, role)
             self.db.add(message)
             self.db.commit()
             
         except Exception as e:
             logger.error(f"Error logging conversation message: {e}")
 
+    def _conversation_message(self, conversation_id: int, content: str, role: str) -> ConversationMessage:
+        return ConversationMessage(
+            conversation_id=conversation_id,
+            content=content,
+            role=role,
+            message_type="user" if role == "user" else "assistant"
+        )
+
     async def create_conversation(self, user_id: int, title: str = None) -> int:
         """
         Create a new conversation session.
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class ParseCache:
+    """
+    Parsed commands keyed by normalized command text, context and model.
+
+    Entries live in an in-process LRU for ttl seconds. With a path, they
+    are also written to a SQLite file so a restarted process starts warm;
+    a disk hit is copied back into memory. Values are stored as the JSON
+    of the parsed command and handed out as fresh objects, so callers can
+    change what they get without touching the cache.
+    """
+
+    def __init__(self, model_cls, max_entries: int = 10000, ttl: float = 86400.0, path: Optional[str] = None):
+        self.model_cls = model_cls
+        self.ttl = ttl
+        self.memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM parse_cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning(f"Parse cache disk tier at {path} unavailable, using memory only: {e}")
+            self._db = None
+
+    @staticmethod
+    def key(command: str, context: Optional[Dict[str, Any]], model: str) -> str:
+        normalized = " ".join(command.lower().split())
+        raw = json.dumps([normalized, context or {}, model], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return self.model_cls.model_validate_json(value)
+        if self._db is not None:
+            now = time.time()
+            try:
+                with self._lock:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM parse_cache WHERE key = ? AND expires_at > ?",
+                        (key, now)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Parse cache disk read failed: {e}")
+                row = None
+            if row is not None:
+                value, expires_at = row
+                self.memory.set(key, value, ttl=expires_at - now)
+                self.disk_hits += 1
+                return self.model_cls.model_validate_json(value)
+        self.misses += 1
+        return None
+
+    def set(self, key: str, parsed) -> None:
+        value = parsed.model_dump_json()
+        self.memory.set(key, value)
+        if self._db is not None:
+            try:
+                with self._lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO parse_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, time.time() + self.ttl)
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Parse cache disk write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "disk": self._db is not None
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,494 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Collection, Dict, Hashable, Iterable, Optional, Tuple
+
+from .fair_queue import FairQueue
+from .indexed_heap import IndexedPriorityQueue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE = "default"
+
+class QueueBackend:
+    """
+    Interface for the storage behind QueueManager.
+
+    Backends only hold task ids ordered by score (lower scores are claimed
+    first); the task rows themselves always live in the database. Each
+    target service has its own ready queue, so a claim can skip services
+    that are already at their concurrency limit. A claimed task stays
+    invisible to other consumers until it is acked, released or its
+    visibility timeout runs out. flow names who the task is for (the
+    user); backends that share fairly between flows use it, others
+    ignore it.
+    """
+
+    async def push(self, task_id: int, score: float, service: str = DEFAULT_SERVICE, flow: Hashable = None) -> None:
+        raise NotImplementedError
+
+    async def push_many(self, items: Iterable[Tuple[int, float, str, Hashable]]) -> None:
+        """
+        Queue many (task_id, score, service, flow) entries at once.
+        """
+        for task_id, score, service, flow in items:
+            await self.push(task_id, score, service, flow)
+
+    async def claim(self, exclude: Collection[str] = (), exclude_flows: Collection[Hashable] = ()) -> Optional[int]:
+        """
+        Claim the lowest-scored task id across every service not in exclude,
+        passing over tasks of the flows in exclude_flows, or return None if
+        none of them has work. Backends that do not keep flows may still
+        return a task of an excluded flow.
+        """
+        raise NotImplementedError
+
+    async def ack(self, task_id: int) -> None:
+        """
+        Mark a claimed task as done so it is never redelivered.
+        """
+        raise NotImplementedError
+
+    async def release(self, task_id: int) -> None:
+        """
+        Return a claimed task to the queue.
+        """
+        raise NotImplementedError
+
+    async def remove(self, task_id: int) -> bool:
+        """
+        Drop a queued task that has not been claimed yet.
+        """
+        raise NotImplementedError
+
+    async def reprioritize(self, task_id: int, score: float) -> bool:
+        """
+        Change the score of a queued task that has not been claimed yet.
+        """
+        raise NotImplementedError
+
+    async def requeue_expired(self) -> int:
+        """
+        Requeue claimed tasks whose visibility timeout has passed.
+        """
+        return 0
+
+    async def extend(self, task_ids: Collection[int]) -> None:
+        """
+        Push back the visibility timeout of claimed tasks that are still
+        running, so they are not redelivered while they run.
+        """
+
+    async def park(self, task_id: int, group: Hashable) -> None:
+        """
+        Set a claimed task aside in group, still queued but not claimable,
+        until unpark lets it go. Only backends where can_park is true.
+        """
+        raise NotImplementedError
+
+    async def unpark(self, group: Hashable, count: int) -> int:
+        """
+        Make the count best tasks parked in group claimable again; returns
+        how many are still parked there.
+        """
+        raise NotImplementedError
+
+    async def size(self) -> int:
+        raise NotImplementedError
+
+    async def sizes(self) -> Dict[str, int]:
+        """
+        Number of queued tasks per service.
+        """
+        raise NotImplementedError
+
+    @property
+    def can_park(self) -> bool:
+        """
+        Whether claimed tasks can be parked in this process without writing
+        to the tasks table.
+        """
+        return False
+
+    @property
+    def is_shared(self) -> bool:
+        """
+        Whether other processes can add work this process is not told about.
+        """
+        return False
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """
+        Whether the backend loses its contents on restart and must be
+        refilled from the tasks table.
+        """
+        return False
+
+    @property
+    def tracks_visibility(self) -> bool:
+        """
+        Whether the backend redelivers claimed tasks on its own once their
+        visibility timeout passes.
+        """
+        return False
+
+class InMemoryQueueBackend(QueueBackend):
+    """
+    One queue per service, local to this process.
+
+    With fair sharing each service queue is split per flow and served by
+    deficit round robin, flows weighted by weight_of; without it every
+    task is in one flow and claims follow the score alone.
+    """
+
+    def __init__(self, fair_share: bool = False, weight_of: Optional[Callable[[Hashable], float]] = None):
+        self.fair_share = fair_share
+        self.weight_of = weight_of
+        self.queues: Dict[str, FairQueue] = {}
+        self._service_of: Dict[int, str] = {}
+        # Scores of claimed tasks, so a release puts them back where they were
+        self._claimed: Dict[int, float] = {}
+        self._flow_of: Dict[int, Hashable] = {}
+        # Tasks set aside by park, per group, and the group of each
+        self._parked: Dict[Hashable, IndexedPriorityQueue] = {}
+        self._parked_in: Dict[int, Hashable] = {}
+
+    def _queue(self, service: str) -> FairQueue:
+        queue = self.queues.get(service)
+        if queue is None:
+            queue = self.queues[service] = FairQueue(self.weight_of)
+        return queue
+
+    async def push(self, task_id: int, score: float, service: str = DEFAULT_SERVICE, flow: Hashable = None) -> None:
+        flow = flow if self.fair_share else None
+        self._drop_parked(task_id)
+        self._queue(service).push(task_id, score, flow)
+        self._service_of[task_id] = service
+        self._flow_of[task_id] = flow
+
+    async def push_many(self, items: Iterable[Tuple[int, float, str, Hashable]]) -> None:
+        by_service = defaultdict(list)
+        for task_id, score, service, flow in items:
+            flow = flow if self.fair_share else None
+            self._drop_parked(task_id)
+            by_service[service].append((task_id, score, flow))
+            self._service_of[task_id] = service
+            self._flow_of[task_id] = flow
+        for service, entries in by_service.items():
+            self._queue(service).extend(entries)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return True
+
+    async def claim(self, exclude: Collection[str] = (), exclude_flows: Collection[Hashable] = ()) -> Optional[int]:
+        # Only a handful of services exist, so a linear scan of heads is
+        # cheap; within a service the head is the next flow's best task
+        best_queue = None
+        best_score = None
+        for service, queue in self.queues.items():
+            if not queue or service in exclude:
+                continue
+            head = queue.peek(exclude_flows)
+            if head is None:
+                continue
+            score = head[1]
+            if best_score is None or score < best_score:
+                best_queue, best_score = queue, score
+        if best_queue is None:
+            return None
+        task_id, score = best_queue.pop(exclude_flows)
+        self._claimed[task_id] = score
+        return task_id
+
+    async def ack(self, task_id: int) -> None:
+        self._claimed.pop(task_id, None)
+        self._service_of.pop(task_id, None)
+        self._flow_of.pop(task_id, None)
+
+    async def release(self, task_id: int) -> None:
+        score = self._claimed.pop(task_id, None)
+        if score is not None:
+            self._queue(self._service_of[task_id]).push(task_id, score, self._flow_of.get(task_id))
+
+    async def remove(self, task_id: int) -> bool:
+        service = self._service_of.get(task_id)
+        if service is None or not (self._drop_parked(task_id) or self.queues[service].remove(task_id)):
+            return False
+        del self._service_of[task_id]
+        self._flow_of.pop(task_id, None)
+        return True
+
+    async def reprioritize(self, task_id: int, score: float) -> bool:
+        group = self._parked_in.get(task_id)
+        if group is not None:
+            return self._parked[group].update(task_id, score)
+        service = self._service_of.get(task_id)
+        return service is not None and self.queues[service].update(task_id, score)
+
+    async def park(self, task_id: int, group: Hashable) -> None:
+        score = self._claimed.pop(task_id)
+        parked = self._parked.get(group)
+        if parked is None:
+            parked = self._parked[group] = IndexedPriorityQueue()
+        parked.push(task_id, score)
+        self._parked_in[task_id] = group
+
+    async def unpark(self, group: Hashable, count: int) -> int:
+        parked = self._parked.get(group)
+        if parked is None:
+            return 0
+        for _ in range(min(count, len(parked))):
+            task_id, score = parked.pop()
+            del self._parked_in[task_id]
+            self._queue(self._service_of[task_id]).push(task_id, score, self._flow_of.get(task_id))
+        if not parked:
+            del self._parked[group]
+        return len(parked)
+
+    def _drop_parked(self, task_id: int) -> bool:
+        group = self._parked_in.pop(task_id, None)
+        if group is None:
+            return False
+        parked = self._parked[group]
+        parked.remove(task_id)
+        if not parked:
+            del self._parked[group]
+        return True
+
+    async def size(self) -> int:
+        return sum(len(queue) for queue in self.queues.values()) + len(self._parked_in)
+
+    async def sizes(self) -> Dict[str, int]:
+        sizes = {service: len(queue) for service, queue in self.queues.items()}
+        for task_id in self._parked_in:
+            service = self._service_of[task_id]
+            sizes[service] = sizes.get(service, 0) + 1
+        return sizes
+
+    @property
+    def can_park(self) -> bool:
+        return True
+
+# Move the lowest-scored head of the given pending sets into the in-flight
+# set, scored by the time its visibility timeout expires
+_CLAIM_SCRIPT = """
+local best_key, best_member, best_score
+for i = 2, #KEYS do
+    local head = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+    if #head > 0 then
+        local score = tonumber(head[2])
+        if best_score == nil or score < best_score
+            or (score == best_score and head[1] < best_member) then
+            best_key, best_member, best_score = KEYS[i], head[1], score
+        end
+    end
+end
+if best_key == nil then
+    return false
+end
+redis.call('ZREM', best_key, best_member)
+redis.call('ZADD', KEYS[1], ARGV[1], best_member)
+return best_member
+"""
+
+# Move a claimed task back to its service's pending set with its original score
+_RELEASE_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[2]) == 0 then
+    return 0
+end
+local score = redis.call('HGET', KEYS[2], ARGV[2])
+local service = redis.call('HGET', KEYS[3], ARGV[2])
+redis.call('ZADD', ARGV[1] .. service, score or 0, ARGV[2])
+return 1
+"""
+
+# Drop a task that is still pending
+_REMOVE_SCRIPT = """
+local service = redis.call('HGET', KEYS[2], ARGV[2])
+if not service or redis.call('ZREM', ARGV[1] .. service, ARGV[2]) == 0 then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[2])
+redis.call('HDEL', KEYS[2], ARGV[2])
+return 1
+"""
+
+# Change the score of a task only while it is still pending
+_REPRIORITIZE_SCRIPT = """
+local service = redis.call('HGET', KEYS[2], ARGV[2])
+if not service or not redis.call('ZSCORE', ARGV[1] .. service, ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', ARGV[1] .. service, ARGV[3], ARGV[2])
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+return 1
+"""
+
+# Requeue in-flight tasks whose visibility deadline has passed
+_REQUEUE_EXPIRED_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[2], 'LIMIT', 0, ARGV[3])
+for _, member in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], member)
+    local score = redis.call('HGET', KEYS[2], member)
+    local service = redis.call('HGET', KEYS[3], member)
+    redis.call('ZADD', ARGV[1] .. service, score or 0, member)
+end
+return #expired
+"""
+
+class RedisQueueBackend(QueueBackend):
+    """
+    Queue shared by every orchestrator node pointing at the same Redis.
+
+    Pending tasks live in one sorted set per service, ordered by score.
+    Claiming moves the best head across the allowed services into an
+    in-flight sorted set scored by its visibility deadline, in one Lua
+    script so two nodes can never claim the same task. Tasks that are not
+    acked before the deadline are requeued by requeue_expired.
+
+    Scripts derive per-service keys from the task's service, so all keys
+    must live on one Redis node.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client=None,
+        prefix: str = "ai_orchestrator:queue",
+        visibility_timeout: float = 300.0,
+        requeue_batch: int = 100
+    ):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("QUEUE_MODE=redis requires the 'redis' package") from e
+            client = redis.from_url(url or "redis://localhost:6379")
+
+        self.redis = client
+        self.pending_prefix = f"{prefix}:pending:"
+        self.inflight_key = f"{prefix}:inflight"
+        self.scores_key = f"{prefix}:scores"
+        self.services_key = f"{prefix}:services"
+        self.task_services_key = f"{prefix}:task_services"
+        self.visibility_timeout = visibility_timeout
+        self.requeue_batch = requeue_batch
+        self._claim = self.redis.register_script(_CLAIM_SCRIPT)
+        self._release = self.redis.register_script(_RELEASE_SCRIPT)
+        self._remove = self.redis.register_script(_REMOVE_SCRIPT)
+        self._reprioritize = self.redis.register_script(_REPRIORITIZE_SCRIPT)
+        self._requeue_expired = self.redis.register_script(_REQUEUE_EXPIRED_SCRIPT)
+
+    @staticmethod
+    def _member(task_id: int) -> str:
+        # Zero-padded so equal scores pop in id (FIFO) order
+        return f"{task_id:012d}"
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    @property
+    def is_shared(self) -> bool:
+        return True
+
+    @property
+    def tracks_visibility(self) -> bool:
+        return True
+
+    async def _services(self):
+        return sorted(self._decode(name) for name in await self.redis.smembers(self.services_key))
+
+    async def push(self, task_id: int, score: float, service: str = DEFAULT_SERVICE, flow: Hashable = None) -> None:
+        member = self._member(task_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.sadd(self.services_key, service)
+            pipe.hset(self.scores_key, member, score)
+            pipe.hset(self.task_services_key, member, service)
+            pipe.zadd(self.pending_prefix + service, {member: score})
+            await pipe.execute()
+
+    async def push_many(self, items: Iterable[Tuple[int, float, str, Hashable]]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for task_id, score, service, _ in items:
+                member = self._member(task_id)
+                pipe.sadd(self.services_key, service)
+                pipe.hset(self.scores_key, member, score)
+                pipe.hset(self.task_services_key, member, service)
+                pipe.zadd(self.pending_prefix + service, {member: score})
+            await pipe.execute()
+
+    async def claim(self, exclude: Collection[str] = (), exclude_flows: Collection[Hashable] = ()) -> Optional[int]:
+        # Pending sets are per service only, so flows cannot be skipped here
+        pending_keys = [
+            self.pending_prefix + service
+            for service in await self._services()
+            if service not in exclude
+        ]
+        if not pending_keys:
+            return None
+        deadline = time.time() + self.visibility_timeout
+        member = await self._claim(
+            keys=[self.inflight_key, *pending_keys],
+            args=[deadline]
+        )
+        if member is None:
+            return None
+        return int(member)
+
+    async def ack(self, task_id: int) -> None:
+        member = self._member(task_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.inflight_key, member)
+            pipe.hdel(self.scores_key, member)
+            pipe.hdel(self.task_services_key, member)
+            await pipe.execute()
+
+    async def release(self, task_id: int) -> None:
+        await self._release(
+            keys=[self.inflight_key, self.scores_key, self.task_services_key],
+            args=[self.pending_prefix, self._member(task_id)]
+        )
+
+    async def remove(self, task_id: int) -> bool:
+        removed = await self._remove(
+            keys=[self.scores_key, self.task_services_key],
+            args=[self.pending_prefix, self._member(task_id)]
+        )
+        return bool(removed)
+
+    async def reprioritize(self, task_id: int, score: float) -> bool:
+        updated = await self._reprioritize(
+            keys=[self.scores_key, self.task_services_key],
+            args=[self.pending_prefix, self._member(task_id), score]
+        )
+        return bool(updated)
+
+    async def extend(self, task_ids: Collection[int]) -> None:
+        if not task_ids:
+            return
+        deadline = time.time() + self.visibility_timeout
+        # XX: only tasks still in flight, never re-adding an acked one
+        await self.redis.zadd(self.inflight_key, {self._member(task_id): deadline for task_id in task_ids}, xx=True)
+
+    async def requeue_expired(self) -> int:
+        requeued = await self._requeue_expired(
+            keys=[self.inflight_key, self.scores_key, self.task_services_key],
+            args=[self.pending_prefix, time.time(), self.requeue_batch]
+        )
+        if requeued:
+            logger.warning(f"Requeued {requeued} tasks whose visibility timeout expired")
+        return int(requeued)
+
+    async def size(self) -> int:
+        return sum((await self.sizes()).values())
+
+    async def sizes(self) -> Dict[str, int]:
+        services = await self._services()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for service in services:
+                pipe.zcard(self.pending_prefix + service)
+            counts = await pipe.execute()
+        return dict(zip(services, counts))
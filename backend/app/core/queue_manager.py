@@ -1,22 +1,173 @@
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+import os
+import socket
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+from typing import List, Optional, Dict, Any, Hashable
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
-from ..models.task import Task, TaskStatus, TaskPriority
-from datetime import datetime
-import heapq
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import desc, asc, select, update, func, or_, and_
+from ..models.task import Task, TaskStatus, TaskPriority, TaskType
+from ..models.service_config import ServiceConfig
+from .db_queue import DatabaseTaskQueue
+from .queue_backends import QueueBackend, InMemoryQueueBackend, RedisQueueBackend, DEFAULT_SERVICE
+from .concurrency import AIMDLimiter
+from .task_router import TaskRouter, ServiceCallError
+from .retry import RetryPolicy, default_retry_policy, default_retry_policies, is_retryable
+from .timer_wheel import TimerWheel
+from .task_worker import WorkerPool
+from .status_counts import StatusCounts
+from .rate_meter import RateMeter
+from .rate_limit import RateLimiter, TokenBucket
+from .ttl_cache import TTLCache
+from ..models.user import User
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Tasks in these states are never dispatched again
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED, TaskStatus.DEAD_LETTER)
+
+PRIORITY_SCORES = {
+    TaskPriority.LOW: 1.0,
+    TaskPriority.MEDIUM: 2.0,
+    TaskPriority.HIGH: 3.0,
+    TaskPriority.URGENT: 4.0
+}
+
 class QueueManager:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        queue_mode: Optional[str] = None,
+        backend: Optional[QueueBackend] = None,
+        task_router: Optional[TaskRouter] = None
+    ):
         self.db = db
+        self.task_router = task_router
+        # "memory" keeps the queue in this process, "database" shares the
+        # tasks table and "redis" shares a Redis queue between workers
+        self.queue_mode = queue_mode or os.getenv("QUEUE_MODE", "memory")
+        # Running tasks are leased to this worker; the lease is renewed by a
+        # heartbeat and any worker requeues leases that were not renewed
+        self.worker_id = os.getenv("QUEUE_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = float(os.getenv("QUEUE_LEASE_SECONDS", "60"))
+        self.leased_tasks = set()
+        self._lost_leases = set()
+        # Longest a single attempt may run before it is abandoned and retried
+        self.task_timeout = float(os.getenv("QUEUE_TASK_TIMEOUT", "300"))
+        # "inline" runs tasks on this event loop, "process" hands them to a
+        # pool of worker processes so service calls and result handling
+        # never block the API
+        self.worker_mode = os.getenv("QUEUE_WORKER_MODE", "inline")
+        self.worker_processes = int(os.getenv("QUEUE_WORKER_PROCESSES", "0")) or os.cpu_count() or 1
+        self.worker_pool: Optional[WorkerPool] = None
+        # Share each service between users by weighted round robin, so one
+        # user flooding the queue cannot starve the others; weights come
+        # from User.preferences["queue_weight"]
+        self.fair_share = os.getenv("QUEUE_FAIR_SHARE", "true").lower() == "true"
+        self._user_weights = TTLCache(max_entries=10000, ttl=300)
+        self.backend = backend or self._create_backend()
+        self.poll_interval = float(os.getenv("QUEUE_POLL_INTERVAL", "1.0"))
+        # Priority score gained per minute spent waiting in the queue
+        self.aging_rate = float(os.getenv("QUEUE_AGING_RATE", "0.1"))
+        # priority: by priority with aging; deadline: earliest deadline
+        # first, each priority level counting as some seconds of slack and
+        # tasks without a deadline given a default one
+        self.scheduling_policy = os.getenv("QUEUE_SCHEDULING_POLICY", "priority")
+        self.deadline_priority_weight = float(os.getenv("QUEUE_DEADLINE_PRIORITY_WEIGHT", "30"))
+        self.default_deadline = float(os.getenv("QUEUE_DEFAULT_DEADLINE", "300"))
+        # Drop tasks whose deadline cannot be met instead of running them
+        self.drop_late_tasks = os.getenv("QUEUE_DROP_LATE_TASKS", "true").lower() == "true"
+        self.goodput = RateMeter(window=float(os.getenv("QUEUE_GOODPUT_WINDOW", "60")))
+        self.deadline_met = 0
+        self.deadline_missed = 0
+        self.deadline_dropped = 0
         self.processing_queue = asyncio.Queue()
-        self.priority_queue = []
-        self.max_concurrent_tasks = 5
+        self.max_concurrent_tasks = int(os.getenv("QUEUE_MAX_CONCURRENT_TASKS", "10"))
         self.active_tasks = 0
+        # Per-service bulkheads so one slow service cannot take every slot;
+        # limits come from ServiceConfig.config_data["max_concurrent_tasks"]
+        self.default_service_limit = int(os.getenv("SERVICE_MAX_CONCURRENT_TASKS", "3"))
+        self.service_limits: Dict[str, int] = {}
+        self.service_active: Dict[str, int] = defaultdict(int)
+        # With adaptive concurrency an AIMD controller per service moves its
+        # limit between 1 and the bulkhead limit based on observed latency
+        # and errors. config_data["adaptive_max_concurrent_tasks"] lets a
+        # service grow past its bulkhead, never past the global ceiling
+        self.adaptive_concurrency = os.getenv("QUEUE_ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+        self.service_limiters: Dict[str, AIMDLimiter] = {}
+        self.service_adaptive_limits: Dict[str, int] = {}
+        # Token buckets per service, user and domain. Services and users
+        # out of tokens are not claimed from; a task held back by its
+        # domain is parked with the backend, or waits on a timer if the
+        # backend cannot park. None of them holds a slot.
+        self.rate_limits = RateLimiter()
+        self._rate_wakeup: Optional[asyncio.TimerHandle] = None
+        # Bucket of every group of parked tasks, keyed like the bucket
+        self._parked: Dict[Hashable, TokenBucket] = {}
+        # Smoothed call latency per service, used to estimate queue wait
+        self.service_latency: Dict[str, float] = {}
+        # Failed tasks wait out their backoff on a timer rather than in a slot
+        self.retry_policy = default_retry_policy()
+        self.retry_policies: Dict[TaskType, RetryPolicy] = default_retry_policies()
+        # Retries and tasks scheduled for later are parked here until due
+        self.timers = TimerWheel(tick=float(os.getenv("QUEUE_TIMER_TICK", "0.1")))
+        self.timer_batch_size = 500
+        # Set when a timer is added that is due before the timer loop's
+        # next wakeup, at _timers_wake_at (None while it has no timers)
+        self._timers_changed = asyncio.Event()
+        self._timers_wake_at: Optional[float] = None
+        # Task counts per status for get_queue_status, maintained on every
+        # transition and corrected from the database now and then
+        self.status_counts = StatusCounts()
+        self.status_reconcile_interval = float(os.getenv("QUEUE_STATUS_RECONCILE_INTERVAL", "60"))
         self.task_workers = []
+        # Handles to started workers by task id, so a cancel can interrupt
+        # the attempt; tasks in _cancel_requested were cancelled on purpose
+        self.running_tasks: Dict[int, asyncio.Task] = {}
+        self._cancel_requested = set()
+        self._background_tasks = set()
+        # Set whenever a task is queued or a slot frees up
+        self._wakeup = asyncio.Event()
+
+    def _create_backend(self) -> QueueBackend:
+        """
+        Build the queue backend selected by queue_mode.
+        """
+        if self.queue_mode == "database":
+            return DatabaseTaskQueue(self.db, worker_id=self.worker_id, lease_seconds=self.lease_seconds)
+        if self.queue_mode == "redis":
+            return RedisQueueBackend(
+                url=os.getenv("REDIS_URL", "redis://localhost:6379"),
+                visibility_timeout=float(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "300"))
+            )
+        return InMemoryQueueBackend(fair_share=self.fair_share, weight_of=self._user_weight)
+
+    def _user_weight(self, user_id: Optional[int]) -> float:
+        """
+        A user's share of each service relative to others, 1 by default.
+        """
+        if user_id is None:
+            return 1.0
+        weight = self._user_weights.get(user_id)
+        if weight is None:
+            weight = 1.0
+            try:
+                preferences = self.db.execute(
+                    select(User.preferences).where(User.id == user_id)
+                ).scalar()
+                if preferences and preferences.get("queue_weight") is not None:
+                    weight = float(preferences["queue_weight"])
+            except Exception as e:
+                logger.warning(f"Could not load queue weight for user {user_id}: {e}")
+            self._user_weights.set(user_id, weight)
+        return weight
 
     async def add_task(self, task: Task) -> bool:
         """
@@ -26,12 +177,27 @@ class QueueManager:
             # Set initial status
             task.status = TaskStatus.PENDING
             task.created_at = datetime.utcnow()
+            if task.deadline is not None:
+                task.deadline = self._utc(task.deadline)
+            if task.run_at is not None:
+                task.run_at = self._utc(task.run_at)
+                if task.run_at > task.created_at:
+                    # Parked on a timer until run_at
+                    task.next_attempt_at = task.run_at
             self.db.add(task)
             self.db.commit()
+            self.status_counts.transition(None, TaskStatus.PENDING)
+            
+            if task.next_attempt_at is not None:
+                self._schedule(task.id, task.next_attempt_at)
+                logger.info(f"Task {task.id} scheduled for {task.run_at.isoformat()}")
+                return True
             
             # Add to priority queue
             priority_score = self._calculate_priority_score(task)
-            heapq.heappush(self.priority_queue, (-priority_score, task.id, task))
+            await self.backend.push(task.id, self._queue_score(task), self._service_key(task), task.user_id)
+            
+            self._notify_dispatcher()
             
             logger.info(f"Task {task.id} added to queue with priority score {priority_score}")
             return True
@@ -41,66 +207,522 @@ class QueueManager:
             self.db.rollback()
             return False
 
-    def _calculate_priority_score(self, task: Task) -> float:
+    async def add_tasks(self, tasks: List[Task]) -> Optional[List[int]]:
+        """
+        Add many tasks in one transaction and push the ready ones into the
+        queue with a single bulk insert. Returns the new task ids, or None
+        if the transaction failed and nothing was added.
+        """
+        try:
+            now = datetime.utcnow()
+            for task in tasks:
+                task.status = TaskStatus.PENDING
+                task.created_at = now
+                if task.deadline is not None:
+                    task.deadline = self._utc(task.deadline)
+                if task.run_at is not None:
+                    task.run_at = self._utc(task.run_at)
+                    if task.run_at > now:
+                        task.next_attempt_at = task.run_at
+            self.db.add_all(tasks)
+            self.db.flush()
+            
+            # Read everything needed before the commit expires the objects,
+            # which would cost a SELECT per task
+            task_ids = []
+            ready = []
+            scheduled = []
+            for task in tasks:
+                task_ids.append(task.id)
+                if task.next_attempt_at is not None:
+                    scheduled.append((task.id, task.next_attempt_at))
+                else:
+                    ready.append((task.id, self._queue_score(task), self._service_key(task), task.user_id))
+            self.db.commit()
+            self.status_counts.transition(None, TaskStatus.PENDING, len(tasks))
+            
+            for task_id, due in scheduled:
+                self._schedule(task_id, due)
+            await self.backend.push_many(ready)
+            self._notify_dispatcher()
+            
+            logger.info(f"Added {len(tasks)} tasks to queue ({len(ready)} ready)")
+            return task_ids
+            
+        except Exception as e:
+            logger.error(f"Error adding tasks to queue: {e}")
+            self.db.rollback()
+            return None
+
+    def _service_key(self, task: Task) -> str:
+        """
+        Name of the ready queue and bulkhead a task belongs to.
+        """
+        return task.target_service or DEFAULT_SERVICE
+
+    def load_service_limits(self):
+        """
+        Load per-service concurrency and rate limits from the service
+        configurations.
+        """
+        try:
+            configs = self.db.query(ServiceConfig).all()
+            for config in configs:
+                config_data = config.config_data or {}
+                limit = config_data.get("max_concurrent_tasks")
+                if limit is not None:
+                    self.service_limits[config.service_name] = int(limit)
+                adaptive_limit = config_data.get("adaptive_max_concurrent_tasks")
+                if adaptive_limit is not None:
+                    self.service_adaptive_limits[config.service_name] = int(adaptive_limit)
+                rate = config_data.get("rate_limit")
+                if rate is not None:
+                    burst = config_data.get("rate_burst")
+                    self.rate_limits.set_service_limit(
+                        config.service_name,
+                        float(rate),
+                        float(burst) if burst is not None else None
+                    )
+            # Limiters created before the configurations were read keep
+            # their place but take the configured ceiling
+            for service, limiter in self.service_limiters.items():
+                limiter.max_limit = self._adaptive_max(service)
+                limiter.limit = min(limiter.limit, limiter.max_limit)
+            logger.info(f"Loaded service concurrency limits: {self.service_limits}")
+            
+        except Exception as e:
+            logger.error(f"Error loading service concurrency limits: {e}")
+
+    def _service_limit(self, service: str) -> int:
+        if self.adaptive_concurrency:
+            return self._limiter(service).current_limit
+        return self.service_limits.get(service, self.default_service_limit)
+
+    def _limiter(self, service: str) -> AIMDLimiter:
+        limiter = self.service_limiters.get(service)
+        if limiter is None:
+            limiter = self.service_limiters[service] = AIMDLimiter(
+                initial_limit=self.service_limits.get(service, self.default_service_limit),
+                max_limit=self._adaptive_max(service)
+            )
+        return limiter
+
+    def _adaptive_max(self, service: str) -> int:
+        """
+        Highest limit the service's controller may reach: its bulkhead
+        limit unless adaptive_max_concurrent_tasks says otherwise, and
+        never more than the global ceiling.
+        """
+        bulkhead = self.service_limits.get(service, self.default_service_limit)
+        return min(self.service_adaptive_limits.get(service, bulkhead), self.max_concurrent_tasks)
+
+    def _record_service_call(self, service: str, latency: float, error: Optional[Exception] = None):
+        """
+        Feed a finished service call into that service's latency estimate and
+        concurrency controller.
+        """
+        previous = self.service_latency.get(service)
+        self.service_latency[service] = latency if previous is None else 0.8 * previous + 0.2 * latency
+        
+        if not self.adaptive_concurrency:
+            return
+        if error is None:
+            overloaded = False
+        elif isinstance(error, ServiceCallError) and error.transient:
+            overloaded = True
+        elif isinstance(error, asyncio.TimeoutError):
+            overloaded = True
+        else:
+            # Errors caused by the task itself say nothing about service load
+            return
+        self._limiter(service).record(latency, overloaded=overloaded)
+
+    async def load_stats(self) -> Dict[str, Any]:
+        """
+        Queue depth plus, per service, the backlog and the rate it drains
+        at (concurrency limit / smoothed latency, None until a call has
+        been timed). Used for admission control.
+        """
+        queued = await self.backend.sizes()
+        services = {
+            service: {"queued": count, "drain_rate": self.drain_rate(service)}
+            for service, count in queued.items()
+        }
+        return {"queue_depth": sum(queued.values()), "services": services}
+
+    def drain_rate(self, service: str) -> Optional[float]:
+        """
+        Tasks per second the service is expected to complete.
+        """
+        latency = self.service_latency.get(service)
+        if not latency:
+            return None
+        return min(self._service_limit(service), self.max_concurrent_tasks) / latency
+
+    def _saturated_services(self) -> List[str]:
+        """
+        Services that have no free slot or are out of rate tokens and must
+        not be claimed from.
+        """
+        saturated = [
+            service for service, active in self.service_active.items()
+            if active >= self._service_limit(service)
+        ]
+        throttled = self.rate_limits.throttled_services()
+        if throttled:
+            saturated.extend(throttled)
+            self._wake_in(min(throttled.values()))
+        return saturated
+
+    def _throttled_users(self) -> List[Hashable]:
+        """
+        Users that are out of rate tokens; their tasks stay queued instead
+        of being claimed only to be put back.
+        """
+        throttled = self.rate_limits.throttled("user")
+        if throttled:
+            self._wake_in(min(throttled.values()))
+        return list(throttled)
+
+    def _wake_in(self, delay: float):
+        """
+        Wake the dispatcher after delay seconds, when a rate limit refills.
+        """
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        if self._rate_wakeup is not None and not self._rate_wakeup.cancelled():
+            if self._rate_wakeup.when() <= due and self._rate_wakeup.when() > loop.time():
+                return
+            self._rate_wakeup.cancel()
+        self._rate_wakeup = loop.call_at(due, self._notify_dispatcher)
+
+    def _rate_buckets(self, task: Task):
+        """
+        Token buckets a task draws from: its service's, its user's and
+        the domain of the URL it works on.
+        """
+        url = (task.parameters or {}).get("url")
+        domain = urlparse(url).hostname if isinstance(url, str) else None
+        return self.rate_limits.buckets(self._service_key(task), task.user_id, domain)
+
+    async def _hold_back(self, task: Task, buckets: List[TokenBucket], wait: float):
+        """
+        Keep a claimed task from running until its rate limits allow it.
+
+        It is parked with the empty user or domain bucket it waits on, so
+        the whole group goes back only as fast as the bucket refills and
+        nothing is written for it. Backends that cannot park, and service
+        buckets, fall back to a timer per task.
+        """
+        bucket = max(buckets, key=lambda bucket: bucket.wait_time())
+        if bucket.key is None or not self.backend.can_park:
+            await self._throttle(task, wait)
+            return
+        await self.backend.park(task.id, bucket.key)
+        self._parked[bucket.key] = bucket
+        self._wake_in(wait)
+
+    async def _release_parked(self):
+        """
+        Make as many parked tasks claimable as their buckets have tokens.
+        """
+        for key, bucket in list(self._parked.items()):
+            tokens = int(bucket.available())
+            if tokens and not await self.backend.unpark(key, tokens):
+                del self._parked[key]
+                continue
+            # Tasks stay parked; look again once the bucket has refilled
+            self._wake_in(max(bucket.wait_time(), 1 / bucket.rate))
+
+    async def _throttle(self, task: Task, wait: float):
+        """
+        Put a claimed task back on a timer until its rate limit allows it.
+        """
+        due = datetime.utcnow() + timedelta(seconds=wait)
+        task.status = TaskStatus.PENDING
+        task.started_at = None
+        task.lease_owner = None
+        task.lease_expires_at = None
+        task.next_attempt_at = due
+        self.db.commit()
+        await self.backend.ack(task.id)
+        self._schedule(task.id, due)
+
+    def _calculate_priority_score(self, task: Task, now: Optional[datetime] = None) -> float:
         """
         Calculate priority score for task ordering.
         Higher score = higher priority.
         """
-        base_score = {
-            TaskPriority.LOW: 1.0,
-            TaskPriority.MEDIUM: 2.0,
-            TaskPriority.HIGH: 3.0,
-            TaskPriority.URGENT: 4.0
-        }.get(task.priority, 2.0)
+        base_score = PRIORITY_SCORES.get(task.priority, 2.0)
         
         # Add time-based boost (older tasks get higher priority)
-        time_boost = 0.1  # Small boost per minute
-        return base_score
+        now = now or datetime.utcnow()
+        minutes_waited = max(0.0, (now - (task.run_at or task.created_at)).total_seconds() / 60)
+        return base_score + self.aging_rate * minutes_waited
+
+    def _queue_score(self, task: Task) -> float:
+        """
+        Static queue key for a task; lower keys are dispatched first.
+
+        Every queued task ages at the same rate, so ordering by the current
+        priority score is the same as ordering by
+        aging_rate * created_minutes - base_score. That key never changes
+        while the task waits, so the heap needs no periodic rebuild.
+        Scheduled tasks age from their run_at, not from when they were
+        submitted. Under the deadline policy the key is the deadline, less
+        deadline_priority_weight seconds per priority level.
+        """
+        return self._score(task.priority, task.run_at or task.created_at, task.deadline)
+
+    def _score(self, priority: TaskPriority, created_at: datetime, deadline: Optional[datetime] = None) -> float:
+        weight = PRIORITY_SCORES.get(priority, 2.0)
+        if self.scheduling_policy == "deadline":
+            if deadline is not None:
+                due = self._epoch(deadline)
+            else:
+                due = self._epoch(created_at) + self.default_deadline
+            return due - self.deadline_priority_weight * weight
+        return self.aging_rate * self._epoch(created_at) / 60 - weight
+
+    def _epoch(self, value: datetime) -> float:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    def _score_column(self, priority: TaskPriority):
+        """
+        SQL expression computing _score for one priority level, so bulk
+        reads return floats instead of datetimes to convert in Python.
+        Returns None on databases without a known epoch function.
+        """
+        queued_at = self._epoch_column(func.coalesce(Task.run_at, Task.created_at))
+        if queued_at is None:
+            return None
+        weight = PRIORITY_SCORES.get(priority, 2.0)
+        if self.scheduling_policy == "deadline":
+            due = func.coalesce(self._epoch_column(Task.deadline), queued_at + self.default_deadline)
+            return due - self.deadline_priority_weight * weight
+        return queued_at * (self.aging_rate / 60) - weight
+
+    def _epoch_column(self, column):
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            return (func.julianday(column) - 2440587.5) * 86400.0
+        if dialect == "postgresql":
+            return func.extract("epoch", column)
+        if dialect in ("mysql", "mariadb"):
+            return func.unix_timestamp(column)
+        return None
+
+    async def recover_tasks(self, page_size: int = 50000) -> int:
+        """
+        Rebuild the queue from the tasks table after a restart.
+
+        PROCESSING tasks whose lease has expired are put back to PENDING;
+        tasks still leased by a worker that died are picked up by the
+        reaper once their lease runs out. If the backend lost its contents,
+        PENDING tasks are then streamed back in, one priority level at a
+        time from URGENT down, in keyset pages of plain column tuples
+        rather than ORM objects.
+        """
+        try:
+            await self.reap_expired_leases()
+            
+            # Retries and scheduled tasks whose timers died with the
+            # previous process
+            waiting = self.db.connection().execute(
+                select(Task.id, Task.next_attempt_at).where(
+                    Task.status == TaskStatus.PENDING,
+                    Task.next_attempt_at.isnot(None)
+                )
+            ).all()
+            for task_id, next_attempt_at in waiting:
+                self._schedule(task_id, next_attempt_at)
+            
+            if not self.backend.needs_rebuild:
+                return 0
+            
+            recovered = 0
+            for priority in sorted(PRIORITY_SCORES, key=PRIORITY_SCORES.get, reverse=True):
+                score_column = self._score_column(priority)
+                entries = []
+                last_id = 0
+                while True:
+                    # Core execution skips ORM row processing entirely
+                    rows = self.db.connection().execute(
+                        select(
+                            Task.id,
+                            func.coalesce(Task.run_at, Task.created_at) if score_column is None else score_column,
+                            Task.deadline,
+                            Task.target_service,
+                            Task.user_id
+                        )
+                        .where(
+                            Task.status == TaskStatus.PENDING,
+                            Task.priority == priority,
+                            Task.next_attempt_at.is_(None),
+                            Task.id > last_id
+                        )
+                        .order_by(Task.id)
+                        .limit(page_size)
+                    ).all()
+                    if not rows:
+                        break
+                    if score_column is None:
+                        entries.extend(
+                            (task_id, self._score(priority, queued_at, deadline), service or DEFAULT_SERVICE, user_id)
+                            for task_id, queued_at, deadline, service, user_id in rows
+                        )
+                    else:
+                        entries.extend(
+                            (task_id, score, service or DEFAULT_SERVICE, user_id)
+                            for task_id, score, _, service, user_id in rows
+                        )
+                    last_id = rows[-1][0]
+                
+                # One heapify per priority level instead of a push per task
+                await self.backend.push_many(entries)
+                recovered += len(entries)
+                
+                # Let the dispatcher start on what is already queued
+                self._notify_dispatcher()
+                await asyncio.sleep(0)
+            
+            self.db.commit()
+            logger.info(f"Recovered {recovered} pending tasks into the queue")
+            return recovered
+            
+        except Exception as e:
+            logger.error(f"Error recovering tasks: {e}")
+            self.db.rollback()
+            return 0
 
     async def get_next_task(self) -> Optional[Task]:
         """
         Get the next task from the queue based on priority.
         """
         try:
-            if not self.priority_queue:
-                return None
+            while True:
+                task_id = await self.backend.claim(
+                    exclude=self._saturated_services(),
+                    exclude_flows=self._throttled_users()
+                )
+                if task_id is None:
+                    return None
                 
-            # Get highest priority task
-            _, task_id, task = heapq.heappop(self.priority_queue)
-            
-            # Verify task is still pending
-            current_task = self.db.query(Task).filter(Task.id == task_id).first()
-            if not current_task or current_task.status != TaskStatus.PENDING:
-                return await self.get_next_task()  # Try next task
+                # Skip tasks that finished or were cancelled while queued,
+                # and redeliveries of tasks another worker is still running
+                task = self.db.get(Task, task_id)
+                if task is None or task.status in FINISHED_STATUSES or self._leased_elsewhere(task):
+                    await self.backend.ack(task_id)
+                    continue
+                
+                # Running it now would only waste a slot on a late result
+                if self.drop_late_tasks and not self._can_meet_deadline(task):
+                    self._drop_late(task, "Deadline can no longer be met")
+                    await self.backend.ack(task_id)
+                    continue
                 
-            return current_task
+                return task
             
         except Exception as e:
             logger.error(f"Error getting next task: {e}")
             return None
 
+    def _leased_elsewhere(self, task: Task) -> bool:
+        """
+        Whether another worker holds a live lease on the task. Its own
+        heartbeat keeps it running; if that worker dies the lease reaper
+        requeues it.
+        """
+        return (
+            task.status == TaskStatus.PROCESSING
+            and task.lease_owner not in (None, self.worker_id)
+            and task.lease_expires_at is not None
+            and self._utc(task.lease_expires_at) > datetime.utcnow()
+        )
+
+    def _notify_dispatcher(self):
+        """
+        Wake the processing loop so it can fill any free slots.
+        """
+        self._wakeup.set()
+
     async def start_processing(self):
         """
         Start the task processing loop.
+
+        The loop sleeps on an event instead of polling, so it only runs when
+        a task is added, completed or cancelled. Each claim goes to whichever
+        service has both a free slot and queued work.
         """
         logger.info("Starting task processing queue")
+        self.load_service_limits()
+        if self.worker_mode == "process" and self.worker_pool is None:
+            self.worker_pool = WorkerPool(
+                self.worker_processes,
+                self.db.get_bind().url.render_as_string(hide_password=False)
+            )
+            logger.info(f"Started {self.worker_processes} task worker processes")
+        timer_task = asyncio.create_task(self._run_timers())
+        lease_task = asyncio.create_task(self._maintain_leases())
+        reconcile_task = asyncio.create_task(self._reconcile_status_counts())
+        try:
+            await self._dispatch_loop()
+        finally:
+            timer_task.cancel()
+            lease_task.cancel()
+            reconcile_task.cancel()
+            if self.worker_pool is not None:
+                self.worker_pool.shutdown()
+                self.worker_pool = None
+
+    async def _dispatch_loop(self):
         while True:
+            # asyncio.wait_for on 3.11, used by some Redis clients, can
+            # swallow a cancel that races its own completion; without this
+            # check a stopped loop would keep polling forever
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError()
             try:
-                # Check if we can process more tasks
-                if self.active_tasks >= self.max_concurrent_tasks:
-                    await asyncio.sleep(1)
-                    continue
+                # Clear before draining so a wakeup that arrives while we
+                # dispatch is not lost
+                self._wakeup.clear()
+                if self._parked:
+                    await self._release_parked()
                 
-                # Get next task
-                task = await self.get_next_task()
-                if not task:
-                    await asyncio.sleep(1)
-                    continue
+                # Fill every free slot with the next queued task
+                while self.active_tasks < self.max_concurrent_tasks:
+                    task = await self.get_next_task()
+                    if not task:
+                        break
+                    
+                    buckets = self._rate_buckets(task)
+                    wait = self.rate_limits.acquire(buckets)
+                    if wait > 0:
+                        await self._hold_back(task, buckets, wait)
+                        continue
+                    
+                    # Start processing task
+                    self.active_tasks += 1
+                    self.service_active[self._service_key(task)] += 1
+                    worker = asyncio.create_task(self._process_task(task))
+                    self.task_workers.append(worker)
+                    worker.add_done_callback(self.task_workers.remove)
                 
-                # Start processing task
-                self.active_tasks += 1
-                asyncio.create_task(self._process_task(task))
+                if not self.backend.is_shared:
+                    await self._wakeup.wait()
+                else:
+                    # Other processes add work we are never told about
+                    try:
+                        async with asyncio.timeout(self.poll_interval):
+                            await self._wakeup.wait()
+                    except TimeoutError:
+                        pass
+                    await self.backend.requeue_expired()
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error in task processing loop: {e}")
                 await asyncio.sleep(1)
@@ -109,58 +731,497 @@ class QueueManager:
         """
         Process a single task.
         """
+        service = self._service_key(task)
+        retry_delay = None
         try:
+            # Cancelled between being claimed and starting
+            if task.status in FINISHED_STATUSES:
+                return
+            self.running_tasks[task.id] = asyncio.current_task()
             logger.info(f"Processing task {task.id}: {task.title}")
             
-            # Update task status
+            # Update task status and take the lease
+            now = datetime.utcnow()
             task.status = TaskStatus.PROCESSING
-            task.started_at = datetime.utcnow()
+            task.started_at = now
+            task.lease_owner = self.worker_id
+            task.lease_expires_at = now + timedelta(seconds=self.lease_seconds)
+            task.attempts = (task.attempts or 0) + 1
             self.db.commit()
+            # Every claimed task was PENDING, whether the backend flipped
+            # the row while claiming it or we just did
+            self.status_counts.transition(TaskStatus.PENDING, TaskStatus.PROCESSING)
+            self.leased_tasks.add(task.id)
             
-            # Here you would call the task router to execute the task
-            # For now, we'll just simulate processing
-            await asyncio.sleep(2)  # Simulate processing time
+            call_started = time.monotonic()
+            try:
+                async with asyncio.timeout(self.task_timeout):
+                    result = await self._execute_task(task)
+            except Exception as e:
+                self._record_service_call(service, time.monotonic() - call_started, e)
+                raise
+            self._record_service_call(service, time.monotonic() - call_started)
+            
+            if self._lease_lost(task):
+                return
             
             # Mark as completed
-            task.status = TaskStatus.COMPLETED
-            task.completed_at = datetime.utcnow()
-            self.db.commit()
+            completed_at = datetime.utcnow()
+            deadline = task.deadline
+            values = {"result": result} if result is not None else {}
+            if not self._settle(task, status=TaskStatus.COMPLETED, completed_at=completed_at, **values):
+                return
+            self.status_counts.transition(TaskStatus.PROCESSING, TaskStatus.COMPLETED)
+            self._record_completion(completed_at, deadline)
             
             logger.info(f"Task {task.id} completed successfully")
             
+        except asyncio.CancelledError:
+            # Interrupted by cancel_task or because the lease was lost; the
+            # row is no longer ours to update. Anything else is a shutdown.
+            if task.id not in self._cancel_requested and task.id not in self._lost_leases:
+                raise
+            self.db.rollback()
+            logger.info(f"Task {task.id} interrupted")
+            
         except Exception as e:
             logger.error(f"Error processing task {task.id}: {e}")
-            task.status = TaskStatus.FAILED
-            task.error_message = str(e)
-            self.db.commit()
+            if not self._lease_lost(task):
+                retry_delay = self._handle_failure(task, e)
             
         finally:
+            # No interrupting from here on, the slot must be released
+            self.running_tasks.pop(task.id, None)
+            self._cancel_requested.discard(task.id)
+            self.leased_tasks.discard(task.id)
+            self._lost_leases.discard(task.id)
+            await self.backend.ack(task.id)
             self.active_tasks -= 1
+            self.service_active[service] -= 1
+            # Arm the retry only after the ack so the requeue cannot race it
+            if retry_delay is not None:
+                self._schedule(task.id, task.next_attempt_at)
+            self._notify_dispatcher()
+
+    def _settle(self, task: Task, **values) -> bool:
+        """
+        Write the outcome of this worker's attempt, but only while the row
+        is still PROCESSING under our lease: a cancel or a takeover made
+        from another node since wins. Returns whether the write happened.
+        """
+        result = self.db.execute(
+            update(Task)
+            .where(
+                Task.id == task.id,
+                Task.status == TaskStatus.PROCESSING,
+                Task.lease_owner == self.worker_id
+            )
+            .values(lease_owner=None, lease_expires_at=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        if result.rowcount != 1:
+            logger.warning(f"Task {task.id} was cancelled or taken over, discarding this attempt's outcome")
+            return False
+        # Keep the loaded task in step without marking it dirty, so no
+        # later commit writes these values again unguarded
+        for name, value in dict(values, lease_owner=None, lease_expires_at=None).items():
+            set_committed_value(task, name, value)
+        return True
+
+    def _lease_lost(self, task: Task) -> bool:
+        """
+        Whether the heartbeat found this task's lease expired and taken
+        over, in which case the other worker now owns its outcome.
+        """
+        if task.id not in self._lost_leases:
+            return False
+        logger.warning(f"Lease on task {task.id} was lost, discarding this attempt's outcome")
+        self.db.rollback()
+        return True
 
-    def get_queue_status(self) -> Dict[str, Any]:
+    async def _maintain_leases(self):
+        """
+        Renew the leases of running tasks and requeue expired ones, every
+        third of a lease so one missed beat does not lose a lease. Running
+        tasks are also kept invisible in backends with a visibility
+        timeout, beating at least three times per timeout.
+        """
+        interval = self.lease_seconds / 3
+        if self.backend.tracks_visibility:
+            interval = min(interval, self.backend.visibility_timeout / 3)
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                self.renew_leases()
+                await self.backend.extend(self.leased_tasks - self._lost_leases)
+                await self.reap_expired_leases()
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error maintaining task leases: {e}")
+                self.db.rollback()
+
+    def renew_leases(self) -> int:
+        """
+        Extend the lease on every task this worker is running. Tasks whose
+        lease was taken over in the meantime are marked as lost.
+        """
+        if not self.leased_tasks:
+            return 0
+        task_ids = list(self.leased_tasks)
+        result = self.db.execute(
+            update(Task)
+            .where(
+                Task.id.in_(task_ids),
+                Task.status == TaskStatus.PROCESSING,
+                Task.lease_owner == self.worker_id
+            )
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        
+        if result.rowcount < len(task_ids):
+            owned = set(self.db.execute(
+                select(Task.id).where(Task.id.in_(task_ids), Task.lease_owner == self.worker_id)
+            ).scalars())
+            lost = set(task_ids) - owned
+            self._lost_leases.update(lost)
+            logger.warning(f"Lost leases on tasks {sorted(lost)}")
+            # Taken over or cancelled elsewhere: stop the attempt and free its slot
+            for task_id in lost:
+                worker = self.running_tasks.get(task_id)
+                if worker is not None:
+                    worker.cancel()
+        return result.rowcount
+
+    async def reap_expired_leases(self) -> int:
+        """
+        Requeue PROCESSING tasks whose lease ran out, because their worker
+        died or stopped heartbeating.
+        """
+        now = datetime.utcnow()
+        expired = or_(
+            Task.lease_expires_at < now,
+            # Rows started before leases existed
+            and_(
+                Task.lease_expires_at.is_(None),
+                Task.started_at < now - timedelta(seconds=self.lease_seconds)
+            )
+        )
+        rows = self.db.connection().execute(
+            select(Task.id, Task.priority, Task.created_at, Task.run_at, Task.deadline, Task.target_service, Task.user_id)
+            .where(Task.status == TaskStatus.PROCESSING, expired)
+        ).all()
+        if not rows:
+            return 0
+        
+        task_ids = [row.id for row in rows]
+        result = self.db.execute(
+            update(Task)
+            .where(Task.id.in_(task_ids), Task.status == TaskStatus.PROCESSING, expired)
+            .values(status=TaskStatus.PENDING, started_at=None, lease_owner=None, lease_expires_at=None)
+        )
+        self.db.commit()
+        self.status_counts.transition(TaskStatus.PROCESSING, TaskStatus.PENDING, result.rowcount)
+        
+        await self.backend.push_many(
+            (row.id, self._score(row.priority, row.run_at or row.created_at, row.deadline), row.target_service or DEFAULT_SERVICE, row.user_id)
+            for row in rows
+        )
+        self._notify_dispatcher()
+        logger.warning(f"Requeued {len(rows)} tasks with expired leases")
+        return len(rows)
+
+    async def _reconcile_status_counts(self):
+        """
+        Periodically replace the status counters with the database's counts,
+        picking up changes made by other workers.
+        """
+        while True:
+            try:
+                self.status_counts.reconcile(self.db)
+                self.db.commit()
+                await asyncio.sleep(self.status_reconcile_interval)
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reconciling task status counts: {e}")
+                self.db.rollback()
+                await asyncio.sleep(self.status_reconcile_interval)
+
+    def _retry_policy(self, task: Task) -> RetryPolicy:
+        return self.retry_policies.get(task.task_type, self.retry_policy)
+
+    def _handle_failure(self, task: Task, error: Exception) -> Optional[float]:
+        """
+        Record a failed attempt. Returns the backoff delay if the task will be
+        retried, or None if it is finished: FAILED when the error is not worth
+        retrying, DEAD_LETTER when it ran out of attempts.
+        """
+        policy = self._retry_policy(task)
+        attempts = task.attempts or 0
+        
+        if policy.should_retry(attempts, error):
+            delay = policy.delay(attempts)
+            next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            if self.drop_late_tasks and not self._can_meet_deadline(task, next_attempt_at):
+                self._drop_late(task, f"Retry would miss the deadline: {error}", TaskStatus.PROCESSING)
+                return None
+            if not self._settle(
+                task,
+                status=TaskStatus.PENDING,
+                next_attempt_at=next_attempt_at,
+                error_message=str(error)
+            ):
+                return None
+            self.status_counts.transition(TaskStatus.PROCESSING, TaskStatus.PENDING)
+            logger.warning(
+                f"Task {task.id} attempt {attempts}/{policy.max_attempts} failed, "
+                f"retrying in {delay:.2f}s"
+            )
+            return delay
+        
+        if is_retryable(error):
+            status = TaskStatus.DEAD_LETTER
+            values = {"completed_at": datetime.utcnow()}
+        else:
+            status = TaskStatus.FAILED
+            values = {}
+        if not self._settle(task, status=status, error_message=str(error), **values):
+            return None
+        if status == TaskStatus.DEAD_LETTER:
+            logger.error(f"Task {task.id} moved to dead letter after {attempts} attempts")
+        self.status_counts.transition(TaskStatus.PROCESSING, status)
+        return None
+
+    def _can_meet_deadline(self, task: Task, start: Optional[datetime] = None) -> bool:
+        """
+        Whether a task started at start (default now) is expected to finish
+        by its deadline, going by its service's smoothed latency.
+        """
+        if task.deadline is None:
+            return True
+        expected = self.service_latency.get(self._service_key(task), 0.0)
+        start = start or datetime.utcnow()
+        return start + timedelta(seconds=expected) <= self._utc(task.deadline)
+
+    def _drop_late(self, task: Task, reason: str, previous: TaskStatus = TaskStatus.PENDING):
+        """
+        Fail a task that cannot finish in time without running it.
+        """
+        values = {"status": TaskStatus.FAILED, "error_message": reason, "completed_at": datetime.utcnow()}
+        if previous == TaskStatus.PROCESSING:
+            # A failed attempt, whose row may have been cancelled elsewhere
+            if not self._settle(task, **values):
+                return
+        else:
+            for name, value in values.items():
+                setattr(task, name, value)
+            task.lease_owner = None
+            task.lease_expires_at = None
+            self.db.commit()
+        self.status_counts.transition(previous, TaskStatus.FAILED)
+        self.deadline_dropped += 1
+        logger.warning(f"Task {task.id} dropped: {reason}")
+
+    def _record_completion(self, completed_at: datetime, deadline: Optional[datetime]):
+        """
+        Count a completed task towards goodput if it made its deadline;
+        tasks without one always do.
+        """
+        if deadline is not None:
+            if completed_at > self._utc(deadline):
+                self.deadline_missed += 1
+                return
+            self.deadline_met += 1
+        self.goodput.mark()
+
+    def _utc(self, value: datetime) -> datetime:
+        """
+        Naive UTC datetime, the form every timestamp column is written in.
+        """
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def _schedule(self, task_id: int, due: datetime):
+        """
+        Park a task on the timer wheel until due, without holding a slot.
+        """
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=timezone.utc)
+        self.timers.add(task_id, due.timestamp())
+        if self._timers_wake_at is None or due.timestamp() < self._timers_wake_at:
+            self._timers_changed.set()
+
+    async def _run_timers(self):
+        """
+        Sleep until the next occupied slot of the timer wheel is due, or
+        until a nearer timer is added, and move due tasks into the ready
+        queue in batches.
+        """
+        while True:
+            try:
+                # Clear before looking so a nearer timer added meanwhile
+                # still wakes us
+                self._timers_changed.clear()
+                self._timers_wake_at = self.timers.next_due()
+                if self._timers_wake_at is None:
+                    await self._timers_changed.wait()
+                    continue
+                delay = self._timers_wake_at - time.time()
+                if delay > 0:
+                    try:
+                        async with asyncio.timeout(delay):
+                            await self._timers_changed.wait()
+                        continue
+                    except TimeoutError:
+                        pass
+                due = self.timers.advance()
+                for start in range(0, len(due), self.timer_batch_size):
+                    await self._release_due(due[start:start + self.timer_batch_size])
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in timer loop: {e}")
+                await asyncio.sleep(1)
+
+    async def _release_due(self, task_ids: List[int]):
+        """
+        Queue a batch of tasks whose timers fired.
+        """
+        try:
+            rows = self.db.connection().execute(
+                select(Task.id, Task.priority, Task.created_at, Task.run_at, Task.deadline, Task.target_service, Task.user_id)
+                .where(Task.id.in_(task_ids), Task.status == TaskStatus.PENDING)
+            ).all()
+            if not rows:
+                return
+            
+            self.db.execute(
+                update(Task)
+                .where(Task.id.in_([row.id for row in rows]))
+                .values(next_attempt_at=None)
+            )
+            self.db.commit()
+            
+            await self.backend.push_many(
+                (row.id, self._score(row.priority, row.run_at or row.created_at, row.deadline), row.target_service or DEFAULT_SERVICE, row.user_id)
+                for row in rows
+            )
+            self._notify_dispatcher()
+            
+        except Exception as e:
+            logger.error(f"Error releasing scheduled tasks: {e}")
+            self.db.rollback()
+
+    async def _execute_task(self, task: Task) -> Optional[Dict[str, Any]]:
+        """
+        Execute the work for a task and return the service's response, or
+        None if it was already stored (worker processes write their own).
+        """
+        if self.worker_pool is not None:
+            await self.worker_pool.run(task.id)
+            return None
+        if self.task_router is None:
+            # No router configured, just simulate processing
+            await asyncio.sleep(2)
+            return None
+        self.task_router.check_service(task)
+        return await self.task_router.call_service(task)
+
+    async def get_queue_status(self) -> Dict[str, Any]:
         """
         Get current queue status and statistics.
         """
         try:
-            total_pending = self.db.query(Task).filter(Task.status == TaskStatus.PENDING).count()
-            total_processing = self.db.query(Task).filter(Task.status == TaskStatus.PROCESSING).count()
-            total_completed = self.db.query(Task).filter(Task.status == TaskStatus.COMPLETED).count()
-            total_failed = self.db.query(Task).filter(Task.status == TaskStatus.FAILED).count()
+            # Counted once, then kept current by the reconcile loop
+            if self.status_counts.reconciled_at is None:
+                self.status_counts.reconcile(self.db)
+            counts = self.status_counts
             
             return {
-                "queue_size": len(self.priority_queue),
+                "queue_mode": self.queue_mode,
+                "worker_mode": self.worker_mode,
+                "queue_size": await self.backend.size(),
+                "services": await self._service_status(),
                 "active_tasks": self.active_tasks,
                 "max_concurrent_tasks": self.max_concurrent_tasks,
-                "total_pending": total_pending,
-                "total_processing": total_processing,
-                "total_completed": total_completed,
-                "total_failed": total_failed
+                "total_pending": counts.get(TaskStatus.PENDING),
+                "total_processing": counts.get(TaskStatus.PROCESSING),
+                "total_completed": counts.get(TaskStatus.COMPLETED),
+                "total_failed": counts.get(TaskStatus.FAILED),
+                "total_dead_letter": counts.get(TaskStatus.DEAD_LETTER),
+                "scheduled_tasks": len(self.timers),
+                "scheduling_policy": self.scheduling_policy,
+                "fair_share": self.fair_share and isinstance(self.backend, InMemoryQueueBackend),
+                "goodput": self.goodput.rate(),
+                "deadline_met": self.deadline_met,
+                "deadline_missed": self.deadline_missed,
+                "deadline_dropped": self.deadline_dropped
             }
             
         except Exception as e:
             logger.error(f"Error getting queue status: {e}")
             return {}
 
+    async def reprioritize_task(self, task_id: int, priority: TaskPriority) -> bool:
+        """
+        Change the priority of a pending task in place.
+        """
+        try:
+            task = self.db.query(Task).filter(Task.id == task_id).first()
+            if not task or task.status != TaskStatus.PENDING:
+                logger.warning(f"Cannot reprioritize task {task_id} - not in pending status")
+                return False
+            
+            task.priority = priority
+            self.db.commit()
+            
+            # A task parked on a timer is scored when it is released
+            if task_id in self.timers:
+                logger.info(f"Task {task_id} reprioritized to {priority.value}")
+                return True
+            
+            # Keep the original age so the task does not lose its aging credit
+            if not await self.backend.reprioritize(task_id, self._queue_score(task)):
+                logger.warning(f"Task {task_id} is no longer queued")
+                return False
+            
+            logger.info(f"Task {task_id} reprioritized to {priority.value}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error reprioritizing task {task_id}: {e}")
+            self.db.rollback()
+            return False
+
+    async def _service_status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Queued work, running work, concurrency limit, rate limit and, with
+        adaptive concurrency, the latency signal per service.
+        """
+        queued = await self.backend.sizes()
+        services = set(queued) | set(self.service_active) | set(self.service_limits)
+        status = {}
+        for service in sorted(services):
+            status[service] = {
+                "queued": queued.get(service, 0),
+                "active": self.service_active.get(service, 0),
+                "limit": self._service_limit(service)
+            }
+            if self.adaptive_concurrency:
+                status[service].update(self._limiter(service).snapshot())
+            bucket = self.rate_limits.service_bucket(service)
+            if bucket is not None:
+                status[service].update({"rate_limit": bucket.rate, "rate_tokens": round(bucket.available(), 2)})
+        return status
+
     def get_pending_tasks(self, limit: int = 10) -> List[Task]:
         """
         Get list of pending tasks ordered by priority.
@@ -179,22 +1240,110 @@ class QueueManager:
 
     async def cancel_task(self, task_id: int) -> bool:
         """
-        Cancel a pending task.
+        Cancel a pending or running task.
+
+        A running task is marked CANCELLED and its attempt interrupted, so
+        its slot frees at once, or in process mode as soon as the worker
+        process is done with it; the service is asked to stop as well. If it
+        runs on another worker, that worker's heartbeat notices the lost
+        lease and interrupts it.
         """
         try:
             task = self.db.query(Task).filter(Task.id == task_id).first()
             if not task:
                 return False
+            
+            if task.status == TaskStatus.PROCESSING:
+                task.status = TaskStatus.CANCELLED
+                task.completed_at = datetime.utcnow()
+                task.lease_owner = None
+                task.lease_expires_at = None
+                self.db.commit()
+                self.status_counts.transition(TaskStatus.PROCESSING, TaskStatus.CANCELLED)
+                
+                worker = self.running_tasks.get(task_id)
+                if worker is not None:
+                    self._cancel_requested.add(task_id)
+                    worker.cancel()
+                self._cancel_remote(task_id, task.target_service)
+                logger.info(f"Running task {task_id} cancelled")
+                return True
                 
             if task.status == TaskStatus.PENDING:
                 task.status = TaskStatus.CANCELLED
                 self.db.commit()
+                self.status_counts.transition(TaskStatus.PENDING, TaskStatus.CANCELLED)
+                self.timers.remove(task_id)
+                await self.backend.remove(task_id)
+                self._notify_dispatcher()
                 logger.info(f"Task {task_id} cancelled")
                 return True
             else:
-                logger.warning(f"Cannot cancel task {task_id} - not in pending status")
+                logger.warning(f"Cannot cancel task {task_id} - already {task.status.value}")
                 return False
                 
         except Exception as e:
             logger.error(f"Error cancelling task {task_id}: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def _cancel_remote(self, task_id: int, service: Optional[str]):
+        """
+        Tell the service to stop working on a task, without waiting for it.
+        """
+        if self.task_router is None or not service:
+            return
+        request = asyncio.create_task(self.task_router.cancel_remote(task_id, service))
+        self._background_tasks.add(request)
+        request.add_done_callback(self._background_tasks.discard)
+
+    def get_dead_letter_tasks(self, limit: int = 50) -> List[Task]:
+        """
+        Get tasks that ran out of retries, most recent first.
+        """
+        try:
+            return self.db.query(Task).filter(
+                Task.status == TaskStatus.DEAD_LETTER
+            ).order_by(
+                desc(Task.completed_at),
+                desc(Task.id)
+            ).limit(limit).all()
+            
+        except Exception as e:
+            logger.error(f"Error getting dead letter tasks: {e}")
+            return []
+
+    async def redrive_dead_letter(self, task_ids: Optional[List[int]] = None, limit: int = 1000) -> int:
+        """
+        Put dead-lettered tasks back in the queue with a fresh retry budget.
+        Redrives the given tasks, or the oldest limit tasks if none are given.
+        """
+        try:
+            query = self.db.query(Task).filter(Task.status == TaskStatus.DEAD_LETTER)
+            if task_ids:
+                query = query.filter(Task.id.in_(task_ids))
+            tasks = query.order_by(asc(Task.completed_at), asc(Task.id)).limit(limit).all()
+            if not tasks:
+                return 0
+            
+            for task in tasks:
+                task.status = TaskStatus.PENDING
+                task.attempts = 0
+                task.next_attempt_at = None
+                task.started_at = None
+                task.completed_at = None
+            self.db.commit()
+            self.status_counts.transition(TaskStatus.DEAD_LETTER, TaskStatus.PENDING, len(tasks))
+            
+            await self.backend.push_many(
+                (task.id, self._queue_score(task), self._service_key(task), task.user_id)
+                for task in tasks
+            )
+            self._notify_dispatcher()
+            
+            logger.info(f"Redrove {len(tasks)} dead letter tasks")
+            return len(tasks)
+            
+        except Exception as e:
+            logger.error(f"Error redriving dead letter tasks: {e}")
+            self.db.rollback()
+            return 0
@@ -0,0 +1,147 @@
+import os
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .ttl_cache import TTLCache
+
+load_dotenv()
+
+class TokenBucket:
+    """
+    Allows rate events per second on average, in bursts of up to burst.
+    key names the user or domain a shared bucket belongs to.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, now: Optional[float] = None, key: Optional[Tuple[str, Hashable]] = None):
+        self.rate = rate
+        self.key = key
+        self.burst = max(burst or rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """
+        Seconds until a token is available, 0 if one is available now.
+        """
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens
+
+    def take(self, now: Optional[float] = None):
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= 1
+
+class RateLimiter:
+    """
+    Token buckets per target service and, optionally, per user and per
+    domain a task works on.
+
+    Services default to SERVICE_RATE_LIMIT calls per second and can be
+    overridden one by one; users and domains share one limit each. A rate
+    of 0 means unlimited. User and domain buckets are kept for recently
+    seen names only; an evicted bucket comes back full, which it would
+    have been anyway after being idle.
+    """
+
+    def __init__(self):
+        self.service_rate = float(os.getenv("SERVICE_RATE_LIMIT", "0"))
+        self.service_burst = float(os.getenv("SERVICE_RATE_BURST", "0")) or None
+        self.user_rate = float(os.getenv("USER_RATE_LIMIT", "0"))
+        self.user_burst = float(os.getenv("USER_RATE_BURST", "0")) or None
+        self.domain_rate = float(os.getenv("DOMAIN_RATE_LIMIT", "0"))
+        self.domain_burst = float(os.getenv("DOMAIN_RATE_BURST", "0")) or None
+        # service -> (rate, burst) overrides from the service configurations
+        self.service_limits: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._service_buckets: Dict[str, TokenBucket] = {}
+        self._buckets = TTLCache(max_entries=100000, ttl=3600)
+        # User and domain buckets left empty by acquire, until they refill
+        self._empty: Dict[Tuple[str, Hashable], TokenBucket] = {}
+
+    def set_service_limit(self, service: str, rate: float, burst: Optional[float] = None):
+        self.service_limits[service] = (rate, burst)
+        self._service_buckets.pop(service, None)
+
+    def service_bucket(self, service: str) -> Optional[TokenBucket]:
+        rate, burst = self.service_limits.get(service, (self.service_rate, self.service_burst))
+        if rate <= 0:
+            return None
+        bucket = self._service_buckets.get(service)
+        if bucket is None:
+            bucket = self._service_buckets[service] = TokenBucket(rate, burst)
+        return bucket
+
+    def _shared_bucket(self, scope: str, name, rate: float, burst: Optional[float]) -> Optional[TokenBucket]:
+        if rate <= 0 or name is None:
+            return None
+        bucket = self._buckets.get((scope, name))
+        if bucket is None:
+            bucket = TokenBucket(rate, burst, key=(scope, name))
+            self._buckets.set((scope, name), bucket)
+        return bucket
+
+    def buckets(self, service: str, user_id: Optional[int] = None, domain: Optional[str] = None) -> List[TokenBucket]:
+        """
+        Every bucket a call to service for this user and domain draws from.
+        """
+        buckets = [
+            self.service_bucket(service),
+            self._shared_bucket("user", user_id, self.user_rate, self.user_burst),
+            self._shared_bucket("domain", domain, self.domain_rate, self.domain_burst)
+        ]
+        return [bucket for bucket in buckets if bucket is not None]
+
+    def acquire(self, buckets: Iterable[TokenBucket], now: Optional[float] = None) -> float:
+        """
+        Take a token from every bucket if all have one and return 0;
+        otherwise take nothing and return how long to wait.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = list(buckets)
+        wait = max((bucket.wait_time(now) for bucket in buckets), default=0.0)
+        if wait == 0:
+            for bucket in buckets:
+                bucket.take(now)
+        for bucket in buckets:
+            if bucket.key is not None and bucket.wait_time(now) > 0:
+                self._empty[bucket.key] = bucket
+        return wait
+
+    def throttled_services(self, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Services whose bucket is empty, with the seconds until it refills.
+        """
+        now = time.monotonic() if now is None else now
+        throttled = {}
+        for service, bucket in self._service_buckets.items():
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                throttled[service] = wait
+        return throttled
+
+
+    def throttled(self, scope: str, now: Optional[float] = None) -> Dict[Hashable, float]:
+        """
+        Users or domains (scope "user" or "domain") whose bucket is empty,
+        with the seconds until it refills.
+        """
+        now = time.monotonic() if now is None else now
+        throttled = {}
+        for key, bucket in list(self._empty.items()):
+            wait = bucket.wait_time(now)
+            if wait == 0:
+                del self._empty[key]
+            elif key[0] == scope:
+                throttled[key[1]] = wait
+        return throttled
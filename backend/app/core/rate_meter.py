@@ -0,0 +1,27 @@
+import time
+from collections import deque
+from typing import Optional
+
+class RateMeter:
+    """
+    Events per second over a sliding window.
+    """
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._events: deque = deque()
+
+    def mark(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self._events.append(now)
+        self._trim(now)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        return len(self._events) / self.window
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        while self._events and self._events[0] <= cutoff:
+            self._events.popleft()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import random
+from typing import Dict, Optional
+
+from ..models.task import TaskType
+from .task_router import ServiceCallError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class RetryPolicy:
+    """
+    How often, and how long apart, a failed task is attempted again.
+
+    Delays grow exponentially from base_delay up to max_delay and use full
+    jitter (a uniform draw between zero and the capped delay), so tasks that
+    failed together against the same overloaded service do not all come
+    back at the same moment.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        multiplier: float = 2.0
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def should_retry(self, attempts: int, error: Exception) -> bool:
+        """
+        Whether a task that has now run attempts times should run again.
+        """
+        return attempts < self.max_attempts and is_retryable(error)
+
+    def delay(self, attempts: int, rng: Optional[random.Random] = None) -> float:
+        """
+        Seconds to wait before the next attempt after attempts failures.
+        """
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** max(0, attempts - 1))
+        return (rng or random).uniform(0, cap)
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Timeouts and transient service errors are retried; anything else is a
+    problem with the task itself and would fail the same way again.
+    """
+    if isinstance(error, ServiceCallError):
+        return error.transient
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=int(os.getenv("TASK_MAX_ATTEMPTS", "5")),
+        base_delay=float(os.getenv("TASK_RETRY_BASE_DELAY", "1.0")),
+        max_delay=float(os.getenv("TASK_RETRY_MAX_DELAY", "60.0"))
+    )
+
+def default_retry_policies() -> Dict[TaskType, RetryPolicy]:
+    """
+    Per task type overrides of the default policy.
+    """
+    default = default_retry_policy()
+    return {
+        # Sending twice is worse than not sending, so give up sooner
+        TaskType.COMMUNICATION: RetryPolicy(
+            max_attempts=min(default.max_attempts, 3),
+            base_delay=default.base_delay * 2,
+            max_delay=default.max_delay
+        ),
+        # Media jobs are slow and their services recover slowly
+        TaskType.MEDIA_PROCESSING: RetryPolicy(
+            max_attempts=default.max_attempts,
+            base_delay=default.base_delay * 5,
+            max_delay=default.max_delay * 5
+        ),
+    }
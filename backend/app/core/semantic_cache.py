@@ -0,0 +1,220 @@
+import json
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Values the LLM copies from the command into parameters. They are masked
+# out before embedding, so commands differing only in them match, and
+# carried over from the new command on a hit.
+_SLOT_PATTERN = re.compile(
+    r"(?P<url>https?://\S+)"
+    r"|(?P<email>[\w.+-]+@[\w-]+\.[\w.-]+)"
+    r"|\"(?P<quoted>[^\"]*)\""
+    r"|(?P<number>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))"
+)
+
+# Words that do not change what a command asks for
+_FILLER_WORDS = frozenset({
+    "a", "an", "the", "please", "kindly", "now", "asap", "just", "can", "could",
+    "would", "will", "you", "me", "i", "my", "our", "quickly", "right", "away"
+})
+
+def extract_slots(command: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    The command with slot values replaced by their kind, and the
+    (kind, value) slots in order of appearance.
+    """
+    slots = []
+
+    def mask(match):
+        kind = match.lastgroup
+        slots.append((kind, match.group(kind)))
+        return f" <{kind}> "
+
+    masked = _SLOT_PATTERN.sub(mask, command)
+    return " ".join(masked.lower().split()), slots
+
+def content_words(masked: str) -> frozenset:
+    """
+    The words of a masked command that carry meaning, crudely stemmed.
+    """
+    words = set()
+    for word in masked.split():
+        word = word.strip(",.!?;:")
+        if not word or word in _FILLER_WORDS:
+            continue
+        for suffix in ("ing", "ed", "es", "s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)]
+                break
+        words.add(word)
+    return frozenset(words)
+
+class SemanticCache:
+    """
+    Parsed commands looked up by similarity instead of exact text.
+
+    Commands are embedded with hashed character trigrams and words, which
+    needs no model or network, into rows of one matrix; a lookup is a
+    single matrix-vector product giving the cosine similarity to every
+    entry. Only entries with the same context and model are candidates.
+
+    Trigram vectors barely tell "archive the sales report" from "delete
+    the sales report", so the closest candidates at or above threshold
+    are checked in turn and one is used only if it has the same content
+    words, ignoring filler words, word order and plurals, and the same
+    kinds of slots. It is reused with the new command's slots (URLs,
+    emails, quoted text and numbers) swapped in.
+
+    The matrix is a ring: once max_entries is reached the oldest entry is
+    overwritten.
+    """
+
+    def __init__(self, model_cls, max_entries: int = 10000, threshold: float = 0.92,
+                 ttl: float = 86400.0, dim: int = 256):
+        self.model_cls = model_cls
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dim = dim
+        # Closest entries checked for a word match before giving up
+        self.candidates = 8
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._scopes = np.zeros(0, dtype=np.int64)
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._entries: List[Optional[Tuple[str, List[Tuple[str, str]], frozenset]]] = []
+        self._next = 0
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def embed(self, masked: str) -> np.ndarray:
+        padded = f" {masked} "
+        features = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        features.extend(masked.split())
+        indices = [zlib.crc32(feature.encode()) % self.dim for feature in features]
+        vector = np.bincount(indices, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _scope(context: Optional[Dict[str, Any]], model: str) -> int:
+        raw = json.dumps([context or {}, model], sort_keys=True, default=str)
+        return zlib.crc32(raw.encode())
+
+    def _grow(self):
+        capacity = min(self.max_entries, max(1024, 2 * len(self._entries)))
+        extra = capacity - len(self._entries)
+        self._vectors = np.vstack([self._vectors, np.zeros((extra, self.dim), dtype=np.float32)])
+        self._scopes = np.concatenate([self._scopes, np.zeros(extra, dtype=np.int64)])
+        self._expires = np.concatenate([self._expires, np.zeros(extra)])
+        self._entries.extend([None] * extra)
+
+    def get(self, command: str, context: Optional[Dict[str, Any]], model: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        masked, slots = extract_slots(command)
+        if self._size:
+            # Rows fill from the top, so the first _size rows are in use
+            n = self._size
+            similarity = self._vectors[:n] @ self.embed(masked)
+            similarity[(self._scopes[:n] != self._scope(context, model)) | (self._expires[:n] <= now)] = -1.0
+            candidates = np.argpartition(-similarity, min(self.candidates, n) - 1)[:self.candidates]
+            words = content_words(masked)
+            kinds = [kind for kind, _ in slots]
+            for row in sorted(candidates, key=lambda row: -similarity[row]):
+                if similarity[row] < self.threshold:
+                    break
+                value, cached_slots, cached_words = self._entries[row]
+                if cached_words == words and [kind for kind, _ in cached_slots] == kinds:
+                    parsed = self._fill(
+                        self.model_cls.model_validate_json(value), cached_slots, slots, float(similarity[row])
+                    )
+                    if parsed is not None:
+                        self.hits += 1
+                        return parsed
+        self.misses += 1
+        return None
+
+    def set(self, command: str, context: Optional[Dict[str, Any]], model: str, parsed,
+            now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        masked, slots = extract_slots(command)
+        if self._next >= len(self._entries):
+            if len(self._entries) < self.max_entries:
+                self._grow()
+            else:
+                self._next = 0
+        row = self._next
+        self._vectors[row] = self.embed(masked)
+        self._scopes[row] = self._scope(context, model)
+        self._expires[row] = now + self.ttl
+        self._entries[row] = (parsed.model_dump_json(), slots, content_words(masked))
+        self._next += 1
+        self._size = min(self._size + 1, self.max_entries)
+
+    def _fill(self, parsed, old_slots, new_slots, similarity: float):
+        """
+        Swap the cached command's slot values for the new command's and
+        scale confidence by how close the match was. Returns None if the
+        swap is ambiguous: one cached value standing for two new ones.
+        """
+        # Unchanged slots map to themselves so that nothing inside them
+        # (a number in a URL) is replaced on its own
+        swaps: Dict[str, Tuple[str, str]] = {}
+        for (kind, old), (_, new) in zip(old_slots, new_slots):
+            if not old:
+                # An empty quote cannot be found again to be replaced
+                if new:
+                    return None
+                continue
+            if swaps.setdefault(old, (kind, new))[1] != new:
+                return None
+        changed = any(old != new for old, (_, new) in swaps.items())
+
+        # Every slot in one pass, so a value swapped in is never swapped
+        # again; longest first so a value inside another is replaced as
+        # part of the longer one
+        pattern = re.compile("|".join(
+            rf"(?<![\w.]){re.escape(old)}(?![\w.])" if kind == "number" else re.escape(old)
+            for old, (kind, _) in sorted(swaps.items(), key=lambda swap: len(swap[0]), reverse=True)
+        )) if changed else None
+
+        def replace(value):
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [replace(item) for item in value]
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, (int, float)):
+                for old, (kind, new) in swaps.items():
+                    if kind == "number" and float(old) == value:
+                        return float(new) if "." in new else int(new)
+                return value
+            if isinstance(value, str):
+                return pattern.sub(lambda match: swaps[match.group()][1], value)
+            return value
+
+        if changed:
+            parsed.title = replace(parsed.title)
+            parsed.description = replace(parsed.description)
+            parsed.parameters = replace(parsed.parameters)
+        parsed.confidence = parsed.confidence * similarity
+        return parsed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,47 @@
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.task import Task, TaskStatus
+
+class StatusCounts:
+    """
+    Number of tasks in each status, kept in memory.
+
+    QueueManager moves a task between counters whenever it commits a
+    status change, so reading them costs nothing. Changes it does not see
+    (other workers, failed commits, manual edits) are corrected by
+    reconcile, one GROUP BY over the status index.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self.reconciled_at: Optional[float] = None
+
+    def transition(self, old: Optional[TaskStatus], new: TaskStatus, count: int = 1):
+        """
+        Move count tasks from old to new; old is None for new tasks.
+        """
+        if old == new or count <= 0:
+            return
+        if old is not None:
+            self._counts[old] -= count
+        self._counts[new] += count
+
+    def reconcile(self, db: Session):
+        """
+        Replace the counters with the true counts from the database.
+        """
+        rows = db.execute(select(Task.status, func.count()).group_by(Task.status)).all()
+        self._counts = Counter({status: count for status, count in rows if status is not None})
+        self.reconciled_at = time.monotonic()
+
+    def get(self, status: TaskStatus) -> int:
+        # Drift between reconciles must never show as a negative count
+        return max(self._counts[status], 0)
+
+    def snapshot(self) -> Dict[TaskStatus, int]:
+        return {status: self.get(status) for status in TaskStatus}
@@ -11,6 +11,24 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+class ServiceCallError(Exception):
+    """
+    A downstream service call failed.
+
+    transient is set for timeouts, connection errors, 429 and 5xx
+    responses, which usually mean the service is overloaded or briefly
+    unavailable rather than that the task itself is bad.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, transient: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = transient
+
+    def __reduce__(self):
+        # Keep status_code and transient when raised from a worker process
+        return (self.__class__, (str(self), self.status_code, self.transient))
+
 class TaskRouter:
     def __init__(self, db: Session):
         self.db = db
@@ -27,50 +45,20 @@ class TaskRouter:
         Route a task to the appropriate service and return the response.
         """
         try:
-            # Get service configuration
-            service_config = self._get_service_config(task.target_service)
-            if not service_config or not service_config.is_active:
-                raise ValueError(f"Service {task.target_service} is not available or inactive")
+            self.check_service(task)
 
             # Update task status
             task.status = TaskStatus.PROCESSING
             self.db.commit()
 
-            # Route to service
-            service_url = self._get_service_url(task.target_service)
-            endpoint = task.service_endpoint or self._get_default_endpoint(task.target_service)
-            
-            # Prepare request payload
-            payload = {
-                "task_id": task.id,
-                "command": task.command,
-                "parameters": task.parameters or {},
-                "priority": task.priority.value
-            }
-
-            # Make request to service
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{service_url}/{endpoint}",
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    task.result = result
-                    task.status = TaskStatus.COMPLETED
-                    logger.info(f"Task {task.id} completed successfully")
-                    return result
-                else:
-                    error_msg = f"Service returned error: {response.status_code} - {response.text}"
-                    task.error_message = error_msg
-                    task.status = TaskStatus.FAILED
-                    logger.error(f"Task {task.id} failed: {error_msg}")
-                    raise Exception(error_msg)
+            result = await self.call_service(task)
+            task.result = result
+            task.status = TaskStatus.COMPLETED
+            logger.info(f"Task {task.id} completed successfully")
+            return result
 
         except Exception as e:
-            task.status = TaskStatus.FAILED
+            # The queue manager decides between retrying and failing the task
             task.error_message = str(e)
             logger.error(f"Error routing task {task.id}: {e}")
             raise
@@ -78,6 +66,51 @@ class TaskRouter:
         finally:
             self.db.commit()
 
+    def check_service(self, task: Task):
+        """
+        Raise if the task's service is not configured or inactive.
+        """
+        service_config = self._get_service_config(task.target_service)
+        if not service_config or not service_config.is_active:
+            raise ValueError(f"Service {task.target_service} is not available or inactive")
+
+    async def call_service(self, task: Task) -> Dict[str, Any]:
+        """
+        Send a task to its service and return the response, without
+        writing anything to the task row.
+        """
+        service_url = self._get_service_url(task.target_service)
+        endpoint = task.service_endpoint or self._get_default_endpoint(task.target_service)
+        
+        # Prepare request payload
+        payload = {
+            "task_id": task.id,
+            "command": task.command,
+            "parameters": task.parameters or {},
+            "priority": task.priority.value
+        }
+
+        # Make request to service
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            try:
+                response = await client.post(
+                    f"{service_url}/{endpoint}",
+                    json=payload,
+                    headers={"Content-Type": "application/json"}
+                )
+            except httpx.TimeoutException as e:
+                raise ServiceCallError(f"Service {task.target_service} timed out", transient=True) from e
+            except httpx.TransportError as e:
+                raise ServiceCallError(f"Service {task.target_service} unreachable: {e}", transient=True) from e
+            
+            if response.status_code != 200:
+                raise ServiceCallError(
+                    f"Service returned error: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                    transient=response.status_code == 429 or response.status_code >= 500
+                )
+            return response.json()
+
     def _get_service_config(self, service_name: str) -> Optional[ServiceConfig]:
         """
         Get service configuration from database.
@@ -105,6 +138,24 @@ class TaskRouter:
         }
         return endpoints.get(service_name, "execute")
 
+    async def cancel_remote(self, task_id: int, service_name: str) -> bool:
+        """
+        Ask a service to stop work it is doing for a task. Best effort:
+        services without a cancel endpoint simply finish the work.
+        """
+        try:
+            service_url = self._get_service_url(service_name)
+            if not service_url:
+                return False
+
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.post(f"{service_url}/cancel", json={"task_id": task_id})
+                return response.status_code == 200
+
+        except Exception as e:
+            logger.warning(f"Cancel request for task {task_id} to {service_name} failed: {e}")
+            return False
+
     async def check_service_health(self, service_name: str) -> bool:
         """
         Check if a service is healthy and responding.
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..models.task import Task, TaskStatus
+from .task_router import TaskRouter
+
+logger = logging.getLogger(__name__)
+
+# Session factory of the current worker process, set by init_worker
+_session_factory: Optional[sessionmaker] = None
+
+def init_worker(database_url: str):
+    """
+    Open this worker process's own database connection pool.
+    """
+    global _session_factory
+    connect_args = {"check_same_thread": False, "timeout": 30} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def run_task(task_id: int) -> None:
+    """
+    Execute one task inside a worker process: call its service and store
+    the response on the row. Errors are raised back to the dispatcher.
+
+    The row is only written while it is still PROCESSING under the lease
+    the attempt started with, so a cancel or a lease taken over while the
+    call ran is never overwritten.
+    """
+    db = _session_factory()
+    try:
+        task = db.get(Task, task_id)
+        if task is None:
+            raise ValueError(f"Task {task_id} not found")
+        if task.status == TaskStatus.CANCELLED:
+            return
+        owner = task.lease_owner
+        router = TaskRouter(db)
+        try:
+            router.check_service(task)
+            result = asyncio.run(router.call_service(task))
+        except Exception as e:
+            _store(db, task_id, owner, error_message=str(e))
+            raise
+        # The dispatcher marks the task completed, with the same guard
+        if not _store(db, task_id, owner, result=result):
+            logger.info(f"Task {task_id} was cancelled or taken over, dropping its result")
+    finally:
+        db.close()
+
+def _store(db: Session, task_id: int, owner: Optional[str], **values) -> bool:
+    """
+    Write values to the task row if owner still holds it; returns whether
+    it did.
+    """
+    result = db.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.status == TaskStatus.PROCESSING, Task.lease_owner == owner)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+class WorkerPool:
+    """
+    Pool of worker processes that execute claimed tasks.
+
+    Only the task id crosses the process boundary on the way in and only
+    success or an exception on the way out; each worker loads the task,
+    makes the service call and writes the (possibly large) result with its
+    own database connection, so none of that work runs on the API's loop.
+    """
+
+    def __init__(self, size: int, database_url: str, target: Callable[[int], None] = run_task):
+        self.size = size
+        self.target = target
+        # Spawned workers do not inherit the parent's event loop or sockets
+        self.executor = ProcessPoolExecutor(
+            max_workers=size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(database_url,)
+        )
+
+    async def run(self, task_id: int) -> None:
+        """
+        Run a task in a worker process and wait for it.
+
+        A worker process cannot be interrupted, so a cancel only returns
+        once the process has finished with the task; the caller keeps its
+        slot until then and the service never sees more calls than slots.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self.target, task_id)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            if not future.cancelled():
+                # Its outcome is moot now, but must not be logged as unretrieved
+                future.exception()
+            raise
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,175 @@
+import math
+import time
+from typing import Dict, Hashable, List, Optional
+
+class TimerWheel:
+    """
+    Hierarchical hashed timing wheel for parking items until a due time.
+
+    Time is cut into ticks of tick seconds. Level 0 has 2**slot_bits
+    slots, one per tick, and each level above covers 2**slot_bits times
+    the span of the one below. Adding or removing an
+    item is O(1) whatever the number of timers. As time advances, a slot
+    in a higher level is cascaded into the levels below when its span
+    begins, so every item is moved at most once per level. Items come out
+    no earlier than their due time and at most one tick later.
+    """
+
+    def __init__(self, tick: float = 0.1, slot_bits: int = 8, levels: int = 4, now: Optional[float] = None):
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self._mask = (1 << slot_bits) - 1
+        self._origin = time.time() if now is None else now
+        self._current = 0
+        # Each slot maps item -> due tick, so cascading knows where it goes
+        self._wheels: List[List[Dict[Hashable, int]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        # Items due beyond the top level's span wait here until it wraps
+        self._overflow: Dict[Hashable, int] = {}
+        # item -> the slot dict holding it, for O(1) removal
+        self._where: Dict[Hashable, Dict[Hashable, int]] = {}
+        self._due: List[Hashable] = []
+
+    def __len__(self) -> int:
+        return len(self._where) + len(self._due)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._where or item in self._due
+
+    def add(self, item: Hashable, due: float) -> None:
+        """
+        Park item until the wall-clock time due, replacing any earlier timer.
+        """
+        if item in self._where:
+            self.remove(item)
+        self._place(item, math.ceil((due - self._origin) / self.tick))
+
+    def remove(self, item: Hashable) -> bool:
+        slot = self._where.pop(item, None)
+        if slot is not None:
+            del slot[item]
+            return True
+        if item in self._due:
+            self._due.remove(item)
+            return True
+        return False
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """
+        Move the wheel up to now and return every item that has come due.
+
+        The wheel jumps from one occupied slot or cascade to the next, so
+        the cost does not depend on how far away the timers are.
+        """
+        target = self._tick_at(time.time() if now is None else now)
+        wheels = self._wheels
+        where = self._where
+        mask = self._mask
+        due = []
+        while self._current < target:
+            current = self._next_event() if where else None
+            if current is None or current > target:
+                self._current = target
+                break
+            self._current = current
+
+            # Higher levels only start a new slot when level 0 wraps
+            if not current & mask:
+                self._cascade(current)
+
+            slot = wheels[0][current & mask]
+            if slot:
+                due.extend(slot)
+                for item in slot:
+                    del where[item]
+                slot.clear()
+
+        if self._due:
+            due.extend(self._due)
+            self._due = []
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """
+        Wall-clock time before which advance will return nothing, or None
+        if no timers are set.
+
+        It is when the next occupied slot fires or is cascaded, after which
+        the answer moves on to where its items landed. Advancing to exactly
+        this time always reaches that tick.
+        """
+        if self._due:
+            return self._origin + self._current * self.tick
+        tick = self._next_event() if self._where else None
+        if tick is None:
+            return None
+        at = self._origin + tick * self.tick
+        # Rounding can put origin + tick * self.tick just before the tick
+        while self._tick_at(at) < tick:
+            at = math.nextafter(at, math.inf)
+        return at
+
+    def _tick_at(self, now: float) -> int:
+        return math.floor((now - self._origin) / self.tick)
+
+    def _next_event(self) -> Optional[int]:
+        """
+        The next tick after the current one at which an occupied slot fires
+        (level 0) or is cascaded (higher levels and the overflow).
+
+        Items on a level all lie within the current span of the level above,
+        so the first level with an occupied slot ahead has the answer; it
+        comes before the next boundary of any higher level. Each level costs
+        at most one round of slots.
+        """
+        for level in range(self.levels):
+            shift = self.slot_bits * level
+            position = self._current >> shift
+            wheel = self._wheels[level]
+            for step in range(1, self._mask + 1):
+                if wheel[(position + step) & self._mask]:
+                    return (position + step) << shift
+        if self._overflow:
+            shift = self.slot_bits * self.levels
+            return ((self._current >> shift) + 1) << shift
+        return None
+
+    def _cascade(self, current: int) -> None:
+        """
+        Redistribute every higher-level slot whose span starts at current,
+        from the top down, so entries moved into a lower slot that starts at
+        this same tick are cascaded again right away.
+        """
+        where = self._where
+        for level in range(self.levels - 1, 0, -1):
+            shift = self.slot_bits * level
+            if current & ((1 << shift) - 1):
+                continue
+            if level == self.levels - 1 and self._overflow:
+                pending, self._overflow = self._overflow, {}
+                for item, tick in pending.items():
+                    del where[item]
+                    self._place(item, tick)
+            slot = self._wheels[level][(current >> shift) & self._mask]
+            if slot:
+                entries = list(slot.items())
+                slot.clear()
+                for item, tick in entries:
+                    del where[item]
+                    self._place(item, tick)
+
+    def _place(self, item: Hashable, tick: int) -> None:
+        if tick <= self._current:
+            self._due.append(item)
+            return
+        # The highest bit where the due tick and the current tick differ
+        # picks the level whose span still contains both
+        level = ((tick ^ self._current).bit_length() - 1) // self.slot_bits
+        if level >= self.levels:
+            slot = self._overflow
+        else:
+            slot = self._wheels[level][(tick >> (self.slot_bits * level)) & self._mask]
+        slot[item] = tick
+        self._where[item] = slot
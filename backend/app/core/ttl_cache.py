@@ -0,0 +1,46 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class TTLCache:
+    """
+    Bounded in-memory map whose entries expire ttl seconds after they are set.
+
+    Once max_entries is reached the least recently used entry is evicted, so
+    memory stays flat however many distinct keys pass through.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, value), oldest use first
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None, now: Optional[float] = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        now = time.monotonic() if now is None else now
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._entries[key] = (now + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,4 +1,4 @@
-from .database import Base, engine, SessionLocal
+from .database import Base, engine, SessionLocal, upgrade_schema
 from .task import Task
 from .user import User
 from .conversation import Conversation, ConversationMessage
@@ -8,6 +8,7 @@ __all__ = [
     "Base",
     "engine", 
     "SessionLocal",
+    "upgrade_schema",
     "Task",
     "User", 
     "Conversation",
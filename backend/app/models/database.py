@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Enum, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -26,6 +26,46 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class
 Base = declarative_base()
 
+def upgrade_schema(bind=engine):
+    """
+    Bring tables created by an older version up to date with the models.
+
+    create_all only creates missing tables, so an existing database lacks
+    the columns added since and every insert naming them fails. This adds
+    those columns, the indexes that go with them and new values of
+    PostgreSQL enum types. Nothing is ever dropped or altered. Run it
+    after create_all, with every model imported.
+    """
+    dialect = bind.dialect
+    with bind.begin() as conn:
+        existing_tables = set(inspect(conn).get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}"
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if not column.nullable and default is not None:
+                    # Existing rows need a value; unique constraints come
+                    # with the column's index below
+                    ddl += f" NOT NULL DEFAULT {default!r}"
+                conn.execute(text(ddl))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        if dialect.name == "postgresql":
+            # New members of a native enum must be added to its type
+            for table in Base.metadata.sorted_tables:
+                for column in table.columns:
+                    if isinstance(column.type, Enum) and column.type.native_enum:
+                        for value in column.type.enums:
+                            conn.execute(text(
+                                f"ALTER TYPE {column.type.name} ADD VALUE IF NOT EXISTS '{value}'"
+                            ))
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
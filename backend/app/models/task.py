@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -10,6 +10,7 @@ class TaskStatus(enum.Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    DEAD_LETTER = "dead_letter"  # Ran out of retries; kept for inspection and redrive
 
 class TaskPriority(enum.Enum):
     LOW = "low"
@@ -27,13 +28,19 @@ class TaskType(enum.Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Queue recovery walks pending tasks one priority at a time
+        Index("ix_tasks_status_priority_id", "status", "priority", "id"),
+        # The reaper looks for PROCESSING tasks with expired leases
+        Index("ix_tasks_status_lease_expires_at", "status", "lease_expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text)
     command = Column(Text, nullable=False)  # Original natural language command
     task_type = Column(Enum(TaskType), nullable=False)
-    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING)
+    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, index=True)
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
     
     # Service routing
@@ -45,11 +52,26 @@ class Task(Base):
     result = Column(JSON)  # Service response
     error_message = Column(Text)
     
+    # Duplicate suppression: hash of the Idempotency-Key, or of the user,
+    # normalized command and context; cleared once the dedup window passes
+    dedup_key = Column(String(64), unique=True, index=True)
+    
+    # Leases: the worker running the task renews lease_expires_at while it
+    # runs; an expired lease is requeued
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime(timezone=True))
+    
+    # Retries
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True))  # Set while parked on a timer (retry backoff or future run_at)
+    
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
+    run_at = Column(DateTime(timezone=True))  # Do not start before this time
+    deadline = Column(DateTime(timezone=True))  # Worthless if not finished by this time
     
     # Relationships
     user_id = Column(Integer, ForeignKey("users.id"))
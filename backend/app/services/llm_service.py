@@ -1,7 +1,7 @@
 import os
 import json
 import aiohttp
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,6 +39,38 @@ class LLMService:
         Returns:
             Dictionary containing the API response
         """
+        payload, headers = self._chat_request(messages, model, temperature, max_tokens, **kwargs)
+        
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=headers,
+                    json=payload
+                ) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        return result
+                    else:
+                        error_text = await response.text()
+                        logger.error(f"OpenRouter API error: {response.status} - {error_text}")
+                        raise Exception(f"OpenRouter API error: {response.status} - {error_text}")
+                        
+        except Exception as e:
+            logger.error(f"Error calling OpenRouter API: {str(e)}")
+            raise
+    
+    def _chat_request(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+        **kwargs
+    ):
+        """
+        Payload and headers for a chat completion request
+        """
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable is required")
             
@@ -61,6 +93,31 @@ class LLMService:
             "HTTP-Referer": "https://github.com/saichaitanyarestaurant-ctrl/promoziva",
             "X-Title": "Promoziva AI Orchestrator"
         }
+        return payload, headers
+    
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send a streaming chat completion request to OpenRouter
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model to use (defaults to OPENROUTER_MODEL env var)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            **kwargs: Additional parameters to pass to the API
+            
+        Yields:
+            Each server-sent chunk as it arrives; the text is in
+            choices[0]["delta"]["content"] and the last chunk carries usage
+        """
+        payload, headers = self._chat_request(messages, model, temperature, max_tokens, stream=True, **kwargs)
         
         try:
             async with aiohttp.ClientSession() as session:
@@ -69,16 +126,23 @@ class LLMService:
                     headers=headers,
                     json=payload
                 ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
-                    else:
+                    if response.status != 200:
                         error_text = await response.text()
                         logger.error(f"OpenRouter API error: {response.status} - {error_text}")
                         raise Exception(f"OpenRouter API error: {response.status} - {error_text}")
+                    
+                    async for line in response.content:
+                        line = line.decode("utf-8").strip()
+                        # Blank lines separate events and ": ..." lines are keep-alive comments
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        yield json.loads(data)
                         
         except Exception as e:
-            logger.error(f"Error calling OpenRouter API: {str(e)}")
+            logger.error(f"Error streaming from OpenRouter API: {str(e)}")
             raise
     
     async def get_response_text(
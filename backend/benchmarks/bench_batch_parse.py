@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tokens per command and throughput of micro-batched parsing against a
+local mock LLM server.
+
+The mock speaks the OpenRouter chat completions API on localhost and is
+reached through the real LLMService. It counts a token per 4 characters
+and answers after REQUEST_OVERHEAD plus time per prompt and completion
+token, serving at most SERVER_CONCURRENCY requests at once like a rate
+limited provider. COMMANDS distinct commands are parsed by CLIENTS
+concurrent callers for each batch setting; 1 means batching off.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web
+
+from app.core.command_parser import CommandParser
+from app.core.micro_batcher import MicroBatcher
+from app.services.llm_service import llm_service
+
+COMMANDS = 400
+CLIENTS = 64
+BATCH_SIZES = [1, 4, 8, 16]
+WINDOW = 0.02
+REQUEST_OVERHEAD = 0.15
+PROMPT_TOKEN_TIME = 0.00002
+COMPLETION_TOKEN_TIME = 0.002
+SERVER_CONCURRENCY = 8
+
+
+def tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def reply_for(command: str) -> dict:
+    return {
+        "task_type": "document_management",
+        "title": command[:40],
+        "description": f"Create the document requested: {command}",
+        "priority": "medium",
+        "target_service": "document_service",
+        "service_endpoint": "process",
+        "parameters": {"document": command.split()[-1]},
+        "confidence": 0.9,
+    }
+
+
+def mock_app():
+    slots = asyncio.Semaphore(SERVER_CONCURRENCY)
+
+    async def chat_completions(request):
+        body = await request.json()
+        prompt = body["messages"][1]["content"]
+        if "Commands: " in prompt:
+            commands = [item["command"] for item in json.loads(prompt.split("Commands: ", 1)[1])]
+            content = json.dumps([reply_for(command) for command in commands])
+        else:
+            content = json.dumps(reply_for(prompt.split("Parse this command: ", 1)[1]))
+        prompt_tokens = sum(tokens(message["content"]) for message in body["messages"])
+        completion_tokens = tokens(content)
+        async with slots:
+            await asyncio.sleep(
+                REQUEST_OVERHEAD + prompt_tokens * PROMPT_TOKEN_TIME + completion_tokens * COMPLETION_TOKEN_TIME
+            )
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+        })
+
+    app = web.Application()
+    app.router.add_post("/chat/completions", chat_completions)
+    return app
+
+
+async def run(batch_size: int):
+    parser = CommandParser()
+    parser.fast_path = parser.cache = parser.semantic_cache = None
+    parser.batcher = MicroBatcher(parser._complete_batch, window=WINDOW, max_size=batch_size) if batch_size > 1 else None
+    commands = iter(f"create a status document for project {i} team {i * 7 % 13}" for i in range(COMMANDS))
+
+    async def client():
+        for command in commands:
+            await parser.parse_command(command)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(CLIENTS)))
+    return parser.stats(), time.perf_counter() - started
+
+
+async def main():
+    runner = web.AppRunner(mock_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    llm_service.base_url = f"http://127.0.0.1:{port}"
+    llm_service.api_key = "mock"
+
+    print(f"{COMMANDS} commands from {CLIENTS} clients, mock LLM serving {SERVER_CONCURRENCY} requests at once")
+    try:
+        for batch_size in BATCH_SIZES:
+            stats, elapsed = await run(batch_size)
+            print(f"  batch {batch_size:>2}  LLM calls {stats['llm_calls']:4d}  "
+                  f"tokens/command {stats['tokens_per_parse']:6.0f}  "
+                  f"throughput {COMMANDS / elapsed:6.1f} commands/s  "
+                  f"latency {stats['llm_latency']:.2f}s per call")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /commands:batch against the same commands sent one by one
+to POST /command.
+
+Requests go through the FastAPI app in process, against a file-backed
+SQLite database. The LLM parse is replaced by a stub that sleeps for
+LLM_LATENCY seconds, so the numbers show what batching saves in HTTP
+round trips, parse fan-out and commits; it is run once with a simulated
+LLM and once with an instant one to separate the two.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import routes
+from app.core.command_parser import ParsedCommand
+from app.core.orchestrator import AIOrchestrator
+from app.models import Base
+from app.models.task import TaskPriority, TaskType
+
+COMMANDS = 500
+LLM_LATENCIES = [0.02, 0.0]
+
+
+class StubParser:
+    def __init__(self, latency):
+        self.latency = latency
+
+    async def parse_command(self, command, context=None, on_decision=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ParsedCommand(
+            task_type=TaskType.BROWSER_AUTOMATION,
+            title=command,
+            description=command,
+            priority=TaskPriority.MEDIUM,
+            target_service="browser_service",
+            service_endpoint="execute",
+            parameters={},
+            confidence=0.9,
+        )
+
+    def validate_parsed_command(self, parsed_command):
+        return True
+
+
+def make_client(db_path, latency):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    orchestrator = AIOrchestrator(db)
+    orchestrator.command_parser = StubParser(latency)
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/v1")
+    app.dependency_overrides[routes.get_orchestrator] = lambda: orchestrator
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench"), db, engine
+
+
+async def run(latency, tmp):
+    commands = [{"command": f"open report {i}", "user_id": 1} for i in range(COMMANDS)]
+
+    client, db, engine = make_client(os.path.join(tmp, f"sequential-{latency}.db"), latency)
+    async with client:
+        started = time.perf_counter()
+        for body in commands:
+            response = await client.post("/api/v1/command", json=body)
+            assert response.status_code == 200, response.text
+        sequential = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+
+    client, db, engine = make_client(os.path.join(tmp, f"batch-{latency}.db"), latency)
+    async with client:
+        started = time.perf_counter()
+        response = await client.post("/api/v1/commands:batch", json={"commands": commands})
+        batch = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        assert response.json()["accepted"] == COMMANDS
+    db.close()
+    engine.dispose()
+
+    print(f"LLM latency {latency * 1000:.0f}ms, {COMMANDS} commands")
+    print(f"  sequential /command  {sequential:6.2f}s  {COMMANDS / sequential:8.0f} commands/s")
+    print(f"  /commands:batch      {batch:6.2f}s  {COMMANDS / batch:8.0f} commands/s")
+    print(f"  speedup              {sequential / batch:6.1f}x")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for latency in LLM_LATENCIES:
+            await run(latency, tmp)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the database-backed queue with several worker processes.
+
+Seeds a shared backlog of PENDING tasks, then lets 1, 2, 4 and 8 worker
+processes drain it with QueueManager in database mode. Each task simulates
+a short downstream call. Reports tasks/second and checks that no task ran
+twice.
+
+Uses a temporary SQLite file by default; set BENCH_DATABASE_URL to run the
+same benchmark against Postgres.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+
+from app.core.queue_manager import QueueManager
+from app.models import Base
+from app.models.task import Task, TaskPriority, TaskStatus, TaskType
+
+BACKLOG_SIZE = 2000
+WORK_SECONDS = 0.005
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+class BenchQueueManager(QueueManager):
+    def __init__(self, db, executed):
+        super().__init__(db, queue_mode="database")
+        self.executed = executed
+        self.poll_interval = 0.05
+
+    async def _execute_task(self, task: Task):
+        self.executed.append(task.id)
+        await asyncio.sleep(WORK_SECONDS)
+
+
+async def drain(database_url: str):
+    engine = create_engine(database_url, connect_args={"timeout": 30} if database_url.startswith("sqlite") else {})
+    executed = []
+    with Session(engine) as db:
+        queue = BenchQueueManager(db, executed)
+        loop_task = asyncio.create_task(queue.start_processing())
+        while True:
+            await asyncio.sleep(0.05)
+            if queue.active_tasks == 0 and queue.backend.pending_count() == 0:
+                break
+        loop_task.cancel()
+    engine.dispose()
+    return executed
+
+
+def worker_main(database_url: str, results):
+    results.put(asyncio.run(drain(database_url)))
+
+
+def seed(engine):
+    with Session(engine) as db:
+        db.execute(delete(Task))
+        priorities = list(TaskPriority)
+        db.add_all([
+            Task(
+                title=f"Bench task {i}",
+                command="bench",
+                task_type=TaskType.GENERAL,
+                priority=priorities[i % len(priorities)],
+                status=TaskStatus.PENDING,
+                target_service="browser_service",
+            )
+            for i in range(BACKLOG_SIZE)
+        ])
+        db.commit()
+
+
+def run(database_url: str, workers: int):
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    seed(engine)
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker_main, args=(database_url, results))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    executed = []
+    for _ in processes:
+        executed.extend(results.get())
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    duplicates = [task_id for task_id, count in Counter(executed).items() if count > 1]
+    print(f"{workers} worker(s): {len(executed)} tasks in {elapsed:.2f}s "
+          f"= {len(executed) / elapsed:.0f} tasks/s, duplicates={len(duplicates)}")
+    assert len(executed) == BACKLOG_SIZE and not duplicates
+
+
+def main():
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    tmpdir = None
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{tmpdir.name}/bench_queue.db"
+
+    print(f"Draining {BACKLOG_SIZE} tasks ({WORK_SECONDS * 1000:.0f}ms each) from {database_url.split('://')[0]}")
+    for workers in WORKER_COUNTS:
+        run(database_url, workers)
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Simulate one user flooding the queue and report each user's p99 wait,
+with and without fair sharing between users.
+
+A discrete-event simulation on a virtual clock: WORKERS workers take
+SERVICE_TIME per task and claim from InMemoryQueueBackend with the
+scores QueueManager gives under the priority policy. The flooding user
+queues FLOOD_TASKS at once; light users each submit a task every
+LIGHT_INTERVAL seconds on average.
+"""
+
+import asyncio
+import heapq
+import random
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.queue_backends import InMemoryQueueBackend
+from app.core.queue_manager import PRIORITY_SCORES
+from app.models.task import TaskPriority
+
+WORKERS = 8
+SERVICE_TIME = 0.1
+FLOOD_TASKS = 20_000
+LIGHT_USERS = 5
+LIGHT_INTERVAL = 2.0
+DURATION = 200.0
+AGING_RATE = 0.1
+
+
+def arrivals():
+    rng = random.Random(42)
+    events = [(0.0, "flood", TaskPriority.MEDIUM) for _ in range(FLOOD_TASKS)]
+    for user in range(1, LIGHT_USERS + 1):
+        t = rng.expovariate(1 / LIGHT_INTERVAL)
+        while t < DURATION:
+            events.append((t, f"light-{user}", TaskPriority.MEDIUM))
+            t += rng.expovariate(1 / LIGHT_INTERVAL)
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+async def simulate(fair_share: bool):
+    backend = InMemoryQueueBackend(fair_share=fair_share)
+    events = arrivals()
+    submitted = {}
+    waits = defaultdict(list)
+    workers = [0.0] * WORKERS
+    next_event = 0
+
+    while next_event < len(events) or await backend.size():
+        now = heapq.heappop(workers)
+        if not await backend.size() and events[next_event][0] > now:
+            # Idle until the next arrival
+            now = events[next_event][0]
+        batch = []
+        while next_event < len(events) and events[next_event][0] <= now:
+            arrived_at, user, priority = events[next_event]
+            score = AGING_RATE * arrived_at / 60 - PRIORITY_SCORES[priority]
+            batch.append((next_event, score, "browser_service", user))
+            submitted[next_event] = (arrived_at, user)
+            next_event += 1
+        await backend.push_many(batch)
+
+        task_id = await backend.claim()
+        await backend.ack(task_id)
+        arrived_at, user = submitted.pop(task_id)
+        waits[user].append(now - arrived_at)
+        heapq.heappush(workers, now + SERVICE_TIME)
+    return waits
+
+
+def p99(samples):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+async def main():
+    print(f"{WORKERS} workers x {SERVICE_TIME * 1000:.0f}ms, 'flood' queues {FLOOD_TASKS} tasks at t=0, "
+          f"{LIGHT_USERS} light users submit one every {LIGHT_INTERVAL:.0f}s")
+    results = {label: await simulate(fair) for label, fair in (("single queue", False), ("fair share", True))}
+    print(f"  {'user':<10} {'tasks':>6} " + " ".join(f"{label + ' p99':>18}" for label in results))
+    for user in sorted(results["single queue"]):
+        tasks = len(results["single queue"][user])
+        print(f"  {user:<10} {tasks:>6} " + " ".join(f"{p99(waits[user]):>17.2f}s" for waits in results.values()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Latency of the rule-based fast path and the share of a sample command mix
+it answers without the LLM.
+
+Also compares keyword matching with the trie-factored regex against a
+plain alternation of the same keywords.
+"""
+
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.fast_path import FastPathClassifier, INTENT_KEYWORDS, trie_pattern
+
+ROUNDS = 2000
+
+COMMANDS = [
+    "Take a screenshot of https://example.com/dashboard",
+    "open example.com",
+    "go to https://news.ycombinator.com asap",
+    'click "#submit" on https://example.com/login',
+    "scrape '.price' from shop.example.com/item/4",
+    "visit https://status.example.com",
+    "capture https://grafana.example.com/d/latency",
+    "open https://a.com and take a screenshot",
+    "fill in the signup form on https://example.com",
+    "email the weekly report to the finance team",
+    "create a google sheet with q3 sales by region",
+    "transcribe yesterday's all-hands recording",
+    "build a support bot for the pricing page",
+    "take a screenshot of the dashboard",
+    "design an instagram post in canva for the launch",
+    "call the customer back about their refund",
+]
+
+
+def timed(fn, argument):
+    samples = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn(argument)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    classifier = FastPathClassifier()
+    answered = [command for command in COMMANDS if classifier.classify(command) is not None]
+    latency = statistics.mean(timed(classifier.classify, command) for command in COMMANDS)
+
+    keywords = [keyword for words in INTENT_KEYWORDS.values() for keyword in words]
+    trie = re.compile(rf"\b(?:{trie_pattern(keywords)})\b")
+    plain = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) + r")\b")
+    text = " ".join(COMMANDS).lower()
+    assert sorted(trie.findall(text)) == sorted(plain.findall(text))
+
+    print(f"{len(answered)}/{len(COMMANDS)} sample commands answered without the LLM")
+    print(f"  classify            {latency:7.1f}us per command")
+    print(f"  keywords, trie      {timed(trie.findall, text):7.1f}us per {len(text)} chars")
+    print(f"  keywords, plain     {timed(plain.findall, text):7.1f}us per {len(text)} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for IndexedPriorityQueue at 100k and 1M queued entries.
+
+Times bulk push, in-place reprioritize, removal (as done on cancel) and
+draining pops, and compares removal against the old approach of leaving
+stale entries in a heapq heap for pop to skip.
+"""
+
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.indexed_heap import IndexedPriorityQueue
+
+SIZES = [100_000, 1_000_000]
+TOUCHED_FRACTION = 0.1
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<14} {count:>9} ops  {elapsed:7.2f}s  {elapsed / count * 1e6:6.2f}us/op")
+
+
+def bench_indexed(size, keys, touched):
+    queue = IndexedPriorityQueue()
+
+    def push():
+        for item, key in enumerate(keys):
+            queue.push(item, key)
+
+    def reprioritize():
+        for item in touched:
+            queue.update(item, -keys[item])
+
+    def remove():
+        for item in touched:
+            queue.remove(item)
+
+    def pop():
+        while queue:
+            queue.pop()
+
+    print(f"IndexedPriorityQueue, {size} entries")
+    timed("push", size, push)
+    timed("reprioritize", len(touched), reprioritize)
+    timed("remove", len(touched), remove)
+    timed("pop", size - len(touched), pop)
+
+
+def bench_lazy_heapq(size, keys, touched):
+    heap = []
+    removed = set()
+
+    def push():
+        for item, key in enumerate(keys):
+            heapq.heappush(heap, (key, item))
+
+    def remove():
+        removed.update(touched)
+
+    def pop():
+        while heap:
+            _, item = heapq.heappop(heap)
+            if item in removed:
+                continue
+
+    print(f"heapq with lazy deletion, {size} entries")
+    timed("push", size, push)
+    timed("remove", len(touched), remove)
+    timed("pop", size, pop)
+
+
+def main():
+    rng = random.Random(42)
+    for size in SIZES:
+        keys = [rng.random() for _ in range(size)]
+        touched = rng.sample(range(size), int(size * TOUCHED_FRACTION))
+        bench_indexed(size, keys, touched)
+        bench_lazy_heapq(size, keys, touched)
+        print()
+
+
+if __name__ == "__main__":
+    main()
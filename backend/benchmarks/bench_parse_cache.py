@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure CommandParser.parse_command on cache hits.
+
+The LLM call is replaced by a stub answering at once, and the fast path
+and semantic cache are off, so every miss is a parse and the miss column
+shows only our own overhead; a real OpenRouter round-trip adds seconds on
+top. Hits are timed from the in-memory tier and, after a simulated
+restart, from the SQLite tier.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.command_parser import CommandParser, ParsedCommand
+from app.core.parse_cache import ParseCache
+from app.services.llm_service import llm_service
+
+COMMANDS = 2000
+
+RESPONSE = json.dumps({
+    "task_type": "browser_automation",
+    "title": "Take a screenshot",
+    "description": "Take a screenshot of the dashboard",
+    "priority": "medium",
+    "target_service": "browser_service",
+    "service_endpoint": "execute",
+    "parameters": {"url": "https://example.com/dashboard"},
+    "confidence": 0.95,
+})
+
+
+async def chat_completion(messages, **kwargs):
+    return {"choices": [{"message": {"content": RESPONSE}}]}
+
+
+async def timed(parser, commands):
+    samples = []
+    for command in commands:
+        started = time.perf_counter()
+        await parser.parse_command(command)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+async def main():
+    llm_service.chat_completion = chat_completion
+    commands = [f"take a screenshot of dashboard {i}" for i in range(COMMANDS)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "parse_cache.db")
+        parser = CommandParser()
+        # Only the exact cache: these commands differ in one number, so the
+        # semantic cache would answer every miss after the first, and the
+        # fast path would answer them all without a parse
+        parser.fast_path = parser.semantic_cache = parser.batcher = None
+        parser.streaming = False
+        parser.cache = ParseCache(ParsedCommand, path=path)
+        miss = await timed(parser, commands)
+        memory_hit = await timed(parser, commands)
+        parser.cache.close()
+
+        # A fresh process finds only the SQLite tier
+        parser.cache = ParseCache(ParsedCommand, path=path)
+        disk_hit = await timed(parser, commands)
+        stats = parser.cache.stats()
+        parser.cache.close()
+
+    print(f"{COMMANDS} distinct commands, LLM stubbed out")
+    print(f"  miss (parse + store, no LLM)  {miss:8.1f}us")
+    print(f"  memory hit                    {memory_hit:8.1f}us")
+    print(f"  disk hit after restart        {disk_hit:8.1f}us")
+    print(f"  after restart: {stats['disk_hits']} disk hits, hit rate {stats['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
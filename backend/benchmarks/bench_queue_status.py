@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /queue/status against a large tasks table.
+
+Fills a temporary SQLite database with 10M tasks by default (pass another
+row count as the first argument), mostly finished as in a long-running
+deployment, then compares:
+
+  - the old per-status COUNT(*) queries the endpoint used to run
+  - one GROUP BY status, which is what a reconcile costs
+  - the endpoint itself, answering from the in-memory counters
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api import routes
+from app.core.orchestrator import AIOrchestrator
+from app.models import Base
+from app.models.task import Task, TaskStatus
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+ENDPOINT_CALLS = 200
+QUERY_CALLS = 3
+
+# Share of rows per status, in thousandths
+STATUS_MIX = [
+    (TaskStatus.COMPLETED, 900),
+    (TaskStatus.FAILED, 40),
+    (TaskStatus.PENDING, 40),
+    (TaskStatus.PROCESSING, 5),
+    (TaskStatus.DEAD_LETTER, 10),
+    (TaskStatus.CANCELLED, 5),
+]
+
+
+def seed(engine):
+    """Generate the rows inside SQLite; pushing 10M rows through Python takes minutes."""
+    bounds = []
+    upper = 0
+    for status, share in STATUS_MIX:
+        upper += share
+        bounds.append(f"WHEN n % 1000 < {upper} THEN '{status.name}'")
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n + 1 < {ROWS})
+            INSERT INTO tasks (title, command, task_type, status, priority, target_service, attempts, created_at)
+            SELECT 'Bench task', 'bench', 'GENERAL', CASE {' '.join(bounds)} END, 'MEDIUM',
+                   'browser_service', 1, datetime('now')
+            FROM seq
+        """))
+
+
+def old_counts(db):
+    """What get_queue_status used to run on every call."""
+    return {
+        status: db.query(Task).filter(Task.status == status).count()
+        for status in (
+            TaskStatus.PENDING,
+            TaskStatus.PROCESSING,
+            TaskStatus.COMPLETED,
+            TaskStatus.FAILED,
+            TaskStatus.DEAD_LETTER,
+        )
+    }
+
+
+def timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        seed(engine)
+        print(f"Seeded {ROWS:,} tasks in {time.perf_counter() - started:.1f}s")
+
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        orchestrator = AIOrchestrator(db)
+        counts = orchestrator.queue_manager.status_counts
+
+        old = timed(lambda: old_counts(db), QUERY_CALLS)
+        reconcile = timed(lambda: counts.reconcile(db), QUERY_CALLS)
+        assert {status: counts.get(status) for status in old_counts(db)} == old_counts(db)
+
+        app = FastAPI()
+        app.include_router(routes.router, prefix="/api/v1")
+        app.dependency_overrides[routes.get_orchestrator] = lambda: orchestrator
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            samples = []
+            for _ in range(ENDPOINT_CALLS):
+                started = time.perf_counter()
+                response = await client.get("/api/v1/queue/status")
+                samples.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+            assert response.json()["total_completed"] == counts.get(TaskStatus.COMPLETED)
+        endpoint = statistics.median(samples)
+
+        print(f"  per-status COUNT(*) x5        {old * 1000:10.1f}ms")
+        print(f"  GROUP BY status (reconcile)   {reconcile * 1000:10.1f}ms")
+        print(f"  GET /queue/status (counters)  {endpoint * 1000:10.2f}ms  (p99 {sorted(samples)[int(len(samples) * 0.99)] * 1000:.2f}ms)")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
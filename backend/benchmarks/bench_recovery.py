@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Measure queue recovery time after a restart.
+
+Fills a temporary SQLite database with PENDING tasks (1M by default) and
+times QueueManager.recover_tasks rebuilding the in-memory queue from it.
+Pass a different row count as the first argument.
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.core.queue_manager import QueueManager
+from app.models import Base
+from app.models.task import Task, TaskPriority, TaskStatus, TaskType
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+CHUNK = 50_000
+
+
+def seed(engine):
+    rng = random.Random(1)
+    priorities = list(TaskPriority)
+    services = ["browser_service", "document_service", "media_service"]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, ROWS, CHUNK):
+            conn.execute(insert(Task), [
+                {
+                    "title": "Recovered task",
+                    "command": "bench",
+                    "task_type": TaskType.GENERAL,
+                    "status": TaskStatus.PENDING,
+                    "priority": rng.choice(priorities),
+                    "target_service": rng.choice(services),
+                    "created_at": now - timedelta(seconds=rng.randint(0, 86400)),
+                }
+                for _ in range(min(CHUNK, ROWS - start))
+            ])
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{tmpdir}/bench_recovery.db")
+        Base.metadata.create_all(bind=engine)
+
+        started = time.perf_counter()
+        seed(engine)
+        print(f"Seeded {ROWS} pending tasks in {time.perf_counter() - started:.1f}s")
+
+        with Session(engine) as db:
+            queue = QueueManager(db, queue_mode="memory")
+            started = time.perf_counter()
+            recovered = await queue.recover_tasks()
+            elapsed = time.perf_counter() - started
+            print(f"Recovered {recovered} tasks in {elapsed:.2f}s "
+                  f"({recovered / elapsed:,.0f} rows/s)")
+            assert await queue.backend.size() == ROWS
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Hit rate and lookup latency of SemanticCache with 100k cached commands.
+
+Cached commands are generated as verb x object x qualifier, each with a
+number slot. Queries are either paraphrases of a cached command (filler
+words added or dropped, different slot values), which should hit the
+entry with the same verb, object and qualifier, or commands using a verb
+never cached, which should miss. Lookups scan the whole matrix, so their
+latency is bound by memory bandwidth and scales with entries x DIM.
+"""
+
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.command_parser import ParsedCommand
+from app.core.semantic_cache import SemanticCache
+from app.models.task import TaskPriority, TaskType
+
+ENTRIES = 100_000
+# Embedding width; pass another as the first argument
+DIM = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+QUERIES = 2000
+
+VERBS = ["export", "archive", "download", "share", "print", "translate", "summarize", "review",
+         "update", "backup", "rename", "publish", "duplicate", "sync", "encrypt", "compress",
+         "validate", "schedule", "tag", "audit"]
+# Never cached, so queries with these must miss
+NOVEL_VERBS = ["delete", "restore", "approve", "reject", "merge"]
+OBJECTS = [f"{adjective} {noun}" for adjective in
+           ["sales", "marketing", "payroll", "support", "inventory", "travel", "legal", "design", "hiring", "budget"]
+           for noun in ["report", "spreadsheet", "invoice", "contract", "slide deck"]]
+QUALIFIERS = [f"for the {team} team in {region}" for team in
+              ["finance", "ops", "product", "growth", "security", "data", "mobile", "web", "infra", "partner"]
+              for region in ["emea", "apac", "latam", "north america", "india", "japan", "germany", "france", "brazil", "canada"]]
+
+
+def command(verb, obj, qualifier, number, rng=None):
+    text = f"{verb} the {number} {obj} files {qualifier}"
+    if rng is not None:
+        text = rng.choice([f"please {text}", f"{text} now", text.replace(" the ", " ", 1), f"{text} asap"])
+    return text
+
+
+def parsed(verb, obj, qualifier, number):
+    return ParsedCommand(
+        task_type=TaskType.DOCUMENT_MANAGEMENT,
+        title=f"{verb} {obj} {qualifier}",
+        description=f"{verb} {number} files",
+        priority=TaskPriority.MEDIUM,
+        target_service="document_service",
+        service_endpoint="process",
+        parameters={"count": number},
+        confidence=0.9,
+    )
+
+
+def main():
+    rng = random.Random(1)
+    cache = SemanticCache(ParsedCommand, max_entries=ENTRIES, dim=DIM)
+    intents = [(verb, obj, qualifier) for verb in VERBS for obj in OBJECTS for qualifier in QUALIFIERS]
+    started = time.perf_counter()
+    for verb, obj, qualifier in intents[:ENTRIES]:
+        number = rng.randint(1, 99)
+        cache.set(command(verb, obj, qualifier, number), None, "model", parsed(verb, obj, qualifier, number))
+    fill = time.perf_counter() - started
+
+    cached = intents[:ENTRIES]
+    samples = []
+    paraphrase_hits = correct = novel_hits = 0
+    for i in range(QUERIES):
+        number = rng.randint(100, 999)
+        if i % 2 == 0:
+            verb, obj, qualifier = rng.choice(cached)
+        else:
+            verb, obj, qualifier = rng.choice(NOVEL_VERBS), rng.choice(OBJECTS), rng.choice(QUALIFIERS)
+        query = command(verb, obj, qualifier, number, rng)
+        started = time.perf_counter()
+        hit = cache.get(query, None, "model")
+        samples.append(time.perf_counter() - started)
+        if i % 2 == 0 and hit is not None:
+            paraphrase_hits += 1
+            correct += hit.title == f"{verb} {obj} {qualifier}" and hit.parameters == {"count": number}
+        elif hit is not None:
+            novel_hits += 1
+
+    samples.sort()
+    print(f"{len(cache):,} entries, {cache.dim}-dim float32 matrix "
+          f"({len(cache) * cache.dim * 4 / 2**20:.0f} MiB), filled in {fill:.1f}s")
+    print(f"  paraphrases  hit rate {paraphrase_hits / (QUERIES / 2):6.1%}  "
+          f"hits with the right intent and slots {correct / max(paraphrase_hits, 1):6.1%}")
+    print(f"  novel verbs  false hit rate {novel_hits / (QUERIES / 2):6.1%}")
+    print(f"  lookup latency  p50 {statistics.median(samples) * 1000:.2f}ms  "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
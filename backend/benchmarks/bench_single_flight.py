@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Thundering-herd load test for single-flight parsing.
+
+A dashboard fans DISTINCT commands out to USERS users at once, so
+USERS x DISTINCT parses arrive together. The LLM is stubbed with a fixed
+LLM_LATENCY and a cap of LLM_CONCURRENCY calls at a time, like a rate
+limited provider. Compares LLM calls and burst latency with and without
+coalescing.
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.command_parser import CommandParser
+from app.services.llm_service import llm_service
+
+USERS = 200
+DISTINCT = 5
+LLM_LATENCY = 0.3
+LLM_CONCURRENCY = 50
+
+RESPONSE = json.dumps({
+    "task_type": "document_management",
+    "title": "Weekly report",
+    "description": "Build the weekly report",
+    "priority": "medium",
+    "target_service": "document_service",
+    "service_endpoint": "process",
+    "parameters": {},
+    "confidence": 0.9,
+})
+
+
+async def run(single_flight: bool):
+    slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+    async def chat_completion(messages, **kwargs):
+        async with slots:
+            await asyncio.sleep(LLM_LATENCY)
+        return {"choices": [{"message": {"content": RESPONSE}}]}
+
+    llm_service.chat_completion = chat_completion
+    parser = CommandParser()
+    parser.single_flight = single_flight
+
+    async def request(command):
+        started = time.perf_counter()
+        await parser.parse_command(command)
+        return time.perf_counter() - started
+
+    commands = [f"build the weekly {name} report" for name in ["sales", "ops", "hiring", "support", "finance"]]
+    burst = [commands[i % DISTINCT] for i in range(USERS * DISTINCT)]
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(request(command) for command in burst)))
+    return parser.stats(), time.perf_counter() - started, latencies
+
+
+async def main():
+    print(f"{USERS * DISTINCT} parses of {DISTINCT} distinct commands at once, "
+          f"LLM {LLM_LATENCY * 1000:.0f}ms with {LLM_CONCURRENCY} calls at a time")
+    for label, single_flight in (("without coalescing", False), ("single-flight", True)):
+        stats, elapsed, latencies = await run(single_flight)
+        print(f"  {label:<19} LLM calls {stats['llm_calls']:5d}  coalesced {stats['coalesced']:5d} "
+              f"({stats['coalescing_ratio']:.1%})  burst {elapsed:5.2f}s  "
+              f"p50 {statistics.median(latencies):5.2f}s  p99 {latencies[int(len(latencies) * 0.99)]:5.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
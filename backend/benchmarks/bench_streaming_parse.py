@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Time to first decision for streamed command parses against a local
+streaming LLM stand-in.
+
+The stand-in speaks the OpenRouter chat completions API on localhost,
+with server-sent events when asked to stream, and is reached through the
+real LLMService. It waits FIRST_TOKEN_DELAY, then produces a token (4
+characters) every TOKEN_TIME, so a reply with a long description and
+parameters takes as long to stream as it would from a provider.
+COMMANDS commands are parsed one at a time, buffered and streamed; for
+the streamed parses the time until task_type, priority and
+target_service were available (the point at which the orchestrator
+builds and admits the task) is reported next to the full parse.
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web
+
+from app.core.command_parser import CommandParser
+from app.services.llm_service import llm_service
+
+COMMANDS = 20
+FIRST_TOKEN_DELAY = 0.2
+TOKEN_TIME = 0.01
+CHARS_PER_TOKEN = 4
+
+
+def reply_for(command: str) -> str:
+    return json.dumps({
+        "task_type": "document_management",
+        "priority": "medium",
+        "target_service": "document_service",
+        "title": command[:40],
+        "description": f"Create the document requested: {command}. " * 4,
+        "service_endpoint": "process",
+        "parameters": {
+            "document": command.split()[-1],
+            "sections": [f"Section {i}: summary of the work on {command}" for i in range(6)],
+        },
+        "confidence": 0.9,
+    }, indent=2)
+
+
+def mock_app():
+    async def chat_completions(request):
+        body = await request.json()
+        content = reply_for(body["messages"][1]["content"].split("Parse this command: ", 1)[1])
+        pieces = [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+        usage = {"prompt_tokens": 400, "completion_tokens": len(pieces)}
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(pieces) * TOKEN_TIME)
+            return web.json_response({
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        for piece in pieces:
+            await asyncio.sleep(TOKEN_TIME)
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/chat/completions", chat_completions)
+    return app
+
+
+async def run(streaming: bool):
+    parser = CommandParser()
+    parser.fast_path = parser.cache = parser.semantic_cache = parser.batcher = None
+    parser.streaming = streaming
+    decisions = []
+    totals = []
+    for i in range(COMMANDS):
+        started = time.perf_counter()
+        await parser.parse_command(
+            f"create a status document for project {i}",
+            on_decision=lambda decision: decisions.append(time.perf_counter() - started)
+        )
+        totals.append(time.perf_counter() - started)
+    return decisions, totals
+
+
+async def main():
+    runner = web.AppRunner(mock_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    llm_service.base_url = f"http://127.0.0.1:{port}"
+    llm_service.api_key = "mock"
+
+    tokens = len(reply_for("create a status document for project 0")) // CHARS_PER_TOKEN
+    print(f"{COMMANDS} commands, {tokens}-token replies, first token after {FIRST_TOKEN_DELAY}s, "
+          f"then {1 / TOKEN_TIME:.0f} tokens/s")
+    try:
+        _, buffered = await run(streaming=False)
+        decisions, streamed = await run(streaming=True)
+        print(f"  buffered  full parse    p50 {statistics.median(buffered):.3f}s")
+        print(f"  streamed  full parse    p50 {statistics.median(streamed):.3f}s")
+        print(f"  streamed  decision      p50 {statistics.median(decisions):.3f}s  "
+              f"({len(decisions)}/{COMMANDS} decided early)")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark the timer wheel that holds delayed and scheduled tasks against
+plain heaps at 100k and 1M pending timers.
+
+Timers are spread over a day. Each structure gets the same work: insert
+every timer, cancel 10% of them, then advance through the day one second
+at a time, collecting whatever has come due. The heapq baseline cancels
+lazily (it cannot find an entry without a scan); IndexedPriorityQueue is
+the heap the ready queue uses, which cancels in place.
+"""
+
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.indexed_heap import IndexedPriorityQueue
+from app.core.timer_wheel import TimerWheel
+
+SIZES = [100_000, 1_000_000]
+HORIZON = 24 * 3600
+STEP = 1.0
+CANCELLED_FRACTION = 0.1
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<8} {count:>9} ops  {elapsed:7.2f}s  {elapsed / count * 1e6:6.2f}us/op")
+    return elapsed
+
+
+def bench_wheel(due, cancelled):
+    wheel = TimerWheel(tick=0.1, now=0.0)
+
+    def insert():
+        for item, at in enumerate(due):
+            wheel.add(item, at)
+
+    def cancel():
+        for item in cancelled:
+            wheel.remove(item)
+
+    def drain():
+        fired = 0
+        now = 0.0
+        while now <= HORIZON:
+            now += STEP
+            fired += len(wheel.advance(now))
+        return fired
+
+    print("TimerWheel (tick 0.1s)")
+    total = timed("insert", len(due), insert)
+    total += timed("cancel", len(cancelled), cancel)
+    total += timed("drain", len(due) - len(cancelled), drain)
+    return total
+
+
+def bench_indexed(due, cancelled):
+    queue = IndexedPriorityQueue()
+
+    def insert():
+        for item, at in enumerate(due):
+            queue.push(item, at)
+
+    def cancel():
+        for item in cancelled:
+            queue.remove(item)
+
+    def drain():
+        now = 0.0
+        while now <= HORIZON:
+            now += STEP
+            while queue and queue.peek()[1] <= now:
+                queue.pop()
+
+    print("IndexedPriorityQueue")
+    total = timed("insert", len(due), insert)
+    total += timed("cancel", len(cancelled), cancel)
+    total += timed("drain", len(due) - len(cancelled), drain)
+    return total
+
+
+def bench_heapq(due, cancelled):
+    heap = []
+    removed = set()
+
+    def insert():
+        for item, at in enumerate(due):
+            heapq.heappush(heap, (at, item))
+
+    def cancel():
+        removed.update(cancelled)
+
+    def drain():
+        now = 0.0
+        while now <= HORIZON:
+            now += STEP
+            while heap and heap[0][0] <= now:
+                _, item = heapq.heappop(heap)
+                if item in removed:
+                    removed.discard(item)
+
+    print("heapq with lazy cancel")
+    total = timed("insert", len(due), insert)
+    total += timed("cancel", len(cancelled), cancel)
+    total += timed("drain", len(due) - len(cancelled), drain)
+    return total
+
+
+def main():
+    rng = random.Random(42)
+    for size in SIZES:
+        due = [rng.uniform(0, HORIZON) for _ in range(size)]
+        cancelled = rng.sample(range(size), int(size * CANCELLED_FRACTION))
+        print(f"\n{size} timers over {HORIZON}s, advancing every {STEP}s")
+        results = {
+            "wheel": bench_wheel(due, cancelled),
+            "indexed heap": bench_indexed(due, cancelled),
+            "heapq": bench_heapq(due, cancelled),
+        }
+        print("  total: " + ", ".join(f"{name} {elapsed:.2f}s" for name, elapsed in results.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of QUEUE_WORKER_MODE=process against inline execution.
+
+Seeds a backlog of tasks in a temporary SQLite file and drains it with
+QueueManager. Each task does the CPU-heavy part of a real one: it
+base64-encodes a screenshot-sized payload, JSON-encodes the result and
+stores it on the row. Inline mode runs that on the dispatcher's event
+loop; process mode runs it in 1, 2, 4 ... worker processes up to the
+core count.
+
+Alongside throughput it reports the worst event-loop stall seen by a
+ticker coroutine, which is what an API request would wait for.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import task_worker
+from app.core.task_worker import WorkerPool
+from app.core.queue_manager import QueueManager
+from app.models import Base
+from app.models.task import Task, TaskPriority, TaskStatus, TaskType
+
+BACKLOG_SIZE = 400
+PAYLOAD_BYTES = 512 * 1024
+ROUNDS = 4
+
+
+def render_result(task_id: int) -> str:
+    """The CPU work: encode a screenshot-sized payload a few times."""
+    payload = os.urandom(PAYLOAD_BYTES)
+    encoded = ""
+    for _ in range(ROUNDS):
+        encoded = json.dumps({"task_id": task_id, "screenshot": base64.b64encode(payload).decode()})
+    return encoded
+
+
+def process_target(task_id: int) -> None:
+    """Runs in a worker process with the worker's own session."""
+    db = task_worker._session_factory()
+    try:
+        task = db.get(Task, task_id)
+        task.result = {"size": len(render_result(task_id))}
+        task.status = TaskStatus.COMPLETED
+        db.commit()
+    finally:
+        db.close()
+
+
+class InlineQueueManager(QueueManager):
+    async def _execute_task(self, task: Task):
+        task.result = {"size": len(render_result(task.id))}
+
+
+def seed(database_url: str):
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(
+            Task(
+                title=f"Screenshot {i}",
+                command="take a screenshot",
+                task_type=TaskType.BROWSER_AUTOMATION,
+                priority=TaskPriority.MEDIUM,
+                target_service="browser_service",
+                status=TaskStatus.PENDING,
+            )
+            for i in range(BACKLOG_SIZE)
+        )
+        db.commit()
+    engine.dispose()
+
+
+async def watch_loop(lags, stop):
+    """Record how late a 10ms sleep wakes up."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def drain(database_url: str, processes: int = 0):
+    seed(database_url)
+    engine = create_engine(database_url, connect_args={"check_same_thread": False, "timeout": 30})
+    with Session(engine) as db:
+        if processes:
+            queue = QueueManager(db)
+            queue.worker_mode = "process"
+            queue.worker_pool = WorkerPool(processes, database_url, target=process_target)
+        else:
+            queue = InlineQueueManager(db)
+        queue.max_concurrent_tasks = max(processes * 2, 1)
+        queue.service_limits["browser_service"] = queue.max_concurrent_tasks
+        queue.adaptive_concurrency = False
+        await queue.recover_tasks()
+
+        lags = []
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(watch_loop(lags, stop))
+        loop_task = asyncio.create_task(queue.start_processing())
+        # Let the worker processes start before timing
+        await asyncio.sleep(1.0 if processes else 0)
+        started = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.05)
+            if queue.active_tasks == 0 and await queue.backend.size() == 0:
+                break
+        elapsed = time.perf_counter() - started
+        stop.set()
+        loop_task.cancel()
+        await asyncio.gather(watcher, loop_task, return_exceptions=True)
+
+        completed = db.query(Task).filter(Task.status == TaskStatus.COMPLETED).count()
+    engine.dispose()
+    return elapsed, completed, max(lags, default=0.0)
+
+
+async def main():
+    cores = os.cpu_count() or 1
+    sizes = [1]
+    while sizes[-1] * 2 <= cores:
+        sizes.append(sizes[-1] * 2)
+    if sizes[-1] != cores:
+        sizes.append(cores)
+
+    print(f"{BACKLOG_SIZE} tasks, {cores} cores")
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        for label, processes in [("inline", 0)] + [(f"process x{n}", n) for n in sizes]:
+            elapsed, completed, worst_lag = await drain(database_url, processes)
+            print(
+                f"  {label:<12} {elapsed:6.2f}s  {completed / elapsed:7.1f} tasks/s  "
+                f"worst loop stall {worst_lag * 1000:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
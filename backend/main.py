@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 import uvicorn
 
 from app.api.routes import router
-from app.models.database import engine, Base
+from app.models.database import engine, Base, upgrade_schema
 from app.models import Task, User, Conversation, ConversationMessage, ServiceConfig
 
 # Load environment variables
@@ -38,6 +38,7 @@ async def lifespan(app: FastAPI):
     # Create database tables
     try:
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -55,6 +56,7 @@ async def lifespan(app: FastAPI):
                     service_name="browser_service",
                     service_type="browser",
                     base_url=os.getenv("BROWSER_SERVICE_URL", "http://localhost:8001"),
+                    config_data={"max_concurrent_tasks": 3},
                     is_active=True,
                     endpoints={"execute": "/execute", "health": "/health"}
                 ),
@@ -62,6 +64,7 @@ async def lifespan(app: FastAPI):
                     service_name="document_service",
                     service_type="document",
                     base_url=os.getenv("DOCUMENT_SERVICE_URL", "http://localhost:8002"),
+                    config_data={"max_concurrent_tasks": 5},
                     is_active=True,
                     endpoints={"process": "/process", "health": "/health"}
                 ),
@@ -69,6 +72,7 @@ async def lifespan(app: FastAPI):
                     service_name="communication_service",
                     service_type="communication",
                     base_url=os.getenv("COMMUNICATION_SERVICE_URL", "http://localhost:8003"),
+                    config_data={"max_concurrent_tasks": 5},
                     is_active=True,
                     endpoints={"handle": "/handle", "health": "/health"}
                 ),
@@ -76,6 +80,7 @@ async def lifespan(app: FastAPI):
                     service_name="media_service",
                     service_type="media",
                     base_url=os.getenv("MEDIA_SERVICE_URL", "http://localhost:8004"),
+                    config_data={"max_concurrent_tasks": 2},
                     is_active=True,
                     endpoints={"process": "/process", "health": "/health"}
                 ),
@@ -83,6 +88,7 @@ async def lifespan(app: FastAPI):
                     service_name="bot_builder_service",
                     service_type="bot_builder",
                     base_url=os.getenv("BOT_BUILDER_SERVICE_URL", "http://localhost:8005"),
+                    config_data={"max_concurrent_tasks": 2},
                     is_active=True,
                     endpoints={"create": "/create", "health": "/health"}
                 )
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.core.concurrency import AIMDLimiter
+from app.core.queue_manager import QueueManager
+from app.core.task_router import ServiceCallError
+from test_queue_manager import make_task
+
+
+def test_limiter_grows_on_fast_calls_and_backs_off_on_errors():
+    limiter = AIMDLimiter(initial_limit=2, max_limit=10)
+    for i in range(50):
+        limiter.record(0.01, now=i)
+    assert limiter.current_limit == 10
+
+    limiter.record(0.01, overloaded=True, now=100)
+    assert limiter.limit == pytest.approx(7.0)
+    # A second error within the same latency window is not counted twice
+    limiter.record(0.01, overloaded=True, now=100)
+    assert limiter.limit == pytest.approx(7.0)
+    assert limiter.error_rate > 0
+
+
+def test_adaptive_limit_stays_within_the_bulkhead(db):
+    from app.models.service_config import ServiceConfig
+
+    db.add_all([
+        ServiceConfig(service_name="media_service", service_type="media",
+                      config_data={"max_concurrent_tasks": 2}),
+        ServiceConfig(service_name="browser_service", service_type="browser",
+                      config_data={"max_concurrent_tasks": 2, "adaptive_max_concurrent_tasks": 6}),
+    ])
+    db.commit()
+    queue = QueueManager(db)
+    queue.max_concurrent_tasks = 10
+    queue.load_service_limits()
+    for service in ("media_service", "browser_service"):
+        for _ in range(200):
+            queue._record_service_call(service, 30.0)
+    # Steady slow calls never let one service take every slot
+    assert queue._service_limit("media_service") == 2
+    assert queue._service_limit("browser_service") == 6
+
+
+class StubService:
+    """Service whose latency rises once more than `capacity` calls overlap."""
+
+    def __init__(self, capacity: int, base_latency: float):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.in_flight = 0
+        self.peak = 0
+
+    async def call(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            overload = max(0, self.in_flight - self.capacity)
+            await asyncio.sleep(self.base_latency * (1 + overload))
+            if overload > self.capacity:
+                raise ServiceCallError("503 Service Unavailable", status_code=503, transient=True)
+        finally:
+            self.in_flight -= 1
+
+
+class StubQueueManager(QueueManager):
+    def __init__(self, db, service):
+        super().__init__(db)
+        self.service = service
+        self.finished = 0
+
+    async def _execute_task(self, task):
+        try:
+            await self.service.call()
+        finally:
+            self.finished += 1
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limit_settles_near_service_capacity(db):
+    service = StubService(capacity=4, base_latency=0.004)
+    queue = StubQueueManager(db, service)
+    queue.max_concurrent_tasks = 32
+    queue.service_limits["media_service"] = 32
+    total = 300
+    for _ in range(total):
+        await queue.add_task(make_task(target_service="media_service"))
+
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        while queue.finished < total:
+            await asyncio.sleep(0.01)
+    finally:
+        loop_task.cancel()
+
+    status = await queue.get_queue_status()
+    media = status["services"]["media_service"]
+    # Starting at 32 the controller must have backed off towards capacity
+    assert media["limit"] <= 2 * service.capacity
+    assert media["latency_ms"] is not None and media["baseline_latency_ms"] is not None
@@ -0,0 +1,57 @@
+import random
+
+from app.core.fair_queue import FairQueue
+
+
+def drain(queue):
+    items = []
+    while queue:
+        items.append(queue.pop()[0])
+    return items
+
+
+def test_flows_take_turns_and_keep_their_own_order():
+    queue = FairQueue()
+    queue.extend((f"flood-{i}", float(i), "flood") for i in range(100))
+    queue.push("light-b", 5.0, "light")
+    queue.push("light-a", 1.0, "light")
+    assert drain(queue)[:4] == ["flood-0", "light-a", "flood-1", "light-b"]
+    assert len(queue) == 0
+
+
+def test_pops_are_shared_by_weight():
+    weights = {"gold": 3.0, "basic": 1.0, "trickle": 0.5}
+    queue = FairQueue(weights.get)
+    for flow in weights:
+        queue.extend((f"{flow}-{i}", float(i), flow) for i in range(1000))
+    served = [queue.pop()[0].split("-")[0] for _ in range(900)]
+    assert {flow: served.count(flow) for flow in weights} == {"gold": 600, "basic": 200, "trickle": 100}
+
+
+def test_remove_update_and_membership():
+    rng = random.Random(3)
+    queue = FairQueue()
+    expected = {}
+    for item in range(200):
+        flow = rng.randrange(5)
+        queue.push(item, rng.random(), flow)
+        expected[item] = flow
+    for item in rng.sample(sorted(expected), 80):
+        assert queue.remove(item)
+        del expected[item]
+    assert not queue.remove(-1)
+    assert queue.update(next(iter(expected)), -1.0)
+    assert len(queue) == len(expected)
+    assert all(item in queue for item in expected)
+    assert sorted(drain(queue)) == sorted(expected)
+    assert queue.peek() is None
+
+
+def test_skipped_flows_are_passed_over():
+    queue = FairQueue()
+    queue.extend((f"flood-{i}", float(i), "flood") for i in range(3))
+    queue.push("light-a", 1.0, "light")
+    assert queue.peek(skip={"flood"}) == ("light-a", 1.0)
+    assert queue.pop(skip={"flood"}) == ("light-a", 1.0)
+    assert queue.peek(skip={"flood"}) is None
+    assert drain(queue) == ["flood-0", "flood-1", "flood-2"]
@@ -0,0 +1,74 @@
+import random
+import re
+
+import pytest
+
+from app.core.command_parser import CommandParser
+from app.core.fast_path import FastPathClassifier, trie_pattern
+from app.models.task import TaskPriority
+from app.services.llm_service import llm_service
+
+
+def test_trie_pattern_matches_exactly_the_words():
+    rng = random.Random(5)
+    words = {"".join(rng.choice("abc ") for _ in range(rng.randint(1, 6))).strip() or "a" for _ in range(200)}
+    pattern = re.compile(trie_pattern(words))
+    for _ in range(2000):
+        candidate = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 6)))
+        assert bool(pattern.fullmatch(candidate)) == (candidate in words)
+
+
+@pytest.mark.parametrize("command, parameters, priority", [
+    ("Take a screenshot of https://example.com/dashboard.",
+     {"action": "screenshot", "url": "https://example.com/dashboard", "full_page": True}, TaskPriority.MEDIUM),
+    ("go to example.com asap", {"action": "navigate", "url": "https://example.com"}, TaskPriority.URGENT),
+    ('click "#submit" on https://example.com/login',
+     {"action": "click_element", "selector": "#submit", "url": "https://example.com/login"}, TaskPriority.MEDIUM),
+    ("scrape '.price' from shop.example.com/item/4",
+     {"action": "extract_data", "url": "https://shop.example.com/item/4", "selectors": {"data": ".price"}},
+     TaskPriority.MEDIUM),
+])
+def test_simple_browser_commands_are_classified(command, parameters, priority):
+    fields = FastPathClassifier().classify(command)
+    assert fields["parameters"] == parameters
+    assert fields["priority"] == priority
+    assert fields["target_service"] == "browser_service"
+    assert fields["confidence"] >= 0.9
+
+
+@pytest.mark.parametrize("command", [
+    "open https://a.com and take a screenshot",
+    "fill in the signup form on https://example.com",
+    "email the screenshot of https://example.com to bob",
+    "take a screenshot of the dashboard",
+    "could you please take a quick screenshot of the marketing dashboard at https://x.com for the weekly review",
+    "don't take a screenshot of https://example.com",
+    "do not open https://example.com",
+    "never click #delete on https://example.com",
+    "open https://example.com without clicking anything",
+    "stop taking screenshots of https://example.com",
+    "cancel the screenshot of https://example.com",
+    "please don’t go to https://example.com",
+    "don't click 'Submit' on https://example.com",
+    "open a support ticket on zendesk.com",
+    "open an account on stripe.com",
+    "capture the new leads from hubspot.com",
+    'press "#buy" 5 times on shop.com',
+    'tap "#like" on every post on instagram.com',
+])
+def test_ambiguous_or_incomplete_commands_are_left_to_the_llm(command):
+    assert FastPathClassifier().classify(command) is None
+
+
+@pytest.mark.asyncio
+async def test_parser_skips_llm_for_fast_path_commands(monkeypatch):
+    async def chat_completion(messages, **kwargs):
+        raise AssertionError("LLM called")
+
+    monkeypatch.setattr(llm_service, "chat_completion", chat_completion)
+    parser = CommandParser()
+    parsed = await parser.parse_command("open https://example.com")
+    assert parsed.parameters["url"] == "https://example.com"
+    stats = parser.stats()
+    assert (stats["requests"], stats["llm_calls"], stats["fast_path"]["hits"]) == (1, 0, 1)
+    assert stats["llm_bypass_rate"] == 1.0
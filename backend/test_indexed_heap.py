@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from app.core.indexed_heap import IndexedPriorityQueue
+
+
+def drain(queue):
+    items = []
+    while queue:
+        items.append(queue.pop())
+    return items
+
+
+def test_pops_in_key_order_with_fifo_ties():
+    queue = IndexedPriorityQueue()
+    for item, key in [("a", 2.0), ("b", 1.0), ("c", 2.0), ("d", 0.5)]:
+        queue.push(item, key)
+    assert [item for item, _ in drain(queue)] == ["d", "b", "a", "c"]
+    with pytest.raises(IndexError):
+        queue.pop()
+
+
+def test_remove_and_update_match_reference_model():
+    rng = random.Random(7)
+    queue = IndexedPriorityQueue()
+    reference = {}
+    for item in range(2000):
+        key = rng.random()
+        queue.push(item, key)
+        reference[item] = key
+    for item in rng.sample(range(2000), 500):
+        assert queue.remove(item)
+        del reference[item]
+    for item in rng.sample(sorted(reference), 500):
+        key = rng.random()
+        assert queue.update(item, key)
+        reference[item] = key
+    assert not queue.remove(-1)
+    assert not queue.update(-1, 0.0)
+
+    popped = drain(queue)
+    assert [key for _, key in popped] == sorted(reference.values())
+    assert {item for item, _ in popped} == set(reference)
+
+
+def test_extend_heapifies_and_updates_existing_items():
+    queue = IndexedPriorityQueue()
+    queue.push("a", 5.0)
+    queue.extend([("b", 3.0), ("c", 1.0), ("a", 0.5), ("d", 2.0)])
+    assert len(queue) == 4
+    assert [item for item, _ in drain(queue)] == ["a", "c", "d", "b"]
@@ -0,0 +1,32 @@
+import json
+
+from app.core.json_stream import JSONObjectStream
+
+
+def test_fields_are_handed_out_as_they_complete():
+    reply = {
+        "task_type": "browser_automation",
+        "priority": "high",
+        "parameters": {"selectors": ["a, b", "{c}"], "note": "say \"hi\""},
+        "confidence": 0.9,
+    }
+    text = "```json\n" + json.dumps(reply, indent=2) + "\n```"
+    stream = JSONObjectStream()
+    seen = []
+    for i in range(0, len(text), 3):
+        seen.extend(key for key, _ in stream.feed(text[i:i + 3]))
+    assert seen == list(reply)
+    assert stream.done and stream.fields == reply
+
+
+def test_task_type_is_ready_before_the_object_ends():
+    stream = JSONObjectStream()
+    assert stream.feed('{"task_type": "general"') == []
+    assert stream.feed(', "parameters": {"long') == [("task_type", "general")]
+    assert not stream.done
+
+
+def test_malformed_text_stops_the_stream():
+    stream = JSONObjectStream()
+    assert stream.feed('{"priority": "low", oops, "title": "x"}') == [("priority", "low")]
+    assert stream.failed and not stream.done
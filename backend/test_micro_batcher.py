@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.core.micro_batcher import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_items_are_grouped_by_size_and_window():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    batcher = MicroBatcher(handler, window=0.01, max_size=3)
+    results = await asyncio.gather(
+        *(batcher.submit(item) for item in ["a", "b", "bad", "c"]),
+        return_exceptions=True
+    )
+    assert batches == [["a", "b", "bad"], ["c"]]
+    assert results[:2] == ["A", "B"] and results[3] == "C"
+    assert isinstance(results[2], ValueError)
+    assert batcher.stats()["average_size"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_handler_failure_reaches_every_caller():
+    async def handler(items):
+        raise RuntimeError("LLM down")
+
+    batcher = MicroBatcher(handler, window=0.01, max_size=10)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    assert [str(result) for result in results] == ["LLM down", "LLM down"]
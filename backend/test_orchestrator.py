@@ -0,0 +1,225 @@
+import pytest
+
+from app.core.command_parser import ParsedCommand
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.orchestrator import AIOrchestrator, CommandRequest
+from app.models.task import Task, TaskPriority, TaskType
+
+
+class CountingParser:
+    """Command parser that answers without an LLM and counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def parse_command(self, command, context=None, on_decision=None):
+        self.calls += 1
+        return ParsedCommand(
+            task_type=TaskType.BROWSER_AUTOMATION,
+            title=command[:40],
+            description=command,
+            priority=TaskPriority.LOW if command.startswith("low") else TaskPriority.URGENT,
+            target_service="browser_service",
+            service_endpoint="execute",
+            parameters={},
+            confidence=0.9,
+        )
+
+    def validate_parsed_command(self, parsed_command):
+        return True
+
+
+@pytest.fixture
+def orchestrator(db):
+    orchestrator = AIOrchestrator(db)
+    orchestrator.command_parser = CountingParser()
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_repeated_command_returns_original_task_without_parsing(orchestrator):
+    first = await orchestrator.process_command(CommandRequest(command="Open the  dashboard", user_id=1))
+    again = await orchestrator.process_command(CommandRequest(command="open the dashboard ", user_id=1))
+    other_user = await orchestrator.process_command(CommandRequest(command="open the dashboard", user_id=2))
+
+    assert again.task_id == first.task_id
+    assert again.status == "duplicate"
+    assert other_user.task_id != first.task_id
+    assert orchestrator.command_parser.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_survives_cache_loss(orchestrator, db):
+    first = await orchestrator.process_command(
+        CommandRequest(command="send the report", user_id=1, idempotency_key="abc")
+    )
+    orchestrator.recent_commands.clear()
+    retry = await orchestrator.process_command(
+        CommandRequest(command="send the report", user_id=1, idempotency_key="abc")
+    )
+    assert retry.task_id == first.task_id
+    assert orchestrator.command_parser.calls == 1
+    assert db.query(Task).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_dedup_window_allows_resubmission(orchestrator, db):
+    from datetime import datetime, timedelta
+
+    first = await orchestrator.process_command(CommandRequest(command="scrape prices", user_id=1))
+    task = db.get(Task, first.task_id)
+    task.created_at = datetime.utcnow() - timedelta(seconds=orchestrator.dedup_window + 1)
+    db.commit()
+    orchestrator.recent_commands.clear()
+
+    second = await orchestrator.process_command(CommandRequest(command="scrape prices", user_id=1))
+    assert second.task_id != first.task_id
+    assert second.status == "queued"
+    db.expire_all()
+    assert db.get(Task, first.task_id).dedup_key is None
+
+
+@pytest.mark.asyncio
+async def test_same_command_at_different_times_is_not_a_duplicate(orchestrator, db):
+    from datetime import datetime, timedelta, timezone
+
+    in_one_hour = datetime.now(timezone.utc) + timedelta(hours=1)
+    first = await orchestrator.process_command(CommandRequest(command="send the report", user_id=1, run_at=in_one_hour))
+    later = await orchestrator.process_command(
+        CommandRequest(command="send the report", user_id=1, run_at=in_one_hour + timedelta(hours=1))
+    )
+    again = await orchestrator.process_command(
+        CommandRequest(command="send the report", user_id=1, run_at=in_one_hour.replace(tzinfo=None))
+    )
+    tight = await orchestrator.process_command(CommandRequest(command="send the report", user_id=1, deadline_seconds=60))
+    loose = await orchestrator.process_command(CommandRequest(command="send the report", user_id=1, deadline_seconds=600))
+
+    assert later.status == "scheduled" and later.task_id != first.task_id
+    # The same instant given in UTC without a timezone is a repeat
+    assert again.status == "duplicate" and again.task_id == first.task_id
+    assert loose.task_id != tight.task_id
+    assert db.query(Task).count() == 4
+
+
+@pytest.mark.asyncio
+async def test_deadline_seconds_counts_from_run_at(orchestrator, db):
+    from datetime import datetime, timedelta
+
+    run_at = datetime.utcnow() + timedelta(hours=1)
+    response = await orchestrator.process_command(
+        CommandRequest(command="send the report", user_id=1, run_at=run_at, deadline_seconds=60)
+    )
+    task = db.get(Task, response.task_id)
+    assert task.deadline.replace(tzinfo=None) == run_at + timedelta(seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_per_command_results_in_order(orchestrator, db):
+    parser = orchestrator.command_parser
+    original_parse = parser.parse_command
+
+    async def parse_or_fail(command, context=None, on_decision=None):
+        if command == "gibberish":
+            raise ValueError("could not parse")
+        return await original_parse(command, context)
+
+    parser.parse_command = parse_or_fail
+    earlier = await orchestrator.process_command(CommandRequest(command="open inbox", user_id=1))
+
+    results = await orchestrator.process_commands([
+        CommandRequest(command="open calendar", user_id=1),
+        CommandRequest(command="gibberish", user_id=1),
+        CommandRequest(command="Open calendar", user_id=1),
+        CommandRequest(command="open inbox", user_id=1),
+        CommandRequest(command="open drive", user_id=1),
+    ])
+
+    assert [result.index for result in results] == [0, 1, 2, 3, 4]
+    assert [result.status for result in results] == ["queued", "error", "duplicate", "duplicate", "queued"]
+    assert results[2].task_id == results[0].task_id
+    assert results[3].task_id == earlier.task_id
+    assert results[1].error == "could not parse"
+    # Repeats inside the batch are parsed once
+    assert parser.calls == 3
+    assert db.query(Task).count() == 3
+    assert await orchestrator.queue_manager.backend.size() == 3
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_low_priority_before_urgent(orchestrator):
+    orchestrator.admission = AdmissionController(max_queue_depth=4, max_service_backlog=100)
+
+    for i in range(2):
+        await orchestrator.process_command(CommandRequest(command=f"low report {i}", user_id=1))
+    with pytest.raises(AdmissionRejected) as rejected:
+        await orchestrator.process_command(CommandRequest(command="low report 2", user_id=1))
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+
+    # URGENT work still gets in until the hard limit
+    for i in range(2):
+        await orchestrator.process_command(CommandRequest(command=f"urgent page {i}", user_id=1))
+    with pytest.raises(AdmissionRejected) as rejected:
+        await orchestrator.process_command(CommandRequest(command="urgent page 2", user_id=1))
+    assert rejected.value.status_code == 503
+    assert await orchestrator.queue_manager.backend.size() == 4
+
+
+@pytest.mark.asyncio
+async def test_admission_retry_after_follows_drain_rate(orchestrator):
+    orchestrator.admission = AdmissionController(max_queue_depth=1000, max_service_backlog=4)
+    queue = orchestrator.queue_manager
+    queue.service_limits["browser_service"] = 2
+    # Two calls at a time, 0.5s each: the service drains 4 tasks a second
+    queue.service_latency["browser_service"] = 0.5
+
+    for i in range(2):
+        await orchestrator.process_command(CommandRequest(command=f"low report {i}", user_id=1))
+    with pytest.raises(AdmissionRejected) as rejected:
+        await orchestrator.process_command(CommandRequest(command="low report 2", user_id=1))
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_rejected_commands(orchestrator):
+    orchestrator.admission = AdmissionController(max_queue_depth=4, max_service_backlog=100)
+
+    results = await orchestrator.process_commands([
+        CommandRequest(command=f"low report {i}", user_id=1) for i in range(3)
+    ] + [CommandRequest(command="urgent page", user_id=1)])
+
+    assert [result.status for result in results] == ["queued", "queued", "rejected", "queued"]
+    assert results[2].retry_after >= 1
+    assert results[2].task_id is None
+
+
+@pytest.mark.asyncio
+async def test_streamed_command_is_rejected_before_its_parse_finishes(orchestrator, monkeypatch):
+    import asyncio
+    import json
+
+    from app.core.command_parser import CommandParser
+    from app.services.llm_service import llm_service
+
+    orchestrator.admission = AdmissionController(max_queue_depth=4, max_service_backlog=100)
+    for i in range(2):
+        await orchestrator.process_command(CommandRequest(command=f"low report {i}", user_id=1))
+
+    async def stream_chat_completion(messages, **kwargs):
+        head = {"task_type": "general", "priority": "low", "target_service": "default"}
+        yield {"choices": [{"delta": {"content": json.dumps(head)[:-1] + ', "title": "Rep'}}]}
+        # The rest of the reply never arrives
+        await asyncio.Event().wait()
+
+    monkeypatch.setenv("PARSE_STREAMING", "true")
+    monkeypatch.setattr(llm_service, "stream_chat_completion", stream_chat_completion)
+    orchestrator.command_parser = CommandParser()
+    with pytest.raises(AdmissionRejected) as rejected:
+        await asyncio.wait_for(
+            orchestrator.process_command(CommandRequest(command="low report 2", user_id=1)),
+            timeout=1
+        )
+    assert rejected.value.status_code == 429
+    for flight, _ in orchestrator.command_parser._in_flight.values():
+        flight.cancel()
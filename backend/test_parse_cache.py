@@ -0,0 +1,197 @@
+import json
+
+import pytest
+
+from app.core.command_parser import CommandParser, ParsedCommand
+from app.core.parse_cache import ParseCache
+from app.models.task import TaskPriority, TaskType
+from app.services.llm_service import llm_service
+
+
+def parsed(title="Screenshot") -> ParsedCommand:
+    return ParsedCommand(
+        task_type=TaskType.BROWSER_AUTOMATION,
+        title=title,
+        description="Take a screenshot of the dashboard",
+        priority=TaskPriority.MEDIUM,
+        target_service="browser_service",
+        service_endpoint="execute",
+        parameters={"url": "https://example.com/dashboard"},
+        confidence=0.9,
+    )
+
+
+def test_key_normalizes_text_but_not_context_or_model():
+    key = ParseCache.key("Take a  screenshot ", {"tab": 1}, "model-a")
+    assert key == ParseCache.key("take a screenshot", {"tab": 1}, "model-a")
+    assert key != ParseCache.key("take a screenshot", {"tab": 2}, "model-a")
+    assert key != ParseCache.key("take a screenshot", {"tab": 1}, "model-b")
+
+
+def test_hits_are_copies_and_counted():
+    cache = ParseCache(ParsedCommand, max_entries=10)
+    assert cache.get("k") is None
+    cache.set("k", parsed())
+    hit = cache.get("k")
+    hit.parameters["url"] = "changed"
+    assert cache.get("k") == parsed()
+    assert cache.stats() == {
+        "entries": 1, "max_entries": 10, "hits": 2, "disk_hits": 0, "misses": 1,
+        "hit_rate": pytest.approx(2 / 3), "disk": False,
+    }
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "parse_cache.db")
+    cache = ParseCache(ParsedCommand, path=path)
+    cache.set("k", parsed())
+    cache.close()
+
+    restarted = ParseCache(ParsedCommand, path=path)
+    assert restarted.get("k") == parsed()
+    assert restarted.get("k") == parsed()
+    assert (restarted.disk_hits, restarted.hits) == (1, 1)
+    restarted.close()
+
+    expired = ParseCache(ParsedCommand, ttl=-1, path=path)
+    expired.set("old", parsed())
+    assert expired.get("old") is None
+
+
+@pytest.mark.asyncio
+async def test_parser_answers_repeats_from_cache(monkeypatch):
+    calls = []
+
+    async def chat_completion(messages, **kwargs):
+        calls.append(messages)
+        content = parsed().model_dump(mode="json")
+        return {"choices": [{"message": {"content": json.dumps(content)}}]}
+
+    monkeypatch.setattr(llm_service, "chat_completion", chat_completion)
+    parser = CommandParser()
+    first = await parser.parse_command("Take a screenshot of the dashboard")
+    again = await parser.parse_command("take a screenshot of the  dashboard")
+    assert first == again == parsed()
+    assert len(calls) == 1
+    assert parser.stats()["cache"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_parses_share_one_llm_call(monkeypatch):
+    import asyncio
+
+    calls = []
+    release = asyncio.Event()
+
+    async def chat_completion(messages, **kwargs):
+        calls.append(messages)
+        await release.wait()
+        if len(calls) == 1:
+            raise RuntimeError("OpenRouter API error: 502")
+        return {"choices": [{"message": {"content": parsed().model_dump_json()}}]}
+
+    monkeypatch.setattr(llm_service, "chat_completion", chat_completion)
+    parser = CommandParser()
+    command = "summarize the launch plan"
+
+    # A failure reaches every caller and is not remembered
+    herd = [asyncio.create_task(parser.parse_command(command)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*herd, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    release.clear()
+    herd = [asyncio.create_task(parser.parse_command(command)) for _ in range(10)]
+    await asyncio.sleep(0)
+    # One caller giving up does not cancel the shared call
+    herd[0].cancel()
+    release.set()
+    results = await asyncio.gather(*herd[1:])
+    assert len(calls) == 2
+    assert all(result == parsed() for result in results)
+    assert len({id(result) for result in results}) == 9
+    stats = parser.stats()
+    assert (stats["llm_calls"], stats["coalesced"]) == (2, 13)
+    assert stats["coalescing_ratio"] == pytest.approx(13 / 15)
+
+
+@pytest.mark.asyncio
+async def test_commands_within_window_are_parsed_in_one_call(monkeypatch):
+    import asyncio
+
+    prompts = []
+
+    async def chat_completion(messages, **kwargs):
+        prompts.append(messages[1]["content"])
+        commands = json.loads(messages[1]["content"].split("Commands: ", 1)[1])
+        replies = [parsed(title=item["command"]).model_dump(mode="json") for item in commands]
+        # The second command comes back malformed
+        del replies[1]["title"]
+        return {
+            "choices": [{"message": {"content": json.dumps(replies)}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 300},
+        }
+
+    monkeypatch.setenv("PARSE_BATCH_WINDOW", "0.01")
+    monkeypatch.setattr(llm_service, "chat_completion", chat_completion)
+    parser = CommandParser()
+    results = await asyncio.gather(
+        *(parser.parse_command(f"summarize report {i}") for i in range(3)),
+        return_exceptions=True
+    )
+    assert len(prompts) == 1
+    assert [result.title for result in (results[0], results[2])] == ["summarize report 0", "summarize report 2"]
+    assert isinstance(results[1], KeyError)
+    stats = parser.stats()
+    assert (stats["llm_parses"], stats["llm_calls"], stats["tokens_per_parse"]) == (3, 1, 400)
+    assert stats["batching"]["average_size"] == 3
+
+
+@pytest.mark.asyncio
+async def test_streamed_parse_decides_before_the_reply_ends(monkeypatch):
+    import asyncio
+
+    fields = parsed().model_dump(mode="json")
+    # In the order the prompt asks for
+    reply = json.dumps({name: fields.pop(name) for name in ("task_type", "priority", "target_service")} | fields)
+    split = reply.index('"description"')
+    rest_sent = asyncio.Event()
+
+    async def stream_chat_completion(messages, **kwargs):
+        for i in range(0, split, 8):
+            yield {"choices": [{"delta": {"content": reply[i:min(i + 8, split)]}}]}
+        await rest_sent.wait()
+        yield {"choices": [{"delta": {"content": reply[split:]}}]}
+        yield {"choices": [], "usage": {"prompt_tokens": 300, "completion_tokens": 100}}
+
+    monkeypatch.setenv("PARSE_STREAMING", "true")
+    monkeypatch.setattr(llm_service, "stream_chat_completion", stream_chat_completion)
+    parser = CommandParser()
+    decisions = []
+
+    def on_decision(decision):
+        decisions.append(decision)
+        rest_sent.set()
+
+    def reject(decision):
+        raise RuntimeError("shed")
+
+    # The reply is held back until the first caller has its decision
+    results = await asyncio.gather(
+        parser.parse_command("screenshot the sales dashboard", on_decision=on_decision),
+        parser.parse_command("screenshot the sales dashboard", on_decision=reject),
+        return_exceptions=True
+    )
+    assert decisions == [{
+        "task_type": TaskType.BROWSER_AUTOMATION,
+        "priority": TaskPriority.MEDIUM,
+        "target_service": "browser_service",
+    }]
+    assert results[0] == parsed()
+    # A caller refusing the decision does not stop the parse for others
+    assert isinstance(results[1], RuntimeError)
+    stats = parser.stats()
+    assert (stats["llm_calls"], stats["tokens_per_parse"]) == (1, 400)
+    assert stats["streaming"]["decisions"] == 1
+    assert stats["streaming"]["decision_latency"] <= stats["llm_latency"]
@@ -0,0 +1,183 @@
+import time
+
+import pytest
+
+from app.core.queue_backends import InMemoryQueueBackend, RedisQueueBackend
+from app.models.task import TaskPriority, TaskStatus
+
+
+@pytest.fixture
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisQueueBackend(client=fakeredis.FakeAsyncRedis(), visibility_timeout=30)
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_claims_by_score_then_fifo():
+    backend = InMemoryQueueBackend()
+    await backend.push(1, -1.0)
+    await backend.push(2, -4.0)
+    await backend.push(3, -1.0)
+    assert await backend.remove(3)
+    assert [await backend.claim() for _ in range(3)] == [2, 1, None]
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_claims_by_score_then_fifo(redis_backend):
+    await redis_backend.push(10, -1.0)
+    await redis_backend.push(9, -1.0)
+    await redis_backend.push(11, -4.0)
+    assert await redis_backend.size() == 3
+    assert [await redis_backend.claim() for _ in range(4)] == [11, 9, 10, None]
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_redelivers_unacked_tasks_after_visibility_timeout(redis_backend):
+    await redis_backend.push(1, -2.0)
+    await redis_backend.push(2, -2.0)
+    assert await redis_backend.claim() == 1
+    assert await redis_backend.claim() == 2
+    await redis_backend.ack(2)
+
+    # Nothing is due until the deadline passes
+    assert await redis_backend.requeue_expired() == 0
+    await redis_backend.redis.zadd(redis_backend.inflight_key, {redis_backend._member(1): time.time() - 1})
+    assert await redis_backend.requeue_expired() == 1
+    assert await redis_backend.claim() == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_release_and_remove(redis_backend):
+    await redis_backend.push(1, -3.0)
+    await redis_backend.push(2, -1.0)
+    assert await redis_backend.remove(2)
+    assert not await redis_backend.remove(2)
+    assert await redis_backend.claim() == 1
+    await redis_backend.release(1)
+    assert await redis_backend.size() == 1
+    assert await redis_backend.claim() == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_reprioritize_only_touches_pending(redis_backend):
+    await redis_backend.push(1, -1.0)
+    await redis_backend.push(2, -2.0)
+    assert await redis_backend.reprioritize(1, -5.0)
+    assert await redis_backend.claim() == 1
+    assert not await redis_backend.reprioritize(1, -9.0)
+    assert await redis_backend.claim() == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_manager_dispatches_through_redis_backend(db, redis_backend):
+    from test_queue_manager import make_task
+    from app.core.queue_manager import QueueManager
+
+    queue = QueueManager(db, queue_mode="redis", backend=redis_backend)
+    low, high = make_task(priority=TaskPriority.LOW), make_task(priority=TaskPriority.HIGH)
+    await queue.add_task(low)
+    await queue.add_task(high)
+    assert await queue.cancel_task(low.id)
+
+    assert (await queue.get_next_task()).id == high.id
+    assert await queue.get_next_task() is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend_name", ["memory", "redis"])
+async def test_claim_skips_excluded_services(backend_name, request):
+    backend = InMemoryQueueBackend() if backend_name == "memory" else request.getfixturevalue("redis_backend")
+    await backend.push(1, -4.0, "media_service")
+    await backend.push(2, -1.0, "document_service")
+    await backend.push(3, -2.0, "media_service")
+    assert await backend.sizes() == {"document_service": 1, "media_service": 2}
+
+    assert await backend.claim(exclude=["media_service"]) == 2
+    assert await backend.claim(exclude=["media_service"]) is None
+    assert await backend.claim() == 1
+    await backend.release(1)
+    assert await backend.claim() == 1
+
+
+@pytest.mark.asyncio
+async def test_database_backend_treats_rows_without_a_service_as_default(db):
+    from app.core.db_queue import DatabaseTaskQueue
+    from test_queue_manager import make_task
+
+    unrouted, media = make_task(target_service=None), make_task(target_service="media_service")
+    db.add_all([unrouted, media])
+    db.commit()
+    backend = DatabaseTaskQueue(db)
+
+    assert await backend.claim(exclude=["default"]) == media.id
+    assert await backend.claim(exclude=["default"]) is None
+    assert await backend.claim() == unrouted.id
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_skips_flows_and_parks_tasks():
+    backend = InMemoryQueueBackend(fair_share=True)
+    await backend.push_many([(1, -3.0, "browser_service", 7), (2, -2.0, "browser_service", 7), (3, -1.0, "browser_service", 8)])
+    assert await backend.claim(exclude_flows=[7]) == 3
+    assert await backend.claim(exclude_flows=[7, 8]) is None
+
+    # Parked tasks stay queued but cannot be claimed until unparked
+    assert await backend.claim() == 1
+    await backend.park(1, ("domain", "example.com"))
+    assert await backend.size() == 2
+    assert await backend.claim() == 2
+    await backend.park(2, ("domain", "example.com"))
+    assert await backend.claim() is None
+    assert await backend.sizes() == {"browser_service": 2}
+
+    assert await backend.unpark(("domain", "example.com"), 1) == 1
+    assert await backend.claim() == 1
+    assert await backend.remove(2)
+    assert await backend.unpark(("domain", "example.com"), 1) == 0
+    assert await backend.size() == 0
+
+
+@pytest.mark.asyncio
+async def test_task_outliving_visibility_timeout_runs_once_across_nodes(engine, db):
+    import asyncio
+
+    from sqlalchemy.orm import Session
+
+    from test_queue_manager import make_task
+    from app.core.queue_manager import QueueManager
+
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    runs = []
+
+    class Node(QueueManager):
+        async def _execute_task(self, task):
+            runs.append(self.worker_id)
+            await asyncio.sleep(0.5)
+
+    other_db = Session(engine)
+    nodes = []
+    for name, session in (("node-a", db), ("node-b", other_db)):
+        backend = RedisQueueBackend(client=fakeredis.FakeAsyncRedis(server=server), visibility_timeout=0.1)
+        node = Node(session, queue_mode="redis", backend=backend)
+        node.worker_id = name
+        node.lease_seconds = 0.3
+        node.poll_interval = 0.02
+        nodes.append(node)
+
+    loops = [asyncio.create_task(node.start_processing()) for node in nodes]
+    try:
+        task = make_task()
+        await nodes[0].add_task(task)
+        await asyncio.sleep(0.8)
+    finally:
+        for loop in loops:
+            loop.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+        other_db.close()
+
+    assert len(runs) == 1
+    db.expire_all()
+    assert task.status == TaskStatus.COMPLETED
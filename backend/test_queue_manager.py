@@ -0,0 +1,747 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.queue_manager import QueueManager
+from app.core.timer_wheel import TimerWheel
+from app.models.task import Task, TaskPriority, TaskStatus, TaskType
+
+
+def make_task(**kwargs) -> Task:
+    fields = {
+        "title": "Test task",
+        "command": "take a screenshot of the dashboard",
+        "task_type": TaskType.BROWSER_AUTOMATION,
+        "priority": TaskPriority.MEDIUM,
+        "target_service": "browser_service",
+    }
+    fields.update(kwargs)
+    return Task(**fields)
+
+
+class RecordingQueueManager(QueueManager):
+    """Queue manager that records start times instead of doing real work."""
+
+    def __init__(self, db, hold: asyncio.Event = None):
+        super().__init__(db)
+        self.hold = hold
+        self.started = {}
+
+    async def _execute_task(self, task: Task):
+        self.started[task.id] = time.perf_counter()
+        if self.hold is not None:
+            await self.hold.wait()
+
+
+@pytest.mark.asyncio
+async def test_added_task_starts_without_polling_delay(db):
+    queue = RecordingQueueManager(db)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        await asyncio.sleep(0)
+        task = make_task()
+        queued_at = time.perf_counter()
+        assert await queue.add_task(task)
+        for _ in range(100):
+            if task.id in queue.started:
+                break
+            await asyncio.sleep(0)
+        assert queue.started[task.id] - queued_at < 0.1
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_completion_frees_slot_for_waiting_task(db):
+    hold = asyncio.Event()
+    queue = RecordingQueueManager(db, hold=hold)
+    queue.max_concurrent_tasks = 1
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        first, second = make_task(), make_task()
+        await queue.add_task(first)
+        await queue.add_task(second)
+        await asyncio.sleep(0.01)
+        assert list(queue.started) == [first.id]
+
+        hold.set()
+        await asyncio.sleep(0.01)
+        assert second.id in queue.started
+        assert first.status == TaskStatus.COMPLETED
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_database_mode_claims_each_task_once_in_priority_order(engine, db):
+    from sqlalchemy.orm import Session
+
+    producer = QueueManager(db, queue_mode="database")
+    low = make_task(priority=TaskPriority.LOW)
+    urgent = make_task(priority=TaskPriority.URGENT)
+    medium = make_task(priority=TaskPriority.MEDIUM)
+    for task in (low, urgent, medium):
+        await producer.add_task(task)
+    assert await producer.backend.size() == 3
+
+    with Session(engine) as other_db:
+        worker_a = QueueManager(db, queue_mode="database")
+        worker_b = QueueManager(other_db, queue_mode="database")
+        claimed = [
+            (await worker_a.get_next_task()).id,
+            (await worker_b.get_next_task()).id,
+            (await worker_a.get_next_task()).id,
+        ]
+        assert await worker_b.get_next_task() is None
+
+    assert claimed == [urgent.id, medium.id, low.id]
+    db.expire_all()
+    assert all(task.status == TaskStatus.PROCESSING for task in (low, urgent, medium))
+
+
+@pytest.mark.asyncio
+async def test_aging_lets_old_low_priority_task_overtake_urgent(db):
+    from datetime import datetime, timedelta
+
+    queue = QueueManager(db)
+    old_low = make_task(priority=TaskPriority.LOW)
+    await queue.add_task(old_low)
+    # Backdate the low task by an hour; 0.1 points/minute outweighs URGENT
+    old_low.created_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    await queue.backend.reprioritize(old_low.id, queue._queue_score(old_low))
+    fresh_urgent = make_task(priority=TaskPriority.URGENT)
+    await queue.add_task(fresh_urgent)
+
+    assert (await queue.get_next_task()).id == old_low.id
+    assert (await queue.get_next_task()).id == fresh_urgent.id
+
+
+@pytest.mark.asyncio
+async def test_reprioritize_and_cancel_update_queue_in_place(db):
+    queue = QueueManager(db)
+    first, second, third = make_task(), make_task(), make_task()
+    for task in (first, second, third):
+        await queue.add_task(task)
+
+    assert await queue.reprioritize_task(third.id, TaskPriority.URGENT)
+    assert await queue.cancel_task(first.id)
+    assert await queue.backend.size() == 2
+
+    assert (await queue.get_next_task()).id == third.id
+    assert (await queue.get_next_task()).id == second.id
+    assert await queue.get_next_task() is None
+    assert not await queue.reprioritize_task(first.id, TaskPriority.HIGH)
+
+
+@pytest.mark.asyncio
+async def test_saturated_service_does_not_block_other_services(db):
+    from app.models.service_config import ServiceConfig
+
+    db.add(ServiceConfig(
+        service_name="media_service",
+        service_type="media",
+        config_data={"max_concurrent_tasks": 1},
+    ))
+    db.commit()
+
+    hold = asyncio.Event()
+    queue = RecordingQueueManager(db, hold=hold)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        media = [make_task(target_service="media_service") for _ in range(3)]
+        documents = [make_task(target_service="document_service") for _ in range(2)]
+        for task in media + documents:
+            await queue.add_task(task)
+        await asyncio.sleep(0.01)
+
+        assert set(queue.started) == {media[0].id} | {task.id for task in documents}
+        status = await queue.get_queue_status()
+        media_status = status["services"]["media_service"]
+        assert (media_status["queued"], media_status["active"], media_status["limit"]) == (2, 1, 1)
+    finally:
+        hold.set()
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_recover_tasks_rebuilds_queue_and_requeues_expired_leases(db):
+    from datetime import datetime, timedelta
+
+    before_crash = QueueManager(db)
+    low, urgent, stuck, fresh = (
+        make_task(priority=TaskPriority.LOW),
+        make_task(priority=TaskPriority.URGENT),
+        make_task(priority=TaskPriority.HIGH),
+        make_task(priority=TaskPriority.HIGH),
+    )
+    for task in (low, urgent, stuck, fresh):
+        await before_crash.add_task(task)
+    stuck.status = TaskStatus.PROCESSING
+    stuck.started_at = datetime.utcnow() - timedelta(hours=1)
+    fresh.status = TaskStatus.PROCESSING
+    fresh.started_at = datetime.utcnow()
+    db.commit()
+
+    restarted = QueueManager(db)
+    assert await restarted.recover_tasks(page_size=1) == 3
+    db.expire_all()
+    assert stuck.status == TaskStatus.PENDING
+    assert fresh.status == TaskStatus.PROCESSING
+    # Scores computed in SQL match the ones add_task computes in Python
+    recovered_score = restarted.backend.queues["browser_service"].key(urgent.id)
+    assert recovered_score == pytest.approx(restarted._queue_score(urgent), abs=1e-3)
+
+    claimed = [(await restarted.get_next_task()).id for _ in range(3)]
+    assert claimed == [urgent.id, stuck.id, low.id]
+    assert await restarted.get_next_task() is None
+
+
+class FlakyQueueManager(QueueManager):
+    """Queue manager whose service fails the first few calls of each task."""
+
+    def __init__(self, db, failures: int, error: Exception):
+        super().__init__(db)
+        self.failures = failures
+        self.error = error
+        self.calls = []
+
+    async def _execute_task(self, task: Task):
+        self.calls.append(task.id)
+        if self.calls.count(task.id) <= self.failures:
+            raise self.error
+
+
+def retrying_queue(db, failures, error, max_attempts=3):
+    from app.core.retry import RetryPolicy
+
+    queue = FlakyQueueManager(db, failures, error)
+    queue.retry_policy = RetryPolicy(max_attempts=max_attempts, base_delay=0.01, max_delay=0.01)
+    queue.retry_policies = {}
+    queue.timers = TimerWheel(tick=0.005)
+    return queue
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_after_backoff(db):
+    from app.core.task_router import ServiceCallError
+
+    queue = retrying_queue(db, failures=2, error=ServiceCallError("503", 503, transient=True))
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        task = make_task()
+        await queue.add_task(task)
+        await asyncio.sleep(0.005)
+        # Waiting out the backoff holds no worker slot
+        assert task.status == TaskStatus.PENDING
+        assert queue.active_tasks == 0
+        assert (await queue.get_queue_status())["scheduled_tasks"] == 1
+
+        await asyncio.sleep(0.1)
+        assert task.status == TaskStatus.COMPLETED
+        assert task.attempts == 3
+        assert task.next_attempt_at is None
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_dead_letter_and_redrive(db):
+    from app.core.task_router import ServiceCallError
+
+    queue = retrying_queue(db, failures=3, error=ServiceCallError("timeout", transient=True), max_attempts=2)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        task = make_task()
+        await queue.add_task(task)
+        await asyncio.sleep(0.1)
+        assert task.status == TaskStatus.DEAD_LETTER
+        assert task.attempts == 2
+        assert [t.id for t in queue.get_dead_letter_tasks()] == [task.id]
+
+        assert await queue.redrive_dead_letter() == 1
+        await asyncio.sleep(0.1)
+        assert task.status == TaskStatus.COMPLETED
+        assert task.attempts == 2
+        assert queue.get_dead_letter_tasks() == []
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_not_retried(db):
+    queue = retrying_queue(db, failures=1, error=ValueError("bad parameters"))
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        task = make_task()
+        await queue.add_task(task)
+        await asyncio.sleep(0.05)
+        assert task.status == TaskStatus.FAILED
+        assert queue.calls == [task.id]
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_status_counts_track_transitions_and_reconcile(db):
+    from sqlalchemy import func, select, update
+
+    from app.core.task_router import ServiceCallError
+
+    def counted_in_db():
+        rows = dict(db.execute(select(Task.status, func.count()).group_by(Task.status)).all())
+        return {status: rows.get(status, 0) for status in TaskStatus}
+
+    queue = retrying_queue(db, failures=1, error=ServiceCallError("timeout", transient=True))
+    queue.status_counts.reconcile(db)
+    cancelled = make_task()
+    await queue.add_task(cancelled)
+    await queue.cancel_task(cancelled.id)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        tasks = [make_task() for _ in range(3)]
+        await queue.add_tasks(tasks)
+        await asyncio.sleep(0.1)
+        assert all(task.status == TaskStatus.COMPLETED for task in tasks)
+        assert queue.status_counts.snapshot() == counted_in_db()
+
+        # A change made behind the queue's back shows up after a reconcile
+        db.execute(update(Task).where(Task.id == tasks[0].id).values(status=TaskStatus.FAILED))
+        db.commit()
+        assert (await queue.get_queue_status())["total_completed"] == 3
+        queue.status_counts.reconcile(db)
+        status = await queue.get_queue_status()
+        assert (status["total_completed"], status["total_failed"]) == (2, 1)
+    finally:
+        loop_task.cancel()
+
+
+def test_retry_delay_is_capped_full_jitter():
+    import random
+
+    from app.core.retry import RetryPolicy
+
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=8.0)
+    rng = random.Random(7)
+    for attempts, cap in ((1, 1.0), (2, 2.0), (3, 4.0), (6, 8.0)):
+        delays = [policy.delay(attempts, rng) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap * 0.8
+
+
+@pytest.mark.asyncio
+async def test_scheduled_task_waits_for_run_at(db):
+    from datetime import datetime, timedelta
+
+    queue = RecordingQueueManager(db)
+    queue.timers = TimerWheel(tick=0.005)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        later = make_task(run_at=datetime.utcnow() + timedelta(seconds=0.05))
+        cancelled = make_task(run_at=datetime.utcnow() + timedelta(seconds=0.05))
+        now = make_task()
+        for task in (later, cancelled, now):
+            await queue.add_task(task)
+        assert await queue.cancel_task(cancelled.id)
+        await asyncio.sleep(0.02)
+        assert list(queue.started) == [now.id]
+        assert later.status == TaskStatus.PENDING
+        assert (await queue.get_queue_status())["scheduled_tasks"] == 1
+
+        await asyncio.sleep(0.1)
+        assert list(queue.started) == [now.id, later.id]
+        assert later.status == TaskStatus.COMPLETED
+        assert cancelled.status == TaskStatus.CANCELLED
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_timer_loop_sleeps_until_the_next_timer(db):
+    from datetime import datetime, timedelta
+
+    queue = RecordingQueueManager(db)
+    queue.timers = TimerWheel(tick=0.005)
+    advances = []
+    advance = queue.timers.advance
+    queue.timers.advance = lambda *args: advances.append(1) or advance(*args)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        far = make_task(run_at=datetime.utcnow() + timedelta(seconds=10))
+        await queue.add_task(far)
+        await asyncio.sleep(0.1)
+        # Twenty ticks passed without the loop waking for any of them
+        assert advances == []
+
+        # A nearer timer wakes the loop early
+        near = make_task(run_at=datetime.utcnow() + timedelta(seconds=0.05))
+        await queue.add_task(near)
+        await asyncio.sleep(0.1)
+        assert list(queue.started) == [near.id]
+        assert len(advances) <= 2
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_recover_tasks_reschedules_future_tasks(db):
+    from datetime import datetime, timedelta
+
+    before_crash = QueueManager(db)
+    scheduled = make_task(run_at=datetime.utcnow() + timedelta(hours=1))
+    ready = make_task()
+    for task in (scheduled, ready):
+        await before_crash.add_task(task)
+
+    restarted = QueueManager(db)
+    assert await restarted.recover_tasks() == 1
+    assert scheduled.id in restarted.timers
+    assert (await restarted.get_next_task()).id == ready.id
+    assert await restarted.get_next_task() is None
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_lease_until_worker_stops_renewing(db):
+    from datetime import datetime
+
+    hold = asyncio.Event()
+    worker = RecordingQueueManager(db, hold=hold)
+    worker.worker_id = "worker-a"
+    worker.lease_seconds = 0.06
+    reaper = QueueManager(db)
+    reaper.worker_id = "worker-b"
+    loop_task = asyncio.create_task(worker.start_processing())
+    task = make_task()
+    try:
+        await worker.add_task(task)
+        await asyncio.sleep(0.15)
+        # Renewed well past the original lease
+        assert task.lease_owner == "worker-a"
+        assert await reaper.reap_expired_leases() == 0
+    finally:
+        # The worker stops heartbeating while the task is still running
+        loop_task.cancel()
+
+    await asyncio.sleep(0.1)
+    assert task.lease_expires_at.replace(tzinfo=None) < datetime.utcnow()
+    assert await reaper.reap_expired_leases() == 1
+    db.expire_all()
+    assert task.status == TaskStatus.PENDING
+    assert task.lease_owner is None
+    assert (await reaper.get_next_task()).id == task.id
+
+    # The original worker notices and throws its late outcome away
+    worker.renew_leases()
+    hold.set()
+    await asyncio.sleep(0.01)
+    db.expire_all()
+    assert task.status == TaskStatus.PENDING
+
+
+@pytest.mark.asyncio
+async def test_hung_attempt_times_out_and_is_retried(db):
+    class HangingQueueManager(QueueManager):
+        async def _execute_task(self, task):
+            await asyncio.Event().wait()
+
+    queue = HangingQueueManager(db)
+    queue.task_timeout = 0.02
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        task = make_task()
+        await queue.add_task(task)
+        await asyncio.sleep(0.1)
+        assert task.status == TaskStatus.PENDING
+        assert task.attempts == 1
+        assert task.next_attempt_at is not None
+        assert queue.active_tasks == 0
+    finally:
+        loop_task.cancel()
+
+
+class RecordingRouter:
+    """Task router stub that records cancel requests."""
+
+    def __init__(self):
+        self.cancelled = []
+
+    async def cancel_remote(self, task_id, service_name):
+        self.cancelled.append((task_id, service_name))
+        return True
+
+
+@pytest.mark.asyncio
+async def test_cancel_interrupts_running_task_and_frees_its_slot(db):
+    hold = asyncio.Event()
+    queue = RecordingQueueManager(db, hold=hold)
+    queue.max_concurrent_tasks = 1
+    queue.task_router = RecordingRouter()
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        running, waiting = make_task(), make_task()
+        await queue.add_task(running)
+        await queue.add_task(waiting)
+        await asyncio.sleep(0.01)
+        assert list(queue.started) == [running.id]
+
+        cancelled_at = time.perf_counter()
+        assert await queue.cancel_task(running.id)
+        for _ in range(100):
+            if waiting.id in queue.started:
+                break
+            await asyncio.sleep(0)
+        assert queue.started[waiting.id] - cancelled_at < 0.05
+        assert running.status == TaskStatus.CANCELLED
+        assert queue.task_router.cancelled == [(running.id, "browser_service")]
+        assert queue.status_counts.get(TaskStatus.CANCELLED) == 1
+    finally:
+        hold.set()
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_task_cancelled_elsewhere_is_interrupted_by_heartbeat(db):
+    hold = asyncio.Event()
+    worker = RecordingQueueManager(db, hold=hold)
+    loop_task = asyncio.create_task(worker.start_processing())
+    try:
+        task = make_task()
+        await worker.add_task(task)
+        await asyncio.sleep(0.01)
+        assert worker.active_tasks == 1
+
+        # Another API process only has the row to go on
+        assert await QueueManager(db).cancel_task(task.id)
+        worker.renew_leases()
+        await asyncio.sleep(0.01)
+        assert worker.active_tasks == 0
+        db.expire_all()
+        assert task.status == TaskStatus.CANCELLED
+    finally:
+        hold.set()
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_deadline_policy_runs_earliest_deadline_first(db):
+    from datetime import datetime, timedelta
+
+    queue = QueueManager(db)
+    queue.scheduling_policy = "deadline"
+    now = datetime.utcnow()
+    relaxed_urgent = make_task(priority=TaskPriority.URGENT, deadline=now + timedelta(seconds=600))
+    tight_low = make_task(priority=TaskPriority.LOW, deadline=now + timedelta(seconds=10))
+    no_deadline = make_task(priority=TaskPriority.MEDIUM)
+    for task in (relaxed_urgent, tight_low, no_deadline):
+        await queue.add_task(task)
+
+    order = [(await queue.get_next_task()).id for _ in range(3)]
+    assert order == [tight_low.id, no_deadline.id, relaxed_urgent.id]
+
+
+@pytest.mark.asyncio
+async def test_task_that_cannot_meet_deadline_is_dropped_unrun(db):
+    from datetime import datetime, timedelta
+
+    queue = RecordingQueueManager(db)
+    queue.service_latency["browser_service"] = 5.0
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        late = make_task(deadline=datetime.utcnow() + timedelta(seconds=1))
+        on_time = make_task(deadline=datetime.utcnow() + timedelta(seconds=60))
+        await queue.add_task(late)
+        await queue.add_task(on_time)
+        await asyncio.sleep(0.01)
+
+        assert late.status == TaskStatus.FAILED
+        assert late.id not in queue.started
+        assert on_time.status == TaskStatus.COMPLETED
+        status = await queue.get_queue_status()
+        assert (status["deadline_dropped"], status["deadline_met"], status["deadline_missed"]) == (1, 1, 0)
+        assert status["goodput"] > 0
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_service_rate_limit_paces_calls_without_holding_slots(db):
+    queue = RecordingQueueManager(db)
+    queue.rate_limits.set_service_limit("browser_service", rate=20.0, burst=1)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        tasks = [make_task() for _ in range(5)]
+        await queue.add_tasks(tasks)
+        await asyncio.sleep(0.02)
+        # Throttled work waits in the queue, not in a worker slot
+        assert len(queue.started) == 1
+        assert queue.active_tasks == 0
+        assert await queue.backend.size() == 4
+
+        await asyncio.sleep(0.25)
+        starts = sorted(queue.started.values())
+        assert len(starts) == 5
+        assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_user_rate_limit_holds_back_only_that_user(db):
+    queue = RecordingQueueManager(db)
+    queue.rate_limits.user_rate, queue.rate_limits.user_burst = 5.0, 1
+    queue.timers = TimerWheel(tick=0.005)
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        first, second = make_task(user_id=1), make_task(user_id=1)
+        other_user = make_task(user_id=2)
+        for task in (first, second, other_user):
+            await queue.add_task(task)
+        await asyncio.sleep(0.02)
+        assert set(queue.started) == {first.id, other_user.id}
+        # The throttled user's task is never claimed, it stays queued
+        assert second.id not in queue.timers
+        assert await queue.backend.size() == 1
+        assert queue.active_tasks == 0
+
+        await asyncio.sleep(0.25)
+        assert second.status == TaskStatus.COMPLETED
+        assert queue.started[second.id] - queue.started[first.id] >= 0.15
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scope", ["user", "domain"])
+async def test_rate_limited_backlog_is_not_claimed_task_by_task(db, scope):
+    queue = RecordingQueueManager(db)
+    if scope == "user":
+        queue.rate_limits.user_rate, queue.rate_limits.user_burst = 10.0, 1
+        tasks = [make_task(user_id=1) for _ in range(500)]
+    else:
+        queue.rate_limits.domain_rate, queue.rate_limits.domain_burst = 10.0, 1
+        tasks = [make_task(user_id=i % 20, parameters={"url": "https://example.com/a"}) for i in range(500)]
+    claimed = []
+    claim = queue.backend.claim
+
+    async def counting_claim(*args, **kwargs):
+        task_id = await claim(*args, **kwargs)
+        if task_id is not None:
+            claimed.append(task_id)
+        return task_id
+
+    queue.backend.claim = counting_claim
+    queue._throttle = None
+    loop_task = asyncio.create_task(queue.start_processing())
+    try:
+        await queue.add_tasks(tasks)
+        await asyncio.sleep(0.35)
+        assert 3 <= len(queue.started) <= 5
+        # A throttled user's tasks are never claimed; a domain is only known
+        # from the task, so each is claimed and parked once. After that
+        # each refill lets one task through instead of cycling the backlog
+        parked_once = 0 if scope == "user" else 500
+        assert len(claimed) <= parked_once + 2 * len(queue.started)
+        assert await queue.backend.size() == 500 - len(queue.started)
+    finally:
+        loop_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_flooding_user_does_not_starve_others(db):
+    from app.models.user import User
+
+    db.add_all([
+        User(id=1, username="flood", email="flood@example.com", hashed_password="x"),
+        User(id=2, username="light", email="light@example.com", hashed_password="x"),
+        User(id=3, username="gold", email="gold@example.com", hashed_password="x",
+             preferences={"queue_weight": 2}),
+    ])
+    db.commit()
+    queue = QueueManager(db)
+    await queue.add_tasks([make_task(user_id=1) for _ in range(50)])
+    light = make_task(user_id=2, priority=TaskPriority.LOW)
+    await queue.add_task(light)
+    # Priority still orders work within a user
+    assert (await queue.get_next_task()).user_id == 1
+    assert (await queue.get_next_task()).id == light.id
+
+    await queue.add_tasks([make_task(user_id=3) for _ in range(20)])
+    served = [(await queue.get_next_task()).user_id for _ in range(30)]
+    assert served.count(3) == 2 * served.count(1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("outcome", ["completed", "failed"])
+async def test_cancel_from_another_node_is_not_overwritten(tmp_path, outcome):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.models import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'shared.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    hold = asyncio.Event()
+
+    class Node(RecordingQueueManager):
+        async def _execute_task(self, task):
+            await super()._execute_task(task)
+            if outcome == "failed":
+                raise RuntimeError("service went away")
+
+    with Session(engine) as db_a, Session(engine) as db_b:
+        node_a, node_b = Node(db_a, hold=hold), QueueManager(db_b)
+        loop_task = asyncio.create_task(node_a.start_processing())
+        try:
+            task = make_task()
+            await node_a.add_task(task)
+            await asyncio.sleep(0.02)
+            assert task.id in node_a.started
+
+            assert await node_b.cancel_task(task.id)
+            hold.set()
+            await asyncio.sleep(0.02)
+            assert node_a.active_tasks == 0
+            db_a.expire_all()
+            assert task.status == TaskStatus.CANCELLED
+            assert node_a.status_counts.get(TaskStatus.COMPLETED) == 0
+            assert node_a.status_counts.get(TaskStatus.PENDING) == 0
+        finally:
+            loop_task.cancel()
+            await asyncio.gather(loop_task, return_exceptions=True)
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_database_from_an_older_version_is_upgraded_in_place(tmp_path):
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+    from app.models import Base, upgrade_schema
+
+    # The tasks table as created before the queue columns were added
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE tasks (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(255) NOT NULL, "
+            "description TEXT, command TEXT NOT NULL, task_type VARCHAR(19) NOT NULL, "
+            "status VARCHAR(10), priority VARCHAR(6), target_service VARCHAR(100), "
+            "service_endpoint VARCHAR(255), parameters JSON, result JSON, error_message TEXT, "
+            "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME, started_at DATETIME, "
+            "completed_at DATETIME, user_id INTEGER, conversation_id INTEGER)"
+        ))
+        conn.execute(text(
+            "INSERT INTO tasks (title, command, task_type, status, priority, target_service) "
+            "VALUES ('old', 'take a screenshot', 'BROWSER_AUTOMATION', 'PENDING', 'MEDIUM', 'browser_service')"
+        ))
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    # Running it again on an up to date database changes nothing
+    upgrade_schema(engine)
+
+    with Session(engine) as db:
+        queue = QueueManager(db)
+        task = make_task(dedup_key="abc", deadline=datetime.utcnow() + timedelta(seconds=60))
+        assert await queue.add_task(task)
+        assert db.get(Task, 1).attempts == 0
+        assert await QueueManager(db).recover_tasks() == 2
+    engine.dispose()
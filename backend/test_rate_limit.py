@@ -0,0 +1,42 @@
+import time
+
+from app.core.rate_limit import RateLimiter, TokenBucket
+
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+    for _ in range(2):
+        assert bucket.wait_time(now=0.0) == 0
+        bucket.take(now=0.0)
+    assert bucket.wait_time(now=0.0) == 0.5
+    assert bucket.wait_time(now=0.5) == 0
+    # Idle time never banks more than the burst
+    assert bucket.available(now=100.0) == 2
+
+
+def test_acquire_takes_from_every_bucket_or_none():
+    limiter = RateLimiter()
+    limiter.set_service_limit("browser_service", rate=100.0, burst=5)
+    limiter.user_rate, limiter.user_burst = 1.0, 1
+    now = time.monotonic()
+
+    buckets = limiter.buckets("browser_service", user_id=7)
+    assert limiter.acquire(buckets, now=now) == 0
+    # The user is out of tokens, so the service keeps its own
+    assert limiter.acquire(buckets, now=now) > 0
+    assert limiter.service_bucket("browser_service").available(now=now) == 4
+    assert limiter.acquire(limiter.buckets("browser_service", user_id=8), now=now) == 0
+    assert limiter.buckets("document_service") == []
+
+
+def test_empty_user_and_domain_buckets_are_reported_until_refilled():
+    limiter = RateLimiter()
+    limiter.user_rate, limiter.user_burst = 2.0, 1
+    limiter.domain_rate, limiter.domain_burst = 4.0, 1
+    now = time.monotonic()
+
+    assert limiter.acquire(limiter.buckets("browser_service", user_id=7, domain="example.com"), now=now) == 0
+    assert limiter.throttled("user", now=now) == {7: 0.5}
+    assert limiter.throttled("domain", now=now) == {"example.com": 0.25}
+    assert limiter.throttled("domain", now=now + 0.3) == {}
+    assert limiter.throttled("user", now=now + 0.6) == {}
@@ -0,0 +1,94 @@
+import pytest
+
+from app.core.command_parser import ParsedCommand
+from app.core.semantic_cache import SemanticCache, extract_slots
+from app.models.task import TaskPriority, TaskType
+
+
+def email_parse() -> ParsedCommand:
+    return ParsedCommand(
+        task_type=TaskType.COMMUNICATION,
+        title="Email bob@example.com",
+        description="Send the 3 reports to bob@example.com",
+        priority=TaskPriority.MEDIUM,
+        target_service="communication_service",
+        service_endpoint="handle",
+        parameters={"to": "bob@example.com", "count": 3, "subject": "Q3 numbers"},
+        confidence=0.9,
+    )
+
+
+def test_extract_slots_masks_values():
+    masked, slots = extract_slots('Open https://a.com/x?id=7 and mail 2 files to "Ops Team" at ops@a.com')
+    assert masked == "open <url> and mail <number> files to <quoted> at <email>"
+    assert slots == [("url", "https://a.com/x?id=7"), ("number", "2"), ("quoted", "Ops Team"), ("email", "ops@a.com")]
+
+
+def test_paraphrase_reuses_parse_with_new_slots():
+    cache = SemanticCache(ParsedCommand)
+    cache.set("send the 3 reports to bob@example.com", None, "m", email_parse(), now=0)
+
+    hit = cache.get("please send the 5 reports to alice@example.org", None, "m", now=1)
+    assert hit is not None
+    assert hit.parameters == {"to": "alice@example.org", "count": 5, "subject": "Q3 numbers"}
+    assert hit.description == "Send the 5 reports to alice@example.org"
+    assert 0.92 * 0.9 <= hit.confidence < 0.9
+
+    # Different model or context, different slots, unrelated text or expired
+    assert cache.get("send the 3 reports to bob@example.com", None, "other", now=1) is None
+    assert cache.get("send the 3 reports to bob@example.com", {"team": "ops"}, "m", now=1) is None
+    assert cache.get("send the reports to bob@example.com", None, "m", now=1) is None
+    assert cache.get("forward the 3 reports to bob@example.com", None, "m", now=1) is None
+    assert cache.get("transcribe yesterday's meeting recording", None, "m", now=1) is None
+    assert cache.get("send the 3 reports to bob@example.com", None, "m", now=86401) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 6
+
+
+def test_full_cache_overwrites_oldest_entry():
+    cache = SemanticCache(ParsedCommand, max_entries=2)
+    cache.set("send the 3 reports to bob@example.com", None, "m", email_parse(), now=0)
+    cache.set("archive every invoice from last year", None, "m", email_parse(), now=0)
+    cache.set("summarize the quarterly board meeting", None, "m", email_parse(), now=0)
+    assert len(cache) == 2
+    assert cache.get("send the 3 reports to bob@example.com", None, "m", now=0) is None
+    assert cache.get("summarize the quarterly board meeting", None, "m", now=0).confidence == pytest.approx(0.9)
+
+
+def copy_parse(source: str, dest: str) -> ParsedCommand:
+    return ParsedCommand(
+        task_type=TaskType.BROWSER_AUTOMATION,
+        title=f"Copy {source} to {dest}",
+        description=f"Copy data from {source} into {dest}",
+        priority=TaskPriority.MEDIUM,
+        target_service="browser_service",
+        service_endpoint="execute",
+        parameters={"source": source, "dest": dest, "urls": [source, dest]},
+        confidence=0.9,
+    )
+
+
+@pytest.mark.parametrize("source,dest", [
+    # Shifted: the new source is the cached destination
+    ("https://b.com", "https://c.com"),
+    # Swapped
+    ("https://b.com", "https://a.com"),
+])
+def test_overlapping_slots_are_swapped_in_one_pass(source, dest):
+    cache = SemanticCache(ParsedCommand)
+    cache.set("copy data from https://a.com into https://b.com", None, "m",
+              copy_parse("https://a.com", "https://b.com"), now=0)
+
+    hit = cache.get(f"copy data from {source} into {dest}", None, "m", now=1)
+    assert hit is not None
+    assert hit.parameters == copy_parse(source, dest).parameters
+    assert hit.description == copy_parse(source, dest).description
+
+
+def test_ambiguous_slot_swap_is_a_miss():
+    cache = SemanticCache(ParsedCommand)
+    cache.set("copy data from https://a.com into https://a.com", None, "m",
+              copy_parse("https://a.com", "https://a.com"), now=0)
+    # One cached URL would have to become two different ones
+    assert cache.get("copy data from https://b.com into https://c.com", None, "m", now=1) is None
+    assert cache.stats()["hits"] == 0
@@ -0,0 +1,93 @@
+import random
+import time
+
+from app.core.timer_wheel import TimerWheel
+
+
+def test_items_fire_at_or_just_after_their_due_time():
+    # Small slots and few levels so cascading and overflow are exercised
+    wheel = TimerWheel(tick=1.0, slot_bits=2, levels=3, now=0.0)
+    rng = random.Random(3)
+    due = {item: rng.uniform(0, 500) for item in range(2000)}
+    for item, at in due.items():
+        wheel.add(item, at)
+
+    fired = {}
+    now = 0.0
+    while now < 510:
+        now += rng.uniform(0, 2)
+        for item in wheel.advance(now):
+            fired[item] = now
+    assert fired.keys() == due.keys()
+    for item, at in fired.items():
+        assert due[item] <= at <= due[item] + 1.0 + 2.0
+    assert len(wheel) == 0
+
+
+def test_remove_and_reschedule():
+    wheel = TimerWheel(tick=0.1, now=0.0)
+    wheel.add("a", 5.0)
+    wheel.add("b", 5.0)
+    wheel.add("c", 1.0)
+    assert wheel.remove("b")
+    assert not wheel.remove("b")
+    # Adding again moves the existing timer
+    wheel.add("c", 8.0)
+
+    assert wheel.advance(6.0) == ["a"]
+    assert wheel.advance(7.0) == []
+    assert wheel.advance(8.0) == ["c"]
+
+
+def test_past_due_items_come_out_on_next_advance():
+    wheel = TimerWheel(tick=0.1, now=100.0)
+    wheel.advance(150.0)
+    wheel.add("late", 120.0)
+    assert "late" in wheel
+    assert wheel.advance(150.0) == ["late"]
+
+
+def test_next_due_is_the_first_occupied_slot_on_any_level():
+    # Small slots and few levels so cascading and overflow are exercised
+    wheel = TimerWheel(tick=1.0, slot_bits=2, levels=3, now=0.0)
+    assert wheel.next_due() is None
+    rng = random.Random(5)
+    due = {item: rng.uniform(0, 200) for item in range(200)}
+    for item, at in due.items():
+        wheel.add(item, at)
+
+    fired = {}
+    while len(wheel):
+        due_at = wheel.next_due()
+        # Nothing comes out before next_due, so sleeping until then is safe
+        assert wheel.advance(due_at - 0.01) == []
+        for item in wheel.advance(due_at):
+            fired[item] = due_at
+    assert fired.keys() == due.keys()
+    for item, at in fired.items():
+        assert due[item] <= at <= due[item] + 1.0
+    assert wheel.next_due() is None
+
+
+def test_advancing_to_next_due_always_makes_progress():
+    # Ticks that are not exact in binary floating point
+    wheel = TimerWheel(tick=0.1, now=1760000000.123)
+    rng = random.Random(7)
+    for item in range(500):
+        wheel.add(item, 1760000000.123 + rng.uniform(0, 600))
+    wakeups = 0
+    while len(wheel):
+        due_at = wheel.next_due()
+        fired = wheel.advance(due_at)
+        assert fired or wheel.next_due() != due_at
+        wakeups += 1
+    assert wakeups < 1000
+
+
+def test_far_timers_do_not_step_through_every_tick():
+    wheel = TimerWheel(tick=0.1, now=0.0)
+    wheel.add("month", 30 * 86400.0)
+    started = time.perf_counter()
+    assert wheel.advance(30 * 86400.0 - 1) == []
+    assert wheel.advance(30 * 86400.0) == ["month"]
+    assert time.perf_counter() - started < 0.05
@@ -0,0 +1,17 @@
+from app.core.ttl_cache import TTLCache
+
+
+def test_entries_expire_and_least_recently_used_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=10.0)
+    cache.set("a", 1, now=0.0)
+    cache.set("b", 2, now=0.0)
+    assert cache.get("a", now=5.0) == 1
+    cache.set("c", 3, now=5.0)
+
+    # "b" was least recently used
+    assert cache.get("b", now=5.0) is None
+    assert cache.get("a", now=9.0) == 1
+    assert cache.get("a", now=10.0) is None
+    cache.set("d", 4, ttl=1.0, now=10.0)
+    assert cache.get("d", now=11.0) is None
+    assert len(cache) == 1
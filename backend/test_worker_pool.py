@@ -0,0 +1,142 @@
+import asyncio
+import pickle
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import task_worker
+from app.core.queue_manager import QueueManager
+from app.core.task_router import ServiceCallError, TaskRouter
+from app.core.task_worker import WorkerPool
+from app.models import Base
+from app.models.task import Task, TaskStatus
+from test_queue_manager import make_task
+
+
+def store_result(task_id):
+    """Worker-process target that writes its result with its own session."""
+    db = task_worker._session_factory()
+    try:
+        task = db.get(Task, task_id)
+        if task.title == "unavailable":
+            raise ServiceCallError("503", status_code=503, transient=True)
+        task.result = {"worker": "process"}
+        db.commit()
+    finally:
+        db.close()
+
+
+async def slow_call(self, task):
+    await asyncio.sleep(0.5)
+    return {"worker": "late"}
+
+
+def run_slowly(task_id):
+    """Worker-process target: the real run_task around a slow service call."""
+    TaskRouter.check_service = lambda self, task: None
+    TaskRouter.call_service = slow_call
+    task_worker.run_task(task_id)
+
+
+def test_service_call_error_survives_pickling():
+    error = pickle.loads(pickle.dumps(ServiceCallError("busy", status_code=429, transient=True)))
+    assert (str(error), error.status_code, error.transient) == ("busy", 429, True)
+
+
+def test_worker_does_not_overwrite_a_task_cancelled_during_its_call(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'workers.db'}"
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        task = make_task(status=TaskStatus.PROCESSING, lease_owner="node-a")
+        db.add(task)
+        db.commit()
+        task_id = task.id
+
+    async def cancelled_meanwhile(self, task):
+        with Session(engine) as db:
+            db.get(Task, task.id).status = TaskStatus.CANCELLED
+            db.commit()
+        return {"worker": "late"}
+
+    monkeypatch.setattr(TaskRouter, "check_service", lambda self, task: None)
+    monkeypatch.setattr(TaskRouter, "call_service", cancelled_meanwhile)
+    task_worker.init_worker(database_url)
+    task_worker.run_task(task_id)
+
+    with Session(engine) as db:
+        task = db.get(Task, task_id)
+        assert (task.status, task.result) == (TaskStatus.CANCELLED, None)
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_process_mode_runs_tasks_in_worker_processes(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'workers.db'}"
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        queue = QueueManager(db)
+        queue.worker_mode = "process"
+        queue.worker_pool = WorkerPool(2, database_url, target=store_result)
+        loop_task = asyncio.create_task(queue.start_processing())
+        try:
+            done, failing = make_task(), make_task(title="unavailable")
+            await queue.add_task(done)
+            await queue.add_task(failing)
+            for _ in range(200):
+                await asyncio.sleep(0.05)
+                db.expire_all()
+                if done.status == TaskStatus.COMPLETED and failing.attempts:
+                    break
+
+            assert done.status == TaskStatus.COMPLETED
+            assert done.result == {"worker": "process"}
+            # The transient flag made it back across the process boundary
+            assert failing.status == TaskStatus.PENDING
+            assert failing.next_attempt_at is not None
+        finally:
+            loop_task.cancel()
+            await asyncio.gather(loop_task, return_exceptions=True)
+    assert queue.worker_pool is None
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_task_keeps_its_slot_and_status_in_process_mode(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'workers.db'}"
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        queue = QueueManager(db)
+        queue.worker_mode = "process"
+        queue.worker_pool = WorkerPool(1, database_url, target=run_slowly)
+        loop_task = asyncio.create_task(queue.start_processing())
+        try:
+            task = make_task()
+            await queue.add_task(task)
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                if task.id in queue.running_tasks:
+                    break
+            # Let the worker process pick it up before cancelling
+            await asyncio.sleep(0.2)
+            assert await queue.cancel_task(task.id)
+            await asyncio.sleep(0.05)
+            # The worker process is still calling the service
+            assert queue.service_active["browser_service"] == 1
+
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                if not queue.service_active["browser_service"]:
+                    break
+            db.expire_all()
+            assert queue.service_active["browser_service"] == 0
+            # The worker's late result did not overwrite the cancel
+            assert task.status == TaskStatus.CANCELLED
+            assert task.result is None
+        finally:
+            loop_task.cancel()
+            await asyncio.gather(loop_task, return_exceptions=True)
+    engine.dispose()